@@ -1,33 +1,132 @@
-from flask import Flask, jsonify, request
+from datetime import datetime, timezone
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from database import database
-from server import config
+from database import results_io
+from api.response_cache import ResponseCache
 
 app = Flask(__name__)
 CORS(app)
 
+response_cache = ResponseCache()
+
+def cached_json_response(key, build):
+    """
+    Serves `build()` as JSON from the response cache. The cached bytes are
+    reused until the results version changes. If the client's If-None-Match
+    already names the current ETag, the answer is an empty 304. A `build()`
+    that returns None means there is nothing to show: the answer is a 404.
+    """
+    entry = response_cache.get(key, database.get_results_version(), build)
+    if entry.body == b"null":
+        return jsonify({"error": "Not found"}), 404
+    if request.if_none_match.contains_weak(entry.etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = 'no-cache' # Clients may keep it, but must revalidate
+    return response
+
 @app.route('/leaderboard', methods=['GET'])
 def get_leaderboard_endpoint():
-    """API endpoint to get the leaderboard data."""
-    leaderboard_data = database.get_leaderboard()
-    return jsonify(leaderboard_data)
+    """
+    API endpoint to get the leaderboard data.
+    Accepts an optional 'game_mode' query parameter; all modes are combined by default.
+    'limit' sets the page size (default 10, at most 100). To get the next page,
+    pass the 'cursor' of the last entry as 'after'.
+    """
+    game_mode = request.args.get('game_mode')
+    limit = request.args.get('limit', 10, type=int)
+    after = request.args.get('after')
+    try:
+        return cached_json_response(
+            ('leaderboard', game_mode, limit, after),
+            lambda: database.get_leaderboard(limit, game_mode, after)
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/ratings', methods=['GET'])
+def get_ratings_endpoint():
+    """
+    API endpoint to get the skill leaderboard: players of one 'game_mode'
+    (default 'standard') by Elo rating. Paginated like /leaderboard with
+    'limit' and 'after'.
+    """
+    game_mode = request.args.get('game_mode', 'standard')
+    limit = request.args.get('limit', 10, type=int)
+    after = request.args.get('after')
+    try:
+        return cached_json_response(
+            ('ratings', game_mode, limit, after),
+            lambda: database.get_rating_leaderboard(game_mode, limit, after)
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/players/<name>/rank', methods=['GET'])
+def get_player_rank_endpoint(name):
+    """
+    API endpoint to get one player's standing.
+    With a 'game_mode' query parameter, returns their leaderboard entry in that mode;
+    otherwise their entries in every mode they have played, keyed by mode.
+    """
+    game_mode = request.args.get('game_mode')
+    if game_mode is not None:
+        build = lambda: database.get_player_rank(name, game_mode)
+    else:
+        build = lambda: database.get_player_ranks(name)
+    return cached_json_response(('player_rank', name, game_mode), build)
 
 @app.route('/game_stats', methods=['GET'])
 def get_game_stats_endpoint():
     """
     API endpoint to get game statistics.
-    Accepts a 'range' query parameter: 'week', 'month', or 'year'.
-    Defaults to 'week'.
+    Accepts a 'range' query parameter: 'week', 'month', 'year' or 'all'.
+    Defaults to 'week'. An optional 'game_mode' parameter counts only that mode;
+    every day also carries its per-mode breakdown.
     """
     time_range = request.args.get('range', 'week').lower()
+    game_mode = request.args.get('game_mode')
     
     if time_range == 'month':
         days_limit = 30
     elif time_range == 'year':
         days_limit = 365
+    elif time_range == 'all':
+        days_limit = None
     else: # Default to week
         days_limit = 7
         
-    stats_data = database.get_games_played_per_day(days_limit)
-    return jsonify(stats_data)
+    # The window moves at midnight (UTC, like the query's DATE('now')) even when no game ends,
+    # so the date is part of the key.
+    key = ('game_stats', days_limit, game_mode, datetime.now(timezone.utc).date().isoformat())
+    return cached_json_response(key, lambda: database.get_games_played_per_day(days_limit, game_mode))
+
+@app.route('/export/game_results', methods=['GET'])
+def export_game_results_endpoint():
+    """
+    API endpoint to download game results as a stream.
+    Accepts 'format' ('ndjson' or 'csv', default 'ndjson'), 'since' and 'until'
+    (ISO dates; since inclusive, until exclusive), 'game_mode', and 'gzip=1'
+    for a compressed download. Rows are read and sent in chunks, so the size
+    of the export does not matter.
+    """
+    fmt = request.args.get('format', 'ndjson').lower()
+    since, until = request.args.get('since'), request.args.get('until')
+    if fmt not in results_io.FORMATS:
+        return jsonify({"error": f"Unknown format: {fmt}"}), 400
+    for value in (since, until):
+        try:
+            if value is not None:
+                datetime.fromisoformat(value)
+        except ValueError:
+            return jsonify({"error": f"Invalid date: {value}"}), 400
 
+    blocks = results_io.encode(database.iter_game_results(since, until, request.args.get('game_mode')), fmt)
+    filename = f"game_results.{fmt}"
+    mimetype = results_io.CONTENT_TYPES[fmt]
+    if request.args.get('gzip') == '1':
+        blocks, filename, mimetype = results_io.gzip_blocks(blocks), filename + ".gz", 'application/gzip'
+    return Response(blocks, mimetype=mimetype, headers={'Content-Disposition': f'attachment; filename="{filename}"'})
@@ -0,0 +1,59 @@
+"""
+Cache of serialized API responses.
+Entries are keyed by endpoint and parameters and tagged with the database's
+results version (see database.get_results_version). A request serves the
+stored bytes for as long as the version is unchanged. Once a new result is
+recorded, the next request rebuilds the entry. Each entry carries an ETag
+derived from its body, so a polling client that already has it gets a 304.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('API_RESPONSE_CACHE_MAX_ENTRIES', '256'))
+
+class CachedResponse(NamedTuple):
+    version: int # Results version the body was built from
+    body: bytes # Serialized JSON, sent as is
+    etag: str # Content hash: unchanged data keeps its ETag across versions
+
+class ResponseCache:
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # Least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version, build):
+        """
+        Returns the entry for `key` if it was built at `version`. Otherwise it
+        calls `build()` for fresh data, serializes it and stores the result.
+        Two requests that miss together may both build, but never block each other.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        body = json.dumps(build(), separators=(",", ":")).encode()
+        entry = CachedResponse(version, body, hashlib.sha1(body).hexdigest()[:20])
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current.version > version:
+                return entry # A newer build finished first; keep it
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
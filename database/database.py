@@ -1,15 +1,100 @@
 import sqlite3
 import logging
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from database import ratings
 
 DB_FILE = os.getenv('DATABASE_FILE', 'database/game_results.db')
+DB_POOL_SIZE = int(os.getenv('DATABASE_POOL_SIZE', '8'))
+DB_CACHE_KB = int(os.getenv('DATABASE_CACHE_KB', '16384'))
+DB_BUSY_TIMEOUT_SECONDS = float(os.getenv('DATABASE_BUSY_TIMEOUT_SECONDS', '30'))
+
+# --- Connections ---
+# Every query borrows a long-lived connection from one process-wide pool
+# instead of connecting per call, so the schema is parsed once per connection
+# and sqlite3's per-connection statement cache turns the constant SQL below
+# into prepared statements that are reused. The database runs in WAL mode:
+# the API server's readers and the game server's writer no longer block each
+# other, and with synchronous=NORMAL a commit only fsyncs at checkpoints.
+def _open_connection():
+    # Pooled connections move between threads, but only one thread uses a connection at a time.
+    conn = sqlite3.connect(DB_FILE, timeout=DB_BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+    # Only takes effect on a new database; it has to come before the first write (switching to WAL).
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{DB_CACHE_KB}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+class ConnectionPool:
+    """
+    Keeps up to `size` idle connections for reuse. Borrowing never waits: if
+    every pooled connection is busy a new one is opened, and it is closed
+    instead of pooled when returned to a full pool.
+    """
+    def __init__(self, size=DB_POOL_SIZE):
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self._generation = 0 # Bumped by close(); connections from an older generation are not pooled again
+        self.connections_opened = 0
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            generation = self._generation
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = _open_connection()
+            self.connections_opened += 1
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                if generation == self._generation and len(self._idle) < self.size:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def close(self):
+        """Closes every idle connection; connections in use are closed when they are returned."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._generation += 1
+        for conn in idle:
+            conn.close()
+
+pool = ConnectionPool()
+
+def connection():
+    """Borrows a pooled connection: `with database.connection() as conn: ...`"""
+    return pool.connection()
+
+def close_connections():
+    pool.close()
 
 def initialize_database():
     """Creates or updates the game_results table."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
+    with connection() as conn:
+        backfills = _create_schema(conn.cursor())
+        conn.commit()
+    for backfill in backfills:
+        backfill()
+    logging.info("Database initialized.")
+
+def _table_exists(cursor, name):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+def _create_schema(cursor):
+    """Creates missing tables and indexes; returns the backfills that newly created summary tables need."""
+    backfills = []
     # Create table if it doesn't exist
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS game_results (
@@ -29,137 +114,710 @@ def initialize_database():
     except sqlite3.OperationalError:
         # Column already exists, which is fine
         pass
-        
-    conn.commit()
-    conn.close()
-    logging.info("Database initialized.")
+
+    # Covering indexes: per-name aggregation (the player_stats backfill and consistency
+    # check) never touches the table, and date-range queries seek on timestamp.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_results_winner ON game_results (winner_name, outcome, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_results_loser ON game_results (loser_name, outcome, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_results_timestamp ON game_results (timestamp)")
+
+    # Per-player, per-mode totals kept up to date by record_game_result.
+    if not _table_exists(cursor, 'player_stats'):
+        backfills.append(backfill_player_stats)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS player_stats (
+            name TEXT NOT NULL,
+            game_mode TEXT NOT NULL,
+            wins INTEGER NOT NULL DEFAULT 0,
+            losses INTEGER NOT NULL DEFAULT 0,
+            draws INTEGER NOT NULL DEFAULT 0,
+            last_game TEXT,
+            PRIMARY KEY (name, game_mode)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_player_stats_rank ON player_stats (game_mode, wins DESC, draws DESC, losses DESC, name)")
+
+    # The same totals summed over every mode, kept alongside player_stats, so the
+    # all-modes leaderboard is an index seek like a single mode.
+    if not _table_exists(cursor, 'player_totals') and backfill_player_stats not in backfills:
+        backfills.append(backfill_player_totals)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS player_totals (
+            name TEXT PRIMARY KEY,
+            wins INTEGER NOT NULL DEFAULT 0,
+            losses INTEGER NOT NULL DEFAULT 0,
+            draws INTEGER NOT NULL DEFAULT 0,
+            last_game TEXT
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_player_totals_rank ON player_totals (wins DESC, draws DESC, losses DESC, name)")
+
+    # A single counter bumped by every write to game_results or player_stats,
+    # so readers such as the API's response cache can tell if anything changed.
+    cursor.execute("CREATE TABLE IF NOT EXISTS results_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)")
+    cursor.execute("INSERT OR IGNORE INTO results_version (id, version) VALUES (1, 0)")
+
+    # Games per day and mode, kept up to date by record_game_result, so the
+    # game_stats series reads one row per day instead of scanning game_results.
+    if not _table_exists(cursor, 'daily_game_counts'):
+        backfills.append(backfill_daily_game_counts)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_game_counts (
+            day TEXT NOT NULL,
+            game_mode TEXT NOT NULL,
+            games INTEGER NOT NULL,
+            PRIMARY KEY (day, game_mode)
+        ) WITHOUT ROWID
+    ''')
+
+    # Elo rating per player and mode, updated by record_game_result (see database/ratings.py).
+    if not _table_exists(cursor, 'player_ratings'):
+        backfills.append(rebuild_ratings)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS player_ratings (
+            name TEXT NOT NULL,
+            game_mode TEXT NOT NULL,
+            rating REAL NOT NULL,
+            games INTEGER NOT NULL,
+            PRIMARY KEY (name, game_mode)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_player_ratings_rank ON player_ratings (game_mode, rating DESC, name)")
+
+    # What archived games (moved out of game_results by database/retention.py)
+    # contributed to each summary, so rebuilds from game_results stay complete.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archived_player_stats (
+            name TEXT NOT NULL,
+            game_mode TEXT NOT NULL,
+            wins INTEGER NOT NULL DEFAULT 0,
+            losses INTEGER NOT NULL DEFAULT 0,
+            draws INTEGER NOT NULL DEFAULT 0,
+            last_game TEXT,
+            PRIMARY KEY (name, game_mode)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archived_daily_game_counts (
+            day TEXT NOT NULL,
+            game_mode TEXT NOT NULL,
+            games INTEGER NOT NULL,
+            PRIMARY KEY (day, game_mode)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archived_player_ratings (
+            name TEXT NOT NULL,
+            game_mode TEXT NOT NULL,
+            rating REAL NOT NULL,
+            games INTEGER NOT NULL,
+            PRIMARY KEY (name, game_mode)
+        ) WITHOUT ROWID
+    ''')
+    return backfills
 
 def reset_database():
     """Deletes existing database file and creates a fresh one. Used for test mode."""
+    close_connections()
     if os.path.exists(DB_FILE):
         os.remove(DB_FILE)
         logging.info(f"Deleted existing database: {DB_FILE}")
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(DB_FILE + suffix):
+            os.remove(DB_FILE + suffix)
     initialize_database()
     logging.info(f"Fresh database created: {DB_FILE}")
 
 def record_game_result(winner_name, loser_name, outcome, game_mode='standard'):
     """Records the result of a single game to the database."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    timestamp = datetime.now().isoformat()
-    
+    record_game_results([(winner_name, loser_name, outcome, game_mode, datetime.now().isoformat())])
+
+def record_game_results(results, conn=None):
+    """
+    Records a batch of (winner_name, loser_name, outcome, game_mode, timestamp)
+    results in one transaction, i.e. one commit for the whole batch.
+    Uses `conn` if given (e.g. a writer thread's long-lived connection),
+    otherwise a pooled one.
+    """
+    if conn is None:
+        with connection() as conn:
+            record_game_results(results, conn)
+        return
+    with conn:
+        cursor = conn.cursor()
+        for winner_name, loser_name, outcome, game_mode, timestamp in results:
+            _insert_game_result(cursor, winner_name, loser_name, outcome, game_mode, timestamp)
+        _bump_results_version(cursor)
+    for winner_name, loser_name, outcome, game_mode, _ in results:
+        logging.info(f"Game result recorded: Winner={winner_name}, Loser={loser_name}, Outcome={outcome}, Mode={game_mode}")
+
+def _insert_game_result(cursor, winner_name, loser_name, outcome, game_mode, timestamp):
+    """Inserts one result under a new id and applies it to every summary table."""
     cursor.execute(
         "INSERT INTO game_results (winner_name, loser_name, outcome, timestamp, game_mode) VALUES (?, ?, ?, ?, ?)",
         (winner_name, loser_name, outcome, timestamp, game_mode)
     )
-    conn.commit()
-    conn.close()
-    logging.info(f"Game result recorded: Winner={winner_name}, Loser={loser_name}, Outcome={outcome}, Mode={game_mode}")
-
-def get_leaderboard():
-    """Calculates and returns the player leaderboard."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    # Get all unique player names
-    cursor.execute("SELECT winner_name FROM game_results WHERE winner_name IS NOT NULL")
-    winners = [row[0] for row in cursor.fetchall()]
-    cursor.execute("SELECT loser_name FROM game_results WHERE loser_name IS NOT NULL")
-    losers = [row[0] for row in cursor.fetchall()]
-    all_names = set(winners + losers)
-
-    leaderboard = []
-    for name in all_names:
-        # Calculate wins
-        cursor.execute("SELECT COUNT(*) FROM game_results WHERE winner_name = ? AND outcome = 'win'", (name,))
-        wins = cursor.fetchone()[0]
-
-        # Calculate losses
-        cursor.execute("SELECT COUNT(*) FROM game_results WHERE loser_name = ? AND outcome = 'win'", (name,))
-        losses = cursor.fetchone()[0]
-
-        # Calculate draws
-        cursor.execute("SELECT COUNT(*) FROM game_results WHERE outcome = 'draw' AND (winner_name = ? OR loser_name = ?)", (name, name))
-        draws = cursor.fetchone()[0]
-
-        # Calculate total games and win percentage
-        total_games = wins + losses + draws
-        if total_games > 0:
-            win_percentage = round((wins / total_games) * 100, 2)
+    # Same transaction, so the summaries can never disagree with game_results.
+    _apply_to_summaries(cursor, winner_name, loser_name, outcome, game_mode, timestamp)
+
+def _apply_to_summaries(cursor, winner_name, loser_name, outcome, game_mode, timestamp, prefix=""):
+    """
+    Counts one game in player_stats, daily_game_counts and player_ratings, or,
+    with prefix 'archived_', in the baselines kept for archived games.
+    """
+    _update_player_stats(cursor, winner_name, loser_name, outcome, game_mode, timestamp, prefix + "player_stats")
+    cursor.execute(_DAILY_COUNT_UPSERT.format(table=prefix + "daily_game_counts"), (timestamp[:10], game_mode))
+    _update_ratings(cursor, winner_name, loser_name, outcome, game_mode, prefix + "player_ratings")
+
+def _bump_results_version(cursor):
+    cursor.execute("UPDATE results_version SET version = version + 1 WHERE id = 1")
+
+def get_results_version():
+    """A number that changes whenever a result is recorded or stats are rebuilt; cheap enough to read per request."""
+    with connection() as conn:
+        return conn.execute("SELECT version FROM results_version WHERE id = 1").fetchone()[0]
+
+# --- Player Stats ---
+# player_stats holds running totals per (name, game_mode) so the leaderboard
+# never has to aggregate game_results. Each game counts once for its
+# winner-side name and once for its loser-side name; a draw against oneself
+# is only counted once. _STATS_FROM_RESULTS is the same rule as a query, used
+# by the backfill and the consistency check; it adds the totals of archived
+# games (see database/retention.py) from archived_player_stats.
+# player_totals is player_stats summed over modes (_TOTALS_FROM_STATS); every
+# game updates both in the same transaction.
+_STATS_UPSERT = """
+    INSERT INTO {table} (name, game_mode, wins, losses, draws, last_game) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (name, game_mode) DO UPDATE SET
+        wins = wins + excluded.wins,
+        losses = losses + excluded.losses,
+        draws = draws + excluded.draws,
+        last_game = MAX(COALESCE(last_game, ''), excluded.last_game)
+"""
+
+_TOTALS_UPSERT = """
+    INSERT INTO player_totals (name, wins, losses, draws, last_game) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (name) DO UPDATE SET
+        wins = wins + excluded.wins,
+        losses = losses + excluded.losses,
+        draws = draws + excluded.draws,
+        last_game = MAX(COALESCE(last_game, ''), excluded.last_game)
+"""
+
+_TOTALS_FROM_STATS = """
+    SELECT name, SUM(wins), SUM(losses), SUM(draws), MAX(last_game)
+    FROM player_stats
+    GROUP BY name
+"""
+
+_STATS_FROM_RESULTS = """
+    WITH appearances AS (
+        SELECT winner_name AS name, COALESCE(game_mode, 'standard') AS game_mode,
+               outcome = 'win' AS won, 0 AS lost, outcome = 'draw' AS drew,
+               timestamp
+        FROM game_results
+        WHERE winner_name IS NOT NULL
+        UNION ALL
+        SELECT loser_name, COALESCE(game_mode, 'standard'),
+               0, outcome = 'win', outcome = 'draw' AND loser_name IS NOT winner_name,
+               timestamp
+        FROM game_results
+        WHERE loser_name IS NOT NULL
+        UNION ALL
+        SELECT name, game_mode, wins, losses, draws, last_game
+        FROM archived_player_stats
+    )
+    SELECT name, game_mode, SUM(won), SUM(lost), SUM(drew), MAX(timestamp)
+    FROM appearances
+    GROUP BY name, game_mode
+"""
+
+def _update_player_stats(cursor, winner_name, loser_name, outcome, game_mode, timestamp, table="player_stats"):
+    upsert = _STATS_UPSERT.format(table=table)
+    rows = []
+    is_win, is_draw = int(outcome == 'win'), int(outcome == 'draw')
+    if winner_name is not None:
+        rows.append((winner_name, is_win, 0, is_draw))
+    if loser_name is not None:
+        loser_draw = is_draw if loser_name != winner_name else 0
+        rows.append((loser_name, 0, is_win, loser_draw))
+    for name, wins, losses, draws in rows:
+        cursor.execute(upsert, (name, game_mode, wins, losses, draws, timestamp))
+        if table == "player_stats": # The archived baselines have no rollup
+            cursor.execute(_TOTALS_UPSERT, (name, wins, losses, draws, timestamp))
+
+def backfill_player_stats():
+    """Rebuilds player_stats from the full game history in one transaction."""
+    with connection() as conn, conn:
+        conn.execute("DELETE FROM player_stats")
+        conn.execute(f"INSERT INTO player_stats (name, game_mode, wins, losses, draws, last_game) {_STATS_FROM_RESULTS}")
+        count = conn.execute("SELECT COUNT(*) FROM player_stats").fetchone()[0]
+        _rebuild_player_totals(conn)
+        _bump_results_version(conn)
+    logging.info(f"Backfilled player_stats with {count} rows from game_results.")
+
+def _rebuild_player_totals(conn):
+    conn.execute("DELETE FROM player_totals")
+    conn.execute(f"INSERT INTO player_totals (name, wins, losses, draws, last_game) {_TOTALS_FROM_STATS}")
+
+def backfill_player_totals():
+    """Rebuilds the all-modes player_totals from player_stats."""
+    with connection() as conn, conn:
+        _rebuild_player_totals(conn)
+        _bump_results_version(conn)
+    logging.info("Backfilled player_totals from player_stats.")
+
+def check_player_stats():
+    """
+    Compares player_stats with totals recomputed from game_results, and
+    player_totals with player_stats. Returns the (name, game_mode) keys that
+    differ, with a game_mode of None for an all-modes total; an empty list
+    means they agree.
+    """
+    stored = "SELECT name, game_mode, wins, losses, draws, last_game FROM player_stats"
+    query = f"""
+        WITH expected AS ({_STATS_FROM_RESULTS}), stored AS ({stored})
+        SELECT name, game_mode FROM (SELECT * FROM expected EXCEPT SELECT * FROM stored)
+        UNION
+        SELECT name, game_mode FROM (SELECT * FROM stored EXCEPT SELECT * FROM expected)
+    """
+    totals = "SELECT name, wins, losses, draws, last_game FROM player_totals"
+    totals_query = f"""
+        WITH expected AS ({_TOTALS_FROM_STATS}), stored AS ({totals})
+        SELECT name, NULL FROM (SELECT * FROM expected EXCEPT SELECT * FROM stored)
+        UNION
+        SELECT name, NULL FROM (SELECT * FROM stored EXCEPT SELECT * FROM expected)
+    """
+    with connection() as conn:
+        mismatches = conn.execute(query).fetchall() + conn.execute(totals_query).fetchall()
+    if mismatches:
+        logging.warning(f"player_stats disagrees with game_results for {len(mismatches)} player/mode pairs.")
+    return mismatches
+
+# --- Leaderboard ---
+# Players are ranked by wins, then draws, then losses (all descending), then
+# name, which is exactly the order of idx_player_stats_rank within a mode
+# and of idx_player_totals_rank across all modes.
+# Pages are keyset-paginated: a page starts right after the last row of the
+# previous one, so any page of a mode is an index seek, however deep. The
+# leading `wins <= ?` / `wins >= ?` bounds are what let SQLite seek instead
+# of filtering every entry of the mode.
+_AFTER_KEY = """
+    wins <= ? AND (wins < ? OR (wins = ? AND (draws < ? OR (draws = ? AND
+    (losses < ? OR (losses = ? AND name > ?))))))
+"""
+_AHEAD_OF_KEY = """
+    wins >= ? AND (wins > ? OR (wins = ? AND (draws > ? OR (draws = ? AND
+    (losses > ? OR (losses = ? AND name < ?))))))
+"""
+MAX_LEADERBOARD_PAGE = 100
+
+def _key_params(wins, draws, losses, name):
+    return (wins, wins, wins, draws, draws, losses, losses, name)
+
+def encode_leaderboard_cursor(entry):
+    """The opaque token that resumes a leaderboard right after `entry`."""
+    return f"{entry['rank']}:{entry['wins']}:{entry['draws']}:{entry['losses']}:{entry['name']}"
+
+def _decode_leaderboard_cursor(cursor):
+    try:
+        rank, wins, draws, losses, name = cursor.split(":", 4)
+        return int(rank), int(wins), int(draws), int(losses), name
+    except ValueError:
+        raise ValueError(f"Invalid leaderboard cursor: {cursor!r}") from None
+
+def get_leaderboard(limit=10, game_mode=None, after=None):
+    """
+    Returns up to `limit` players, ranked by wins, then draws, then losses.
+    Reads the running totals in player_stats (or, for all modes, player_totals),
+    so the cost does not grow with the number of games played: every page is
+    an indexed seek. `after` is the `cursor` of the last entry of the previous
+    page; a malformed cursor raises ValueError.
+    """
+    limit = max(1, min(limit, MAX_LEADERBOARD_PAGE))
+    start_rank, key_params, key_filter = 0, (), ""
+    if after is not None:
+        start_rank, *key = _decode_leaderboard_cursor(after)
+        key_params, key_filter = _key_params(*key), f"AND {_AFTER_KEY}"
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        if game_mode is not None:
+            cursor.execute(f"""
+                SELECT name, wins, losses, draws, last_game
+                FROM player_stats
+                WHERE game_mode = ? {key_filter}
+                ORDER BY wins DESC, draws DESC, losses DESC, name ASC
+                LIMIT ?
+            """, (game_mode, *key_params, limit))
         else:
-            win_percentage = 0.0
+            cursor.execute(f"""
+                SELECT name, wins, losses, draws, last_game
+                FROM player_totals
+                WHERE 1 {key_filter}
+                ORDER BY wins DESC, draws DESC, losses DESC, name ASC
+                LIMIT ?
+            """, (*key_params, limit))
+        rows = cursor.fetchall()
 
-        # Get last game played date
-        cursor.execute("SELECT MAX(timestamp) FROM game_results WHERE winner_name = ? OR loser_name = ?", (name, name))
-        last_timestamp = cursor.fetchone()[0]
+    return [_leaderboard_entry(rank, *row) for rank, row in enumerate(rows, start=start_rank + 1)]
 
-        # Format the date
-        try:
-            if last_timestamp:
-                last_game_date = datetime.fromisoformat(last_timestamp).strftime("%Y-%m-%d")
-            else:
-                last_game_date = "N/A"
-        except (ValueError, AttributeError):
+def get_player_rank(name, game_mode):
+    """
+    Returns `name`'s leaderboard entry in `game_mode` (with its rank and rating), or None
+    if they have not played that mode. The rank counts the entries ahead of
+    the player in idx_player_stats_rank: an index-only range count, with no
+    sort and no table reads.
+    """
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT wins, losses, draws, last_game FROM player_stats WHERE name = ? AND game_mode = ?",
+            (name, game_mode)
+        ).fetchone()
+        if row is None:
+            return None
+        wins, losses, draws, last_game = row
+        ahead = conn.execute(
+            f"SELECT COUNT(*) FROM player_stats WHERE game_mode = ? AND {_AHEAD_OF_KEY}",
+            (game_mode, *_key_params(wins, draws, losses, name))
+        ).fetchone()[0]
+        rating = _rating_row(conn.cursor(), name, game_mode)[0]
+    entry = _leaderboard_entry(ahead + 1, name, wins, losses, draws, last_game)
+    entry["rating"] = round(rating)
+    return entry
+
+def get_player_ranks(name):
+    """Returns `name`'s ranked entry in every mode they have played, keyed by mode, or None if there are none."""
+    with connection() as conn:
+        modes = [row[0] for row in conn.execute("SELECT game_mode FROM player_stats WHERE name = ? ORDER BY game_mode", (name,))]
+    return {game_mode: get_player_rank(name, game_mode) for game_mode in modes} or None
+
+def _leaderboard_entry(rank, name, wins, losses, draws, last_timestamp):
+    # Calculate total games and win percentage
+    total_games = wins + losses + draws
+    if total_games > 0:
+        win_percentage = round((wins / total_games) * 100, 2)
+    else:
+        win_percentage = 0.0
+
+    # Format the date
+    try:
+        if last_timestamp:
+            last_game_date = datetime.fromisoformat(last_timestamp).strftime("%Y-%m-%d")
+        else:
             last_game_date = "N/A"
+    except (ValueError, AttributeError):
+        last_game_date = "N/A"
 
-        leaderboard.append({
-            "name": name,
-            "wins": wins,
-            "losses": losses,
-            "draws": draws,
-            "win_percentage": win_percentage,
-            "last_game_date": last_game_date
-        })
+    entry = {
+        "name": name,
+        "wins": wins,
+        "losses": losses,
+        "draws": draws,
+        "win_percentage": win_percentage,
+        "last_game_date": last_game_date,
+        "rank": rank
+    }
+    entry["cursor"] = encode_leaderboard_cursor(entry)
+    return entry
 
-    conn.close()
+# --- Ratings ---
+_RATING_UPSERT = """
+    INSERT INTO {table} (name, game_mode, rating, games) VALUES (?, ?, ?, 1)
+    ON CONFLICT (name, game_mode) DO UPDATE SET rating = excluded.rating, games = games + 1
+"""
 
-    # Sort by wins (descending), then draws (descending), then losses (descending)
-    leaderboard.sort(key=lambda x: (-x['wins'], -x['draws'], -x['losses']))
+def _rating_row(cursor, name, game_mode, table="player_ratings"):
+    cursor.execute(f"SELECT rating, games FROM {table} WHERE name = ? AND game_mode = ?", (name, game_mode))
+    return cursor.fetchone() or (ratings.INITIAL_RATING, 0)
 
-    # Limit to top 10 players
-    leaderboard = leaderboard[:10]
+def _update_ratings(cursor, winner_name, loser_name, outcome, game_mode, table="player_ratings"):
+    """Applies one game to both players' ratings: two primary-key reads and two upserts."""
+    if winner_name is None or loser_name is None or winner_name == loser_name:
+        return # Nobody to rate against
+    winner_rating, loser_rating = ratings.rate_game(
+        _rating_row(cursor, winner_name, game_mode, table),
+        _rating_row(cursor, loser_name, game_mode, table),
+        draw=outcome == 'draw'
+    )
+    upsert = _RATING_UPSERT.format(table=table)
+    cursor.execute(upsert, (winner_name, game_mode, winner_rating))
+    cursor.execute(upsert, (loser_name, game_mode, loser_rating))
 
-    # Add ranks
-    for i, player in enumerate(leaderboard):
-        player['rank'] = i + 1
+def rebuild_ratings():
+    """
+    Recomputes every rating by replaying game_results in timestamp order, in
+    one transaction. Games are streamed from the timestamp index and applied
+    with the same update as record_game_result, so memory stays constant
+    however long the history is, and the result matches incremental updates.
+    Replay starts from the ratings reached by the archived games.
+    """
+    with connection() as conn, conn:
+        conn.execute("DELETE FROM player_ratings")
+        conn.execute("INSERT INTO player_ratings (name, game_mode, rating, games) SELECT name, game_mode, rating, games FROM archived_player_ratings")
+        writer = conn.cursor()
+        games = conn.execute("""
+            SELECT winner_name, loser_name, outcome, COALESCE(game_mode, 'standard')
+            FROM game_results
+            ORDER BY timestamp, id
+        """)
+        count = 0
+        for winner_name, loser_name, outcome, game_mode in games:
+            _update_ratings(writer, winner_name, loser_name, outcome, game_mode)
+            count += 1
+        _bump_results_version(conn)
+    logging.info(f"Rebuilt player_ratings from {count} games.")
 
-    return leaderboard
+def get_player_rating(name, game_mode):
+    """The player's current rating in `game_mode`; INITIAL_RATING if they have no rated games."""
+    with connection() as conn:
+        return _rating_row(conn.cursor(), name, game_mode)[0]
 
-def get_games_played_per_day(days_limit=7):
+def get_rating_leaderboard(game_mode, limit=10, after=None):
+    """
+    Returns up to `limit` players of `game_mode`, highest rating first.
+    Keyset-paginated like get_leaderboard: `after` is the `cursor` of the
+    previous page's last entry, and every page is a seek on idx_player_ratings_rank.
+    """
+    limit = max(1, min(limit, MAX_LEADERBOARD_PAGE))
+    start_rank, key_params, key_filter = 0, (), ""
+    if after is not None:
+        try:
+            rank, rating, name = after.split(":", 2)
+            start_rank, rating = int(rank), float(rating)
+        except ValueError:
+            raise ValueError(f"Invalid rating cursor: {after!r}") from None
+        key_params, key_filter = (rating, rating, rating, name), "AND rating <= ? AND (rating < ? OR (rating = ? AND name > ?))"
+    with connection() as conn:
+        rows = conn.execute(f"""
+            SELECT name, rating, games
+            FROM player_ratings
+            WHERE game_mode = ? {key_filter}
+            ORDER BY rating DESC, name ASC
+            LIMIT ?
+        """, (game_mode, *key_params, limit)).fetchall()
+    return [
+        # repr() keeps the float exact, so the cursor resumes precisely after this row
+        {"name": name, "rating": round(rating), "games": games, "rank": rank, "cursor": f"{rank}:{rating!r}:{name}"}
+        for rank, (name, rating, games) in enumerate(rows, start=start_rank + 1)
+    ]
+
+# --- Daily Game Counts ---
+# daily_game_counts holds the number of games per (day, game_mode), where day
+# is the date part of the ISO timestamp, i.e. what DATE(timestamp) returns.
+_DAILY_COUNT_UPSERT = """
+    INSERT INTO {table} (day, game_mode, games) VALUES (?, ?, 1)
+    ON CONFLICT (day, game_mode) DO UPDATE SET games = games + 1
+"""
+
+def backfill_daily_game_counts():
+    """Rebuilds daily_game_counts from the full game history (including archived counts) in one transaction."""
+    with connection() as conn, conn:
+        conn.execute("DELETE FROM daily_game_counts")
+        conn.execute("""
+            INSERT INTO daily_game_counts (day, game_mode, games)
+            SELECT day, game_mode, SUM(games) FROM (
+                SELECT DATE(timestamp) AS day, COALESCE(game_mode, 'standard') AS game_mode, COUNT(*) AS games
+                FROM game_results
+                GROUP BY 1, 2
+                UNION ALL
+                SELECT day, game_mode, games FROM archived_daily_game_counts
+            )
+            GROUP BY 1, 2
+        """)
+        count = conn.execute("SELECT COUNT(*) FROM daily_game_counts").fetchone()[0]
+        _bump_results_version(conn)
+    logging.info(f"Backfilled daily_game_counts with {count} rows from game_results.")
+
+def get_games_played_per_day(days_limit=7, game_mode=None):
     """
     Counts the number of games played per day for the last N days.
 
     Args:
-        days_limit (int): The number of past days to retrieve data for.
+        days_limit (int): The number of past days to retrieve data for, or None for every day on record.
+        game_mode (str): Only count games of this mode; all modes by default.
 
     Returns:
-        list: A list of dictionaries, e.g., [{"date": "YYYY-MM-DD", "count": N}].
+        list: A list of dictionaries, e.g.,
+              [{"date": "YYYY-MM-DD", "count": N, "modes": {"standard": n, ...}}].
     """
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    # The query groups by the date part of the timestamp and counts the entries.
-    # It filters for records within the specified date range.
-    query = """
-        SELECT
-            DATE(timestamp) as game_date,
-            COUNT(*) as game_count
-        FROM
-            game_results
-        WHERE
-            DATE(timestamp) >= DATE('now', '-' || ? || ' days')
-        GROUP BY
-            game_date
-        ORDER BY
-            game_date ASC;
-    """
-    
-    cursor.execute(query, (days_limit,))
-    
-    rows = cursor.fetchall()
-    conn.close()
-    
-    # Format the data for the API response
-    games_per_day = [{"date": row[0], "count": row[1]} for row in rows]
-    
+    # Reads the daily rollup: at most one row per day and mode, however many games were played.
+    conditions, params = [], []
+    if days_limit is not None:
+        conditions.append("day >= DATE('now', '-' || ? || ' days')")
+        params.append(days_limit)
+    if game_mode is not None:
+        conditions.append("game_mode = ?")
+        params.append(game_mode)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"SELECT day, game_mode, games FROM daily_game_counts {where} ORDER BY day ASC"
+
+    with connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    # Format the data for the API response, one entry per day with its per-mode breakdown
+    games_per_day = []
+    for day, mode, games in rows:
+        if not games_per_day or games_per_day[-1]["date"] != day:
+            games_per_day.append({"date": day, "count": 0, "modes": {}})
+        games_per_day[-1]["count"] += games
+        games_per_day[-1]["modes"][mode] = games
+
     return games_per_day
+
+# --- Bulk Export / Import ---
+# Exports read game_results in (timestamp, id) order in chunks. Each chunk is
+# its own short read that seeks on the timestamp index, right after the last
+# row of the previous chunk, so no read transaction stays open (and holds back
+# WAL checkpoints) while the caller writes out a large export. Imports commit
+# in batches, so the game server's writer only ever waits for one batch.
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '5000'))
+IMPORT_BATCH_ROWS = int(os.getenv('IMPORT_BATCH_ROWS', '5000'))
+RESULT_COLUMNS = ("id", "winner_name", "loser_name", "outcome", "game_mode", "timestamp")
+
+def iter_game_results(since=None, until=None, game_mode=None, chunk_rows=EXPORT_CHUNK_ROWS, through_id=None):
+    """
+    Streams game results as tuples in RESULT_COLUMNS order, oldest first.
+    `since` (inclusive) and `until` (exclusive) are ISO dates or timestamps;
+    `through_id` leaves out results recorded after that id.
+    Memory use is one chunk, however many rows match.
+    """
+    conditions, params = ["(timestamp, id) > (?, ?)"], []
+    if through_id is not None:
+        conditions.append("id <= ?")
+        params.append(through_id)
+    if until is not None:
+        conditions.append("timestamp < ?")
+        params.append(until)
+    if game_mode is not None:
+        conditions.append("COALESCE(game_mode, 'standard') = ?")
+        params.append(game_mode)
+    query = f"""
+        SELECT id, winner_name, loser_name, outcome, COALESCE(game_mode, 'standard'), timestamp
+        FROM game_results
+        WHERE {' AND '.join(conditions)}
+        ORDER BY timestamp, id
+        LIMIT ?
+    """
+    last_key = (since or "", 0)
+    while True:
+        with connection() as conn:
+            rows = conn.execute(query, (*last_key, *params, chunk_rows)).fetchall()
+        yield from rows
+        if len(rows) < chunk_rows:
+            return
+        last_key = (rows[-1][5], rows[-1][0])
+
+def import_game_results(results, batch_rows=IMPORT_BATCH_ROWS):
+    """
+    Inserts an iterable of result dicts (keys as in RESULT_COLUMNS; `id` and
+    `game_mode` are optional) and keeps every summary table up to date.
+    Imported games get new ids; the source `id` only identifies a row in
+    the database it came from. A game already recorded (same timestamp,
+    players, outcome and mode) is skipped, so an interrupted import can
+    simply be run again. A malformed row raises ValueError; the batches
+    before it stay committed. Returns (imported, skipped).
+    """
+    imported = skipped = 0
+    batch = []
+    for number, result in enumerate(results, start=1):
+        batch.append(_import_row(number, result))
+        if len(batch) >= batch_rows:
+            added = _import_batch(batch)
+            imported, skipped, batch = imported + added, skipped + len(batch) - added, []
+    if batch:
+        added = _import_batch(batch)
+        imported, skipped = imported + added, skipped + len(batch) - added
+    logging.info(f"Imported {imported} game results; skipped {skipped} already recorded.")
+    return imported, skipped
+
+def _import_row(number, result):
+    try:
+        outcome = result["outcome"]
+        timestamp = datetime.fromisoformat(result["timestamp"]).isoformat()
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Row {number} is not a valid game result: {e}") from None
+    if outcome not in ("win", "draw"):
+        raise ValueError(f"Row {number} has an unknown outcome: {outcome!r}")
+    # CSV has no null, so empty names are read as missing players.
+    winner_name = result.get("winner_name") or None
+    loser_name = result.get("loser_name") or None
+    return (winner_name, loser_name, outcome, result.get("game_mode") or "standard", timestamp)
+
+def _import_batch(batch):
+    added = 0
+    with connection() as conn, conn:
+        cursor = conn.cursor()
+        for winner_name, loser_name, outcome, game_mode, timestamp in batch:
+            # A seek on idx_game_results_timestamp; rows added earlier in the batch count too.
+            cursor.execute("""
+                SELECT 1 FROM game_results
+                WHERE timestamp = ? AND winner_name IS ? AND loser_name IS ? AND outcome = ?
+                  AND COALESCE(game_mode, 'standard') = ?
+                LIMIT 1
+            """, (timestamp, winner_name, loser_name, outcome, game_mode))
+            if cursor.fetchone() is None:
+                _insert_game_result(cursor, winner_name, loser_name, outcome, game_mode, timestamp)
+                added += 1
+        _bump_results_version(cursor)
+    return added
+
+# --- Archival ---
+# Used by database/retention.py, which writes results to archive files first.
+def get_last_result_id():
+    with connection() as conn:
+        return conn.execute("SELECT MAX(id) FROM game_results").fetchone()[0] or 0
+
+def get_archivable_months(before):
+    """The 'YYYY-MM' months that still have results older than `before`, oldest first."""
+    with connection() as conn:
+        rows = conn.execute(
+            "SELECT DISTINCT substr(timestamp, 1, 7) FROM game_results WHERE timestamp < ? ORDER BY 1",
+            (before,)
+        ).fetchall()
+    return [row[0] for row in rows]
+
+def delete_archived_results(rows):
+    """
+    Deletes results (tuples from iter_game_results) that are safely archived,
+    in one transaction, and counts them in the archived_* baselines. The
+    summaries themselves are untouched: they already include these games.
+    Rows must arrive in timestamp order, like rebuild_ratings replays them.
+    """
+    with connection() as conn, conn:
+        cursor = conn.cursor()
+        for result_id, winner_name, loser_name, outcome, game_mode, timestamp in rows:
+            cursor.execute("DELETE FROM game_results WHERE id = ?", (result_id,))
+            if cursor.rowcount == 1:
+                _apply_to_summaries(cursor, winner_name, loser_name, outcome, game_mode, timestamp, prefix="archived_")
+        _bump_results_version(cursor)
+
+def incremental_vacuum(pages):
+    """
+    Returns up to `pages` free pages to the file system in one short write
+    transaction; returns how many free pages are left. Needs auto_vacuum=INCREMENTAL.
+    """
+    with connection() as conn:
+        # executescript() steps the pragma to completion; execute() would free a single page.
+        conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+        return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+def uses_incremental_vacuum():
+    """True if the database is in auto_vacuum=INCREMENTAL mode (every database created since it became the default)."""
+    with connection() as conn:
+        return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+def enable_incremental_vacuum():
+    """
+    Switches a database created before incremental vacuuming to
+    auto_vacuum=INCREMENTAL. That needs one full VACUUM, which locks the
+    database while it runs, so it is only ever run on request
+    (run_retention.py --enable-incremental-vacuum). Returns True if it ran.
+    """
+    if uses_incremental_vacuum():
+        return False
+    with connection() as conn:
+        logging.info("Switching the database to incremental vacuum; running a one-time full VACUUM.")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return True
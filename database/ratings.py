@@ -0,0 +1,35 @@
+"""
+Elo ratings.
+Every player starts at INITIAL_RATING in each mode. After a game, each side
+moves by K * (actual score - expected score), where a win scores 1 and a draw
+0.5. New players use a larger K, so their first games place them quickly.
+Updating a rating needs only the two players' current ratings and game
+counts, so a game costs O(1) however long the history is.
+"""
+import os
+
+INITIAL_RATING = float(os.getenv('RATING_INITIAL', '1500'))
+PROVISIONAL_GAMES = 30 # Games played before a rating counts as established
+K_PROVISIONAL = 40
+K_ESTABLISHED = 20
+
+def expected_score(rating, opponent_rating):
+    """Probability-like score `rating` is expected to take from `opponent_rating` (0 to 1)."""
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+def k_factor(games):
+    return K_PROVISIONAL if games < PROVISIONAL_GAMES else K_ESTABLISHED
+
+def rate_game(winner, loser, draw=False):
+    """
+    Returns the new (winner_rating, loser_rating) after a game.
+    `winner` and `loser` are (rating, games_played) pairs; with `draw` the
+    two sides are simply the two players.
+    """
+    (winner_rating, winner_games), (loser_rating, loser_games) = winner, loser
+    score = 0.5 if draw else 1.0
+    expected = expected_score(winner_rating, loser_rating)
+    return (
+        winner_rating + k_factor(winner_games) * (score - expected),
+        loser_rating + k_factor(loser_games) * (expected - score),
+    )
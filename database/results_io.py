@@ -0,0 +1,73 @@
+"""
+Streaming NDJSON / CSV encoding of game results, optionally gzip-compressed.
+Encoders turn an iterator of result rows into an iterator of byte blocks of
+about BLOCK_BYTES, and decoders turn an open file back into result dicts one
+line at a time, so exports and imports of any size use constant memory.
+Used by run_results_transfer.py and the API's /export/game_results.
+"""
+import csv
+import gzip
+import io
+import json
+import zlib
+from database.database import RESULT_COLUMNS
+
+FORMATS = ("ndjson", "csv")
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+BLOCK_BYTES = 64 * 1024
+
+def encode(rows, fmt):
+    """Yields the rows (tuples in RESULT_COLUMNS order) as UTF-8 blocks of NDJSON lines or CSV with a header."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(RESULT_COLUMNS)
+        write = writer.writerow
+    else:
+        write = lambda row: buffer.write(json.dumps(dict(zip(RESULT_COLUMNS, row)), separators=(",", ":")) + "\n")
+    for row in rows:
+        write(row)
+        if buffer.tell() >= BLOCK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def gzip_blocks(blocks, level=6):
+    """Compresses a stream of byte blocks into one gzip stream, block by block."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31) # wbits 31: gzip header and trailer
+    for block in blocks:
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def decode(text_file, fmt):
+    """Yields one result dict per NDJSON line or CSV record of an open text file."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    if fmt == "csv":
+        yield from csv.DictReader(text_file)
+        return
+    for number, line in enumerate(text_file, start=1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number} is not valid JSON: {e}") from None
+
+def open_text(path):
+    """Opens an export for reading, transparently decompressing gzip files."""
+    with open(path, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+    if compressed:
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+def format_for(path):
+    """Guesses the format from a file name such as results.csv.gz; NDJSON otherwise."""
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.endswith(".csv") else "ndjson"
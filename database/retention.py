@@ -0,0 +1,122 @@
+"""
+Retention for game_results.
+Results older than RESULTS_RETENTION_DAYS are moved out of the database into
+gzip-compressed NDJSON archives, one or more files per month. The archive
+month must have ended before the horizon, so a month is archived whole. For
+each month the job:
+
+  1. streams the month's rows into a temporary file, fsyncs it and renames
+     it into place, so an archive file is either complete or absent;
+  2. deletes those rows in short batches. Each batch also adds the rows to the
+     archived_* baselines, so stats checks, backfills and rating rebuilds
+     still cover the archived games;
+  3. afterwards, returns the freed pages to the file system in small
+     incremental-vacuum steps. A database created before auto_vacuum was
+     INCREMENTAL keeps its free pages for reuse until it is switched over
+     once, in a maintenance window (run_retention.py --enable-incremental-vacuum).
+
+The live summaries (player_stats, daily_game_counts, player_ratings) are
+never touched, so the leaderboard and game stats do not change. Writers only
+ever wait for one short batch. If the job is interrupted after writing a
+file, the next run archives the remaining rows into a new file, so a result
+can appear in two files; run_results_transfer.py import skips a game it
+has already recorded, so loading both files elsewhere counts it once.
+
+Run `python3 run_retention.py`, e.g. daily from cron.
+"""
+import logging
+import os
+import time
+from datetime import date, timedelta
+from database import database, results_io
+
+RESULTS_RETENTION_DAYS = int(os.getenv('RESULTS_RETENTION_DAYS', '365'))
+RESULTS_ARCHIVE_DIR = os.getenv('RESULTS_ARCHIVE_DIR', 'database/archive')
+RETENTION_DELETE_BATCH_ROWS = int(os.getenv('RETENTION_DELETE_BATCH_ROWS', '500'))
+VACUUM_STEP_PAGES = int(os.getenv('VACUUM_STEP_PAGES', '1000'))
+# SQLite's busy handler backs off with growing sleeps, so a writer waiting out
+# one batch would keep missing the gap before the next. Pausing between
+# batches gives it time to get in.
+RETENTION_PAUSE_SECONDS = float(os.getenv('RETENTION_PAUSE_SECONDS', '0.05'))
+
+def retention_cutoff(retention_days=RESULTS_RETENTION_DAYS, today=None):
+    """First day of the month containing the horizon: every earlier month is archived whole."""
+    horizon = (today or date.today()) - timedelta(days=retention_days)
+    return horizon.replace(day=1).isoformat()
+
+def _next_month(month):
+    year, month = int(month[:4]), int(month[5:7])
+    return f"{year + month // 12:04d}-{month % 12 + 1:02d}-01"
+
+def _write_archive(month, rows, archive_dir):
+    """Streams `rows` into a new archive file for `month`; returns (path, count), or (None, 0) if there were none."""
+    counted = {"rows": 0, "first": None, "last": None}
+    def tracked(rows):
+        for row in rows:
+            counted["rows"] += 1
+            counted["first"] = counted["first"] or row[0]
+            counted["last"] = row[0]
+            yield row
+
+    os.makedirs(archive_dir, exist_ok=True)
+    temporary = os.path.join(archive_dir, f".game_results-{month}.tmp")
+    with open(temporary, "wb") as f:
+        for block in results_io.gzip_blocks(results_io.encode(tracked(rows), "ndjson")):
+            f.write(block)
+        f.flush()
+        os.fsync(f.fileno())
+    if not counted["rows"]:
+        os.remove(temporary)
+        return None, 0
+    # First and last id name the file, so a later run for the same month never overwrites it.
+    path = os.path.join(archive_dir, f"game_results-{month}.{counted['first']}-{counted['last']}.ndjson.gz")
+    os.replace(temporary, path)
+    directory = os.open(archive_dir, os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+    return path, counted["rows"]
+
+def archive_month(month, through_id, archive_dir=RESULTS_ARCHIVE_DIR):
+    """Archives, then deletes, every result of `month` up to `through_id`. Returns the number of rows moved."""
+    since, until = f"{month}-01", _next_month(month)
+    path, count = _write_archive(month, database.iter_game_results(since, until, through_id=through_id), archive_dir)
+    if not count:
+        return 0
+    batch = []
+    for row in database.iter_game_results(since, until, through_id=through_id, chunk_rows=RETENTION_DELETE_BATCH_ROWS):
+        batch.append(row)
+        if len(batch) >= RETENTION_DELETE_BATCH_ROWS:
+            database.delete_archived_results(batch)
+            batch = []
+            time.sleep(RETENTION_PAUSE_SECONDS)
+    if batch:
+        database.delete_archived_results(batch)
+    logging.info(f"Archived {count} results from {month} to {path}")
+    return count
+
+def vacuum():
+    """Frees deleted pages a step at a time, so writers get the database between steps."""
+    remaining = database.incremental_vacuum(VACUUM_STEP_PAGES)
+    while remaining:
+        time.sleep(RETENTION_PAUSE_SECONDS)
+        left = database.incremental_vacuum(VACUUM_STEP_PAGES)
+        if left >= remaining:
+            break # Nothing more can be freed (e.g. pages freed by concurrent writers are reused)
+        remaining = left
+
+def run_retention(retention_days=RESULTS_RETENTION_DAYS, archive_dir=RESULTS_ARCHIVE_DIR, today=None):
+    """Archives every month before the retention horizon and compacts the database; returns the rows moved."""
+    cutoff = retention_cutoff(retention_days, today)
+    # Results recorded while the job runs are left for the next run.
+    through_id = database.get_last_result_id()
+    moved = 0
+    for month in database.get_archivable_months(cutoff):
+        moved += archive_month(month, through_id, archive_dir)
+    if moved and database.uses_incremental_vacuum():
+        vacuum()
+    elif moved:
+        logging.warning("Freed pages stay in the database file for reuse; run `run_retention.py --enable-incremental-vacuum` once to return them to the file system.")
+    logging.info(f"Retention: moved {moved} results older than {cutoff} to {archive_dir}")
+    return moved
@@ -6,10 +6,15 @@ project_root = os.path.abspath(os.path.dirname(__file__))
 sys.path.insert(0, project_root)
 
 from api.api_server import app
+from database import database
 from server.config import HOST, API_PORT
 
 if __name__ == "__main__":
     print(f"Starting the Tic-Tac-Toe API Server on http://{HOST}:{API_PORT}")
     # The database is initialized by the main game server,
     # but for standalone testing, you might add database.initialize_database() here.
-    app.run(host=HOST, port=API_PORT)
+    try:
+        app.run(host=HOST, port=API_PORT)
+    finally:
+        # The last connection to close checkpoints the WAL back into the database file.
+        database.close_connections()
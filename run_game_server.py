@@ -6,11 +6,15 @@ import os
 project_root = os.path.abspath(os.path.dirname(__file__))
 sys.path.insert(0, project_root)
 
-from server.main import main_async
+from server.main import main_async, run_workers
 
 if __name__ == "__main__":
+    num_workers = int(os.getenv('GAME_SERVER_WORKERS', '1'))
     try:
         print("Starting the Tic-Tac-Toe Game Server...")
-        asyncio.run(main_async())
+        if num_workers > 1:
+            run_workers(num_workers)
+        else:
+            asyncio.run(main_async())
     except KeyboardInterrupt:
         print("Game Server shutting down.")
@@ -0,0 +1,24 @@
+import sys
+import os
+import logging
+
+# Add the project root to the Python path to allow for absolute imports
+project_root = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from database import database
+
+if __name__ == "__main__":
+    # Usage: python3 run_player_stats_check.py [--repair]
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    database.initialize_database()
+    mismatches = database.check_player_stats()
+    if not mismatches:
+        print("player_stats matches game_results.")
+        sys.exit(0)
+    for name, game_mode in mismatches[:20]:
+        print(f"Mismatch: {name} ({game_mode or 'all modes'})")
+    if "--repair" in sys.argv:
+        database.backfill_player_stats()
+        sys.exit(0 if not database.check_player_stats() else 1)
+    sys.exit(1)
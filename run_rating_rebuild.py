@@ -0,0 +1,17 @@
+import sys
+import os
+import logging
+
+# Add the project root to the Python path to allow for absolute imports
+project_root = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from database import database
+
+if __name__ == "__main__":
+    # Usage: python3 run_rating_rebuild.py
+    # Replays every game in timestamp order to recompute player_ratings,
+    # e.g. after changing the rating constants in database/ratings.py.
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    database.initialize_database()
+    database.rebuild_ratings()
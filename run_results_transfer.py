@@ -0,0 +1,63 @@
+import sys
+import os
+import argparse
+import logging
+
+# Add the project root to the Python path to allow for absolute imports
+project_root = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from database import database, results_io
+
+def export_results(args):
+    rows = database.iter_game_results(args.since, args.until, args.game_mode)
+    blocks = results_io.encode(rows, args.format)
+    if args.gzip:
+        blocks = results_io.gzip_blocks(blocks)
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for block in blocks:
+            out.write(block)
+    finally:
+        if args.output:
+            out.close()
+
+def import_results(args):
+    with results_io.open_text(args.input) as f:
+        database.import_game_results(results_io.decode(f, args.format or results_io.format_for(args.input)))
+    if args.rebuild_ratings:
+        database.rebuild_ratings()
+
+if __name__ == "__main__":
+    # Usage:
+    #   python3 run_results_transfer.py export [--format csv] [--since 2026-01-01] [--until 2026-02-01] [--game-mode standard] [--gzip] [-o FILE]
+    #   python3 run_results_transfer.py import FILE [--format csv] [--rebuild-ratings]
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stderr)
+    parser = argparse.ArgumentParser(description="Stream game results to or from NDJSON / CSV files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Write game results to a file or stdout")
+    export_parser.add_argument("--format", choices=results_io.FORMATS, default="ndjson")
+    export_parser.add_argument("--since", help="First date or ISO timestamp to include")
+    export_parser.add_argument("--until", help="Date or ISO timestamp to stop before")
+    export_parser.add_argument("--game-mode")
+    export_parser.add_argument("--gzip", action="store_true", help="Compress the output")
+    export_parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    export_parser.set_defaults(run=export_results)
+
+    import_parser = commands.add_parser("import", help="Add game results from a file (plain or gzip)")
+    import_parser.add_argument("input")
+    import_parser.add_argument("--format", choices=results_io.FORMATS, help="Default: from the file name")
+    import_parser.add_argument(
+        "--rebuild-ratings", action="store_true",
+        help="Replay all ratings afterwards; needed when the imported games are older than ones already recorded"
+    )
+    import_parser.set_defaults(run=import_results)
+
+    args = parser.parse_args()
+    database.initialize_database()
+    try:
+        args.run(args)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,27 @@
+import sys
+import os
+import argparse
+import logging
+
+# Add the project root to the Python path to allow for absolute imports
+project_root = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from database import database, retention
+
+if __name__ == "__main__":
+    # Usage: python3 run_retention.py [retention_days] [--enable-incremental-vacuum]
+    # Moves game results older than the retention horizon into monthly archives
+    # under RESULTS_ARCHIVE_DIR and compacts the database. Safe to run while the servers are up.
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Archive old game results and compact the database.")
+    parser.add_argument("retention_days", nargs="?", type=int, default=retention.RESULTS_RETENTION_DAYS)
+    parser.add_argument(
+        "--enable-incremental-vacuum", action="store_true",
+        help="First switch an older database to incremental vacuum; runs one full VACUUM that locks the database"
+    )
+    args = parser.parse_args()
+    database.initialize_database()
+    if args.enable_incremental_vacuum:
+        database.enable_incremental_vacuum()
+    retention.run_retention(args.retention_days)
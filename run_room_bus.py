@@ -0,0 +1,19 @@
+import asyncio
+import logging
+import sys
+import os
+
+# Add the project root to the Python path to allow for absolute imports
+project_root = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from server.room_bus import LocalSocketBusHub
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    path = os.getenv('ROOM_BUS_SOCKET', '/tmp/tic-tac-toe-room-bus.sock')
+    try:
+        print(f"Starting the Tic-Tac-Toe room bus hub on {path}")
+        asyncio.run(LocalSocketBusHub(path).serve_forever())
+    except KeyboardInterrupt:
+        print("Room bus hub shutting down.")
@@ -1,10 +1,7 @@
 import asyncio
 import logging
 import time
-import os
 from typing import Dict, Optional
-from database import database
-from server.protocol import GameState, GameStateResponse, to_dict
 from server.ai_logic import find_best_move
 from server.game_room import Game
 
@@ -13,33 +10,31 @@ class AIGameRoom(Game):
     Represents a Tic-Tac-Toe game against a computer opponent.
     Inherits from the base Game class but overrides move handling.
     """
+    snapshot_kind = "ai"
+    lists_in_lobby = False # Single-player rooms are never joinable
+    __slots__ = ("executor",)
+
     def __init__(self, game_id, on_empty, executor):
         super().__init__(game_id, on_empty)
         self.executor = executor
         self.player_names: Dict[str, Optional[str]] = {"X": None, "O": "Computer"}
-        # AI game is always standard, so timer is 1 minute
-        self.player_x_time_bank = float(os.getenv('PLAYER_TIMER_SECONDS_STANDARD', '60'))
-        self.player_o_time_bank = float(os.getenv('PLAYER_TIMER_SECONDS_STANDARD', '60')) # AI's timer is not really used, but we keep it for consistency
+        # Time banks come from Game._initial_time_bank(); the AI's bank is charged with its thinking time.
 
     async def add_client(self, client_conn, name):
         """Only allows one human player ('X') to join."""
-        if self.clients: # Game is already full with one player
+        if self.sessions.is_claimed("X"): # The one human seat is already taken
             return None
         
         player_symbol = "X"
-        client_conn.player_symbol = player_symbol
-        client_conn.player_name = name
-        client_conn.game_id = self.game_id
-        self.clients.add(client_conn)
-        
-        self.player_names[player_symbol] = name
+        self._seat(client_conn, player_symbol, name)
+        client_conn.session_token = self.sessions.issue(player_symbol)
         logging.info(f"[AI Game {self.game_id}] Player {name} ({player_symbol}) joined.")
         return player_symbol
 
     async def start_game(self):
         """Starts the game by broadcasting the initial state and starting the timer."""
         logging.info(f"[AI Game {self.game_id}] Starting game.")
-        self.current_turn_start_time = time.time()
+        self._start_turn_clock()
         await self.broadcast_state()
 
     async def handle_move(self, client_conn, move_data):
@@ -58,9 +53,10 @@ class AIGameRoom(Game):
             return
 
         # 1. Process the human's move
-        row, col = move_data['row'], move_data['col']
-        if self.board[row][col] is None:
-            self.board[row][col] = client_conn.player_symbol
+        row, col = move_data.row, move_data.col
+        if self.board.is_empty(row, col):
+            self.board.set(row, col, client_conn.player_symbol)
+            self._journal_move(row, col, client_conn.player_symbol)
             self._check_win()
             if not self.game_over: self._check_draw()
             
@@ -84,10 +80,8 @@ class AIGameRoom(Game):
 
         # Run the blocking AI calculation in the process pool
         loop = asyncio.get_running_loop()
-        board_copy = [row[:] for row in self.board]
-        ai_move = await loop.run_in_executor(
-            self.executor, find_best_move, board_copy
-        )
+        search, args = self._ai_search()
+        ai_move = await loop.run_in_executor(self.executor, search, *args)
 
         # --- Timer Logic for AI Player ---
         ai_thinking_time = time.time() - ai_turn_start_time
@@ -102,22 +96,39 @@ class AIGameRoom(Game):
         row, col = ai_move
         logging.info(f"[AI Game {self.game_id}] AI chose move: ({row}, {col}) after {ai_thinking_time:.2f}s")
 
-        if self.board[row][col] is None:
-            self.board[row][col] = 'O'
+        if self.board.is_empty(row, col):
+            self.board.set(row, col, 'O')
+            self._journal_move(row, col, 'O')
             self._check_win()
             if not self.game_over: self._check_draw()
 
         # Switch back to the human's turn and reset the timer
         if not self.game_over:
             self.current_player = "X"
-            self.current_turn_start_time = time.time()
+            self._start_turn_clock()
 
         await self.broadcast_state()
 
+    def _ai_search(self):
+        """The search function and its (picklable) arguments for the process pool."""
+        return find_best_move, (self.board.to_wire(),)
+
     async def restart_game(self):
         """Resets the game to its initial state."""
         await super().restart_game() # Call the parent restart logic
         # Reset AI-specific state
         self.player_names = {"X": list(self.clients)[0].player_name if self.clients else None, "O": "Computer"}
-        self.current_turn_start_time = time.time()
-        await self.broadcast_state()
\ No newline at end of file
+        self._start_turn_clock()
+        await self.broadcast_state()
+
+    @classmethod
+    async def from_snapshot(cls, snapshot, on_empty, **room_kwargs):
+        """Restores the room; if the AI was mid-move when the snapshot was taken, it moves again."""
+        game = await super().from_snapshot(snapshot, on_empty, **room_kwargs)
+        if not game.game_over and game.current_player == "O":
+            # The AI's clock is charged by _make_ai_move itself, not by the turn clock.
+            if game.turn_clock_timer:
+                game.turn_clock_timer.cancel()
+                game.turn_clock_timer = None
+            game.actor.submit(game._make_ai_move)
+        return game
@@ -0,0 +1,367 @@
+import logging
+import time
+import os
+from typing import Dict, Optional
+from server import result_writer
+from server.room_actor import RoomActor
+from server.spectators import SpectatorFanout
+from server.sessions import RoomSessions
+from server.timer_wheel import timer_wheel
+from server.lobby import lobby
+from server import move_journal
+
+class BaseRoom:
+    """
+    Everything a two-player room does apart from its rules: seats, the grace
+    period, turn clocks, spectators, resumable sessions, snapshots and
+    result recording. Game and UltimateGame add the board and move handling
+    through the hooks below.
+    """
+    snapshot_kind = None
+    game_mode = None
+    log_name = "Game" # How the room is named in log lines
+    lists_in_lobby = True # Open seats are advertised in the lobby index
+    # Slotted: a server holds many idle rooms, and per-instance dicts add up (see server.room_memory).
+    __slots__ = (
+        "game_id", "clients", "board", "current_player", "game_over", "winner", "player_names", "_on_empty",
+        "player_x_time_bank", "player_o_time_bank", "current_turn_start_time", "turn_clock_timer",
+        "grace_period_timer", "grace_period_duration", "is_in_grace_period", "grace_period_deadline",
+        "actor", "spectators", "sessions", "connections_by_symbol", "journal_serial",
+    )
+
+    def __init__(self, game_id, on_empty):
+        self.game_id = game_id
+        self.clients = set() # This will now store ClientConnection objects
+        self.board = self._new_board()
+        self.current_player = "X"
+        self.game_over = False
+        self.winner = None
+        self.player_names: Dict[str, Optional[str]] = {"X": None, "O": None}
+        self._on_empty = on_empty
+        # --- Timer State ---
+        self.player_x_time_bank = self._initial_time_bank()
+        self.player_o_time_bank = self._initial_time_bank()
+        self.current_turn_start_time = None
+        self.turn_clock_timer = None # Fires when the current player's bank runs out
+        # --- Grace Period State ---
+        self.grace_period_timer = None
+        self.grace_period_duration = float(os.getenv('GAME_GRACE_PERIOD_SECONDS', '600'))  # 10 minutes
+        self.is_in_grace_period = False
+        self.grace_period_deadline = None
+        # --- Command Queue ---
+        # All room operations run serially on this actor (see server.room_actor).
+        self.actor = RoomActor(game_id)
+        # --- Spectators ---
+        # Kept apart from `clients`: they never take a seat or keep the room alive.
+        self.spectators = SpectatorFanout(game_id)
+        # --- Resumable Sessions ---
+        self.sessions = RoomSessions()
+        self.connections_by_symbol: Dict[str, object] = {}
+        # --- Move Journal ---
+        self.journal_serial = move_journal.new_serial() # Tells this game apart from others under the same ID
+
+    # --- Rules Hooks ---
+    def _new_board(self):
+        raise NotImplementedError
+
+    def _initial_time_bank(self):
+        raise NotImplementedError
+
+    def _board_snapshot(self):
+        """The snapshot fields that hold the board."""
+        raise NotImplementedError
+
+    def _board_from_snapshot(self, snapshot):
+        raise NotImplementedError
+
+    def _encode_state(self, seq=None):
+        raise NotImplementedError
+
+    async def handle_move(self, client_conn, move_data):
+        raise NotImplementedError
+
+    # --- Client Management ---
+    def open_seat(self):
+        """
+        Returns the seat a newcomer would get, or None. A seat is open until it
+        is first taken; a player who leaves keeps theirs and can only come back
+        by resuming with their session token.
+        """
+        for player_symbol in ("X", "O"):
+            if not self.sessions.is_claimed(player_symbol):
+                return player_symbol
+        return None
+
+    async def add_client(self, client_conn, name):
+        player_symbol = self.open_seat()
+        if player_symbol is None:
+            return None
+
+        # Cancel grace period if someone joins
+        self._cancel_grace_period()
+
+        self._seat(client_conn, player_symbol, name)
+        client_conn.session_token = self.sessions.issue(player_symbol)
+        logging.info(f"[{self.log_name} {self.game_id}] Player {name} ({player_symbol}) joined.")
+        lobby.update(self)
+        return player_symbol
+
+    async def reconnect_client(self, new_client_conn, player_symbol, name):
+        """Replaces a disconnected client with a new connection."""
+        # Cancel grace period if someone reconnects
+        self._cancel_grace_period()
+
+        # Find the old, disconnected client object to remove it
+        old_client = self.connections_by_symbol.get(player_symbol)
+        if old_client and old_client is not new_client_conn:
+            self.clients.discard(old_client)
+            if old_client.game_id == self.game_id:
+                # A replaced connection that is still open must not act for the seat any more.
+                old_client.player_symbol = None
+                old_client.game_id = None
+                old_client.session_token = None
+
+        # Add the new client connection
+        self._seat(new_client_conn, player_symbol, name)
+        logging.info(f"[{self.log_name} {self.game_id}] Player {name} ({player_symbol}) reconnected.")
+        lobby.update(self)
+
+    def _seat(self, client_conn, player_symbol, name):
+        """Puts a connection in `player_symbol`'s seat; a spectator of this room stops watching."""
+        if client_conn.is_spectator:
+            self.spectators.remove(client_conn)
+            client_conn.is_spectator = False
+        client_conn.player_symbol = player_symbol
+        client_conn.player_name = name
+        client_conn.game_id = self.game_id
+        self.clients.add(client_conn)
+        self.connections_by_symbol[player_symbol] = client_conn
+        self.player_names[player_symbol] = name
+        # The clock starts once both seats are taken, however the players arrived (join, resume or reconnect).
+        if len(self.clients) == 2 and self.current_turn_start_time is None and not self.game_over:
+            self._start_turn_clock()
+
+    async def remove_client(self, client_conn):
+        if client_conn not in self.clients:
+            return # Already replaced by a reconnect
+        self.clients.remove(client_conn)
+        # Found by identity: a connection that moved on carries its new room's symbol.
+        for player_symbol, seated in list(self.connections_by_symbol.items()):
+            if seated is client_conn:
+                del self.connections_by_symbol[player_symbol]
+        logging.info(f"Client {client_conn.player_name} disconnected from {self.log_name} {self.game_id}")
+        lobby.update(self)
+
+        if not self.clients:
+            # No clients left - start grace period instead of immediate removal
+            await self._start_grace_period()
+        else:
+            # Don't end the game immediately, allow for reconnection
+            pass
+
+    # --- Grace Period ---
+    async def _start_grace_period(self, duration=None):
+        """Start grace period timer before removing empty game."""
+        if self.grace_period_timer:
+            return  # Already in grace period
+
+        if duration is None:
+            duration = self.grace_period_duration
+        self.is_in_grace_period = True
+        self.grace_period_deadline = time.time() + duration
+        logging.info(f"[{self.log_name} {self.game_id}] Starting grace period ({duration}s)")
+        self.grace_period_timer = timer_wheel.schedule(
+            duration, self.actor.submit, self._grace_period_expired
+        )
+
+    async def _grace_period_expired(self):
+        if not self.is_in_grace_period:
+            return  # Someone rejoined while the expiry was queued
+        # Timer completed, remove game
+        logging.info(f"[{self.log_name} {self.game_id}] Grace period expired, removing game")
+        self.grace_period_timer = None
+        self._on_empty(self.game_id)
+
+    def _cancel_grace_period(self):
+        """Cancel the grace period timer."""
+        if self.grace_period_timer:
+            self.grace_period_timer.cancel()
+            self.grace_period_timer = None
+            self.is_in_grace_period = False
+            logging.info(f"[{self.log_name} {self.game_id}] Grace period cancelled")
+
+    # --- Turn Clock ---
+    def _start_turn_clock(self, elapsed=0.0):
+        """
+        Starts the current player's turn and schedules a server-side flag fall.
+        `elapsed` resumes a turn that was already running (e.g. from a snapshot).
+        """
+        self.current_turn_start_time = time.time() - elapsed
+        if self.turn_clock_timer:
+            self.turn_clock_timer.cancel()
+        time_bank = self.player_x_time_bank if self.current_player == "X" else self.player_o_time_bank
+        self.turn_clock_timer = timer_wheel.schedule(
+            max(time_bank - elapsed, 0), self.actor.submit, self._check_flag_fall,
+            self.current_player, self.current_turn_start_time
+        )
+
+    async def _check_flag_fall(self, player, turn_start_time):
+        """Ends the game on time if `player` is still on the same turn and out of time."""
+        if self.game_over or self.current_player != player or self.current_turn_start_time != turn_start_time:
+            return  # The turn already ended
+        time_bank = self.player_x_time_bank if player == "X" else self.player_o_time_bank
+        remaining = time_bank - (time.time() - turn_start_time)
+        if remaining > 0:
+            # The wheel can fire up to a tick early; check again when the bank is really empty.
+            self.turn_clock_timer = timer_wheel.schedule(
+                remaining, self.actor.submit, self._check_flag_fall, player, turn_start_time
+            )
+            return
+
+        if player == "X":
+            self.player_x_time_bank = 0.0
+        else:
+            self.player_o_time_bank = 0.0
+        self.winner = "O" if player == "X" else "X"
+        self.game_over = True
+        self.turn_clock_timer = None
+        logging.info(f"[{self.log_name} {self.game_id}] Player {player} ran out of time.")
+        self._record_game_result()
+        await self.broadcast_state()
+
+    # --- Snapshots ---
+    def to_snapshot(self):
+        """Returns the room as a JSON-serializable dict, including clocks and grace state."""
+        now = time.time()
+        turn_elapsed = None
+        if self.current_turn_start_time is not None and not self.game_over:
+            turn_elapsed = now - self.current_turn_start_time
+        grace_remaining = None
+        if self.is_in_grace_period and self.grace_period_deadline is not None:
+            grace_remaining = max(self.grace_period_deadline - now, 0.0)
+        return {
+            "kind": self.snapshot_kind,
+            "game_id": self.game_id,
+            **self._board_snapshot(),
+            "current_player": self.current_player,
+            "game_over": self.game_over,
+            "winner": self.winner,
+            "player_names": self.player_names,
+            "player_x_time_bank": self.player_x_time_bank,
+            "player_o_time_bank": self.player_o_time_bank,
+            "turn_elapsed": turn_elapsed,
+            "grace_remaining": grace_remaining,
+            "sessions": self.sessions.to_snapshot(),
+            "journal_serial": self.journal_serial,
+        }
+
+    @classmethod
+    async def from_snapshot(cls, snapshot, on_empty, **room_kwargs):
+        """Rebuilds a room written by to_snapshot() and re-arms its timers."""
+        game = cls(snapshot["game_id"], on_empty, **room_kwargs)
+        game.board = game._board_from_snapshot(snapshot)
+        game.current_player = snapshot["current_player"]
+        game.game_over = snapshot["game_over"]
+        game.winner = snapshot["winner"]
+        game.player_names = snapshot["player_names"]
+        game.player_x_time_bank = snapshot["player_x_time_bank"]
+        game.player_o_time_bank = snapshot["player_o_time_bank"]
+        game.sessions.restore(snapshot["sessions"])
+        # Snapshots written before the journal had serials start a new one.
+        game.journal_serial = snapshot.get("journal_serial", game.journal_serial)
+        if snapshot["turn_elapsed"] is not None:
+            game._start_turn_clock(elapsed=snapshot["turn_elapsed"])
+        # Nobody is connected to a restored room, so it waits out a grace period for players to come back.
+        await game._start_grace_period(snapshot["grace_remaining"])
+        return game
+
+    def close(self):
+        """Releases the room's actor, spectators and timers once it is removed."""
+        self.actor.stop()
+        self.spectators.close()
+        lobby.discard(self)
+        for timer in (self.grace_period_timer, self.turn_clock_timer):
+            if timer:
+                timer.cancel()
+
+    # --- Spectators ---
+    async def add_spectator(self, client_conn):
+        if client_conn in self.clients:
+            await self.remove_client(client_conn) # A player who starts watching gives up the seat
+        # Spectators hold no seat, so nothing they send can act as a player's move.
+        client_conn.player_symbol = None
+        client_conn.game_id = self.game_id
+        client_conn.is_spectator = True
+        self.spectators.add(client_conn)
+        if not self.spectators.has_frame:
+            self.spectators.publish(self._encode_state())
+        logging.info(f"[{self.log_name} {self.game_id}] Spectator joined ({len(self.spectators)} watching).")
+
+    async def remove_spectator(self, client_conn):
+        self.spectators.remove(client_conn)
+
+    # --- Resumable Sessions ---
+    async def resume_client(self, new_client_conn, session_token, last_seq):
+        """
+        Reattaches a connection to the seat that owns `session_token`.
+        Returns the encoded state events the client missed (a single snapshot
+        if the replay buffer no longer covers the gap), or None if the token
+        is not valid for this room.
+        """
+        player_symbol = self.sessions.symbol_for(session_token)
+        if player_symbol is None:
+            return None
+        await self.reconnect_client(new_client_conn, player_symbol, self.player_names[player_symbol])
+        new_client_conn.session_token = session_token
+        missed = self.sessions.replay_since(last_seq)
+        if missed is None:
+            missed = [self._encode_state()]
+        return missed
+
+    # --- Results ---
+    def _journal_move(self, row, col, symbol):
+        """Appends the move to the binary move journal (see server.move_journal); O(1), never blocks."""
+        clock = self.player_x_time_bank if symbol == "X" else self.player_o_time_bank
+        if self.board.ply == 1:
+            move_journal.record_start(self.game_id, self.journal_serial)
+        move_journal.record_move(self.game_id, self.journal_serial, self.board.ply, row, col, symbol, clock)
+
+    def _record_game_result(self):
+        winner_name, loser_name, outcome = None, None, "draw"
+        if self.winner:
+            outcome = "win"
+            winner_name = self.player_names[self.winner]
+            loser_symbol = "O" if self.winner == "X" else "X"
+            loser_name = self.player_names[loser_symbol]
+        else:
+            winner_name, loser_name = self.player_names['X'], self.player_names['O']
+        lobby.update(self)
+        move_journal.record_result(self.game_id, self.journal_serial, self.board.ply, self.winner or 'draw')
+        result_writer.record_game_result(winner_name, loser_name, outcome, game_mode=self.game_mode)
+
+    async def restart_game(self):
+        self.board = self._new_board()
+        self.current_player = "X"
+        self.game_over = False
+        self.winner = None
+        self.journal_serial = move_journal.new_serial()
+        # Reset timers
+        self.player_x_time_bank = self._initial_time_bank()
+        self.player_o_time_bank = self._initial_time_bank()
+        self._start_turn_clock()
+        logging.info(f"[{self.log_name} {self.game_id}] Restarted.")
+        lobby.update(self)
+        await self.broadcast_state()
+
+    async def broadcast_state(self):
+        # Encode once; players and every spectator share the same message string.
+        seq = self.sessions.next_seq()
+        message = self._encode_state(seq)
+        self.sessions.record(seq, message)
+        for client_conn in self.clients:
+            try:
+                await client_conn.send_raw(message)
+            except Exception:
+                # The disconnection will be handled by the main server loop
+                pass
+        self.spectators.publish(message)
@@ -0,0 +1,40 @@
+"""
+Byte-per-cell board storage for rooms.
+A 3x3 board is a 9-byte bytearray instead of four lists, and the whole 9x9
+ultimate grid is one 81-byte bytearray instead of 9x3x3 nested lists. Rooms
+convert to the nested-list wire format only when they encode a state message.
+"""
+
+EMPTY, X, O, DRAW = 0, 1, 2, 3
+SYMBOLS = (None, "X", "O", "draw")
+CODES = {None: EMPTY, "X": X, "O": O, "draw": DRAW}
+
+class CompactBoard:
+    __slots__ = ("size", "cells")
+
+    def __init__(self, size, cells=None):
+        self.size = size
+        self.cells = bytearray(size * size) if cells is None else cells
+
+    def get(self, row, col):
+        return SYMBOLS[self.cells[row * self.size + col]]
+
+    def set(self, row, col, symbol):
+        self.cells[row * self.size + col] = CODES[symbol]
+
+    def is_empty(self, row, col):
+        return not self.cells[row * self.size + col]
+
+    def is_full(self):
+        return EMPTY not in self.cells
+
+    def subgrid(self, top, left, size=3):
+        """Returns a size x size region as nested lists, e.g. one ultimate micro-board."""
+        return [[SYMBOLS[self.cells[(top + r) * self.size + left + c]] for c in range(size)] for r in range(size)]
+
+    def to_wire(self):
+        return self.subgrid(0, 0, self.size)
+
+    @classmethod
+    def from_wire(cls, rows):
+        return cls(len(rows), bytearray(CODES[cell] for row in rows for cell in row))
@@ -2,6 +2,7 @@ import json
 import websockets
 import logging
 import asyncio
+import time
 
 class ClientConnection:
     """
@@ -16,6 +17,11 @@ class ClientConnection:
         self.player_symbol = None
         self.player_name = None
         self.registered = False
+        self.is_spectator = False
+        self.session_token = None
+        self.last_activity = time.monotonic()
+        self.idle_timer = None
+        self.relay = None # WorkerRelay when this connection's game lives on another worker
 
     @property
     def is_websocket(self) -> bool:
@@ -30,7 +36,13 @@ class ClientConnection:
         Sends a structured response to the client.
         This method uses a try...except block to handle disconnections gracefully.
         """
-        message = json.dumps(response_data)
+        await self.send_raw(json.dumps(response_data))
+
+    async def send_raw(self, message):
+        """
+        Sends an already-encoded message string.
+        Used for broadcasts, which encode once and send the same string to every client.
+        """
         try:
             if self.is_websocket:
                 await self._writer.send(message)
@@ -59,6 +71,13 @@ class ClientConnection:
             return line.decode().strip()
         raise TypeError("Unsupported client type for reading.")
 
+    async def close(self):
+        """Closes the underlying connection; the pending read then ends the handler loop."""
+        if self.is_websocket:
+            await self._writer.close()
+        elif self.is_tcp:
+            self._writer.close()
+
     def get_remote_address(self):
         """Returns the remote address of the client in a unified way."""
         if hasattr(self._writer, 'remote_address'):
@@ -66,3 +85,27 @@ class ClientConnection:
         elif hasattr(self._writer, 'get_extra_info'):
             return self._writer.get_extra_info('peername', 'Unknown')
         return "Unknown"
+
+
+class RemoteClientConnection(ClientConnection):
+    """
+    Stands in, on the node that owns a room, for a client connected to another
+    node. Everything sent to it is published on the room bus to that node.
+    """
+    def __init__(self, bus, topic, remote_id):
+        super().__init__(reader=None)
+        self._bus = bus
+        self._topic = topic
+        self.remote_id = remote_id
+
+    async def send_raw(self, message):
+        await self._bus.publish(self._topic, message)
+
+    async def read(self):
+        raise TypeError("Remote connections are fed by the room bus, not read.")
+
+    async def close(self):
+        pass
+
+    def get_remote_address(self):
+        return f"remote:{self.remote_id}"
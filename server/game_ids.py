@@ -0,0 +1,94 @@
+"""
+Short, collision-free, routable game IDs.
+IDs are written in Crockford base32 (no I, L, O or U, case-insensitive), so a
+4-character ID covers 32**4 = 1,048,576 values. The value space is split
+evenly between every worker of every node sharing a room bus, so the owning
+node and worker are recovered by division and two nodes can never hand out
+the same ID.
+Within its share a worker maps a counter through a keyed pseudo-random
+permutation of the space (a small Feistel network with cycle walking):
+allocation is O(1), consecutive IDs look unrelated, every ID is handed out
+once before any is reused, and IDs still held by live rooms are skipped.
+"""
+import os
+import random
+
+GAME_ID_LENGTH = int(os.getenv('GAME_ID_LENGTH', '4'))
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+# Characters people mistype for digits are read as those digits.
+_DECODE = {char: value for value, char in enumerate(ALPHABET)}
+_DECODE.update({"I": 1, "L": 1, "O": 0})
+
+def normalize(game_id):
+    """Canonical spelling of a typed ID, or None if it cannot be an ID."""
+    if not isinstance(game_id, str):
+        return None
+    value = decode(game_id)
+    return None if value is None else encode(value, len(game_id))
+
+def encode(value, length):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+def decode(game_id):
+    value = 0
+    for char in game_id.upper():
+        digit = _DECODE.get(char)
+        if digit is None:
+            return None
+        value = value * 32 + digit
+    return value
+
+class GameIdAllocator:
+    def __init__(self, worker_id=0, num_workers=1, length=None, node_index=0, num_nodes=1):
+        self.length = length or GAME_ID_LENGTH
+        if not 0 <= node_index < num_nodes:
+            raise ValueError(f"Node index {node_index} is outside 0..{num_nodes - 1}")
+        self.worker_id = worker_id
+        self.num_workers = num_workers
+        self.node_index = node_index
+        self.space = 32 ** self.length // (num_nodes * num_workers) # IDs available to each worker
+        if self.space < 1:
+            raise ValueError(f"Cannot split {self.length}-character IDs between {num_nodes} nodes of {num_workers} workers")
+        # The Feistel network permutes [0, 2**bits); values >= space are walked again.
+        bits = max(2, (self.space - 1).bit_length())
+        self._half_bits = (bits + 1) // 2
+        self._half_mask = (1 << self._half_bits) - 1
+        self._round_keys = [random.getrandbits(32) for _ in range(4)]
+        self._counter = 0
+
+    def _permute(self, value):
+        while True:
+            left, right = value >> self._half_bits, value & self._half_mask
+            for key in self._round_keys:
+                left, right = right, left ^ ((((right + key) * 0x9E3779B1) >> 7) & self._half_mask)
+            value = (left << self._half_bits) | right
+            if value < self.space:
+                return value
+
+    def allocate(self, live_ids):
+        """Returns an ID not present in `live_ids` (a dict or set of live game IDs)."""
+        if len(live_ids) >= self.space:
+            raise RuntimeError("No free game IDs left")
+        while True:
+            value = self._permute(self._counter % self.space)
+            self._counter += 1
+            game_id = encode((self.node_index * self.num_workers + self.worker_id) * self.space + value, self.length)
+            if game_id not in live_ids:
+                return game_id
+
+    def owner_of(self, game_id):
+        """
+        Returns the worker of this node that owns `game_id`, or None if the ID
+        belongs to another node or is not a valid ID.
+        """
+        if len(game_id) != self.length:
+            return None
+        value = decode(game_id)
+        if value is None:
+            return None
+        node_index, owner = divmod(value // self.space, self.num_workers)
+        return owner if node_index == self.node_index else None
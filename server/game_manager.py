@@ -1,37 +1,145 @@
+import asyncio
 import logging
-import uuid
+from server.connection import RemoteClientConnection
+from server.room_bus import command_topic, connection_topic
+from server.game_ids import GameIdAllocator
 from server.game_room import Game
 from server.ultimate_game_room import UltimateGame
 from server.ai_game_room import AIGameRoom
 from server.ultimate_ai_game_room import UltimateAIGameRoom
+from server.gomoku_game_room import GomokuGame, GomokuAIGameRoom
+from server.protocol import GOMOKU_DEFAULT_BOARD_SIZE, GOMOKU_DEFAULT_WIN_LENGTH
 
 active_games = {}
 
-def create_game(game_mode='standard'):
-    """Creates a new multiplayer game room and returns it."""
-    game_id = str(uuid.uuid4())[:4].upper()
+# --- Worker Routing ---
+# Game IDs come from a GameIdAllocator, which never hands out the ID of a live
+# room and encodes the owning node and worker in the ID, so any worker can
+# route a message to a local owner and IDs never collide across the room bus.
+worker_id = 0
+num_workers = 1
+id_allocator = GameIdAllocator()
+ai_executor = None # This worker's process pool for AI move searches
+
+def configure_worker(this_worker_id, total_workers, executor=None, node_index=0, num_nodes=1):
+    """
+    Sets which worker (of which room-bus node) this process is and the executor
+    its AI rooms search moves on; called once at startup, after any fork.
+    """
+    global worker_id, num_workers, id_allocator, ai_executor
+    worker_id, num_workers = this_worker_id, total_workers
+    id_allocator = GameIdAllocator(this_worker_id, total_workers, node_index=node_index, num_nodes=num_nodes)
+    ai_executor = executor
+
+# Rooms moved away with export_room(): game id -> the worker of this node that
+# adopted it, or None if another node did (it is then found on the room bus).
+moved_rooms = {}
+
+def owner_of(game_id):
+    """
+    Returns the worker of this node that owns `game_id`, or None if it is
+    another node's ID (or not a routable ID).
+    """
+    if game_id in active_games:
+        return worker_id # Includes rooms adopted from another worker
+    if game_id in moved_rooms:
+        return moved_rooms[game_id]
+    return id_allocator.owner_of(game_id)
+
+def _new_game_id():
+    while True:
+        game_id = id_allocator.allocate(active_games)
+        if game_id not in moved_rooms: # Still routed to the room that moved
+            return game_id
+
+# --- Cross-Node Room Bus ---
+# When a bus is configured, every room this node creates subscribes to its
+# command topic. Other nodes publish their players' messages there, and this
+# node, as the owner, applies them and publishes state back per connection.
+room_bus = None
+_remote_message_handler = None
+_remote_disconnect_handler = None
+_remote_connections = {} # remote conn id -> RemoteClientConnection
+_room_subscriptions = {} # game id -> command callback
+
+def configure_room_bus(bus, on_message, on_disconnect):
+    """
+    Enables cross-node rooms. `on_message(message_str, conn)` and
+    `on_disconnect(conn)` are the server's usual per-connection handlers.
+    """
+    global room_bus, _remote_message_handler, _remote_disconnect_handler
+    room_bus = bus
+    _remote_message_handler = on_message
+    _remote_disconnect_handler = on_disconnect
+
+def _publish_room(game_id):
+    if room_bus is None:
+        return
+
+    async def on_command(data):
+        conn_id = data["conn"]
+        client_conn = _remote_connections.get(conn_id)
+        if data.get("closed"):
+            if client_conn:
+                del _remote_connections[conn_id]
+                await _remote_disconnect_handler(client_conn)
+            return
+        if client_conn is None:
+            client_conn = RemoteClientConnection(room_bus, connection_topic(game_id, conn_id), conn_id)
+            _remote_connections[conn_id] = client_conn
+        await _remote_message_handler(data["message"], client_conn)
+
+    _room_subscriptions[game_id] = on_command
+    asyncio.create_task(room_bus.subscribe(command_topic(game_id), on_command))
+
+def _unpublish_room(game_id):
+    subscription = _room_subscriptions.pop(game_id, None)
+    if subscription is not None:
+        asyncio.create_task(room_bus.unsubscribe(command_topic(game_id), subscription))
+
+def _gomoku_options(board_size, win_length):
+    return {
+        "board_size": board_size or GOMOKU_DEFAULT_BOARD_SIZE,
+        "win_length": win_length or GOMOKU_DEFAULT_WIN_LENGTH,
+    }
+
+def create_game(game_mode='standard', board_size=None, win_length=None):
+    """
+    Creates a new multiplayer game room and returns it.
+    `board_size` and `win_length` only apply to gomoku; they default to 15x15, five in a row.
+    """
+    game_id = _new_game_id()
     
     if game_mode == 'ultimate':
         active_games[game_id] = UltimateGame(game_id, on_empty=remove_game)
         logging.info(f"New Ultimate game created with ID: {game_id}")
+    elif game_mode == 'gomoku':
+        game = GomokuGame(game_id, on_empty=remove_game, **_gomoku_options(board_size, win_length))
+        active_games[game_id] = game
+        logging.info(f"New {game.board_size}x{game.board_size} gomoku game ({game.win_length} in a row) created with ID: {game_id}")
     else:
         active_games[game_id] = Game(game_id, on_empty=remove_game)
         logging.info(f"New standard game created with ID: {game_id}")
-        
+
+    _publish_room(game_id)
     return active_games[game_id]
 
-def create_ai_game(executor, game_mode='standard'):
+def create_ai_game(game_mode='standard', board_size=None, win_length=None):
     """Creates a new single-player AI game room and returns it."""
-    game_id = str(uuid.uuid4())[:4].upper()
+    game_id = _new_game_id()
     
     if game_mode == 'ultimate':
-        game = UltimateAIGameRoom(game_id, on_empty=remove_game, executor=executor)
+        game = UltimateAIGameRoom(game_id, on_empty=remove_game, executor=ai_executor)
         logging.info(f"New Ultimate AI game created with ID: {game_id}")
+    elif game_mode == 'gomoku':
+        game = GomokuAIGameRoom(game_id, on_empty=remove_game, executor=ai_executor, **_gomoku_options(board_size, win_length))
+        logging.info(f"New gomoku AI game created with ID: {game_id}")
     else:
-        game = AIGameRoom(game_id, on_empty=remove_game, executor=executor)
+        game = AIGameRoom(game_id, on_empty=remove_game, executor=ai_executor)
         logging.info(f"New standard AI game created with ID: {game_id}")
         
     active_games[game_id] = game
+    _publish_room(game_id)
     return game
 
 def get_game(game_id):
@@ -40,6 +148,64 @@ def get_game(game_id):
 
 def remove_game(game_id):
     """Removes a game room from the active list."""
-    if game_id in active_games:
-        del active_games[game_id]
+    game = active_games.pop(game_id, None)
+    if game:
+        game.close()
+        _unpublish_room(game_id)
         logging.info(f"Game {game_id} is empty and has been removed.")
+
+# --- Snapshots & Migration ---
+ROOM_CLASSES = {
+    cls.snapshot_kind: cls
+    for cls in (Game, UltimateGame, AIGameRoom, UltimateAIGameRoom, GomokuGame, GomokuAIGameRoom)
+}
+
+def snapshot_rooms():
+    """Returns a snapshot dict for every live room."""
+    return [game.to_snapshot() for game in active_games.values()]
+
+async def _restore_room(snapshot):
+    """Rebuilds a room from its snapshot and makes this process its owner."""
+    room_class = ROOM_CLASSES[snapshot["kind"]]
+    room_kwargs = {"executor": ai_executor} if issubclass(room_class, (AIGameRoom, UltimateAIGameRoom)) else {}
+    game = await room_class.from_snapshot(snapshot, on_empty=remove_game, **room_kwargs)
+    active_games[game.game_id] = game
+    _publish_room(game.game_id)
+    return game
+
+async def adopt_room(snapshot):
+    """Takes over a room another worker or node released with export_room()."""
+    moved_rooms.pop(snapshot["game_id"], None) # A room can come back to the worker it left
+    game = await _restore_room(snapshot)
+    logging.info(f"Game {game.game_id} adopted from another process.")
+    return game
+
+def export_room(game_id, to_worker=None):
+    """
+    Snapshots a room and releases it so another process can adopt_room() it.
+    `to_worker` is the worker of this node that adopts it; None means another
+    node, reached through the room bus. Messages for the room are routed there
+    from now on, and connected players resume against the new owner.
+    """
+    game = active_games.pop(game_id, None)
+    if game is None:
+        return None
+    snapshot = game.to_snapshot()
+    game.close()
+    _unpublish_room(game_id)
+    moved_rooms[game_id] = to_worker
+    logging.info(f"Game {game_id} exported for migration.")
+    return snapshot
+
+async def restore_rooms(snapshots):
+    """Restores every room in a snapshot file that is not already live here."""
+    restored = 0
+    for snapshot in snapshots:
+        if snapshot["game_id"] in active_games:
+            continue
+        try:
+            await _restore_room(snapshot)
+            restored += 1
+        except (KeyError, TypeError, ValueError) as e:
+            logging.error(f"Could not restore Game {snapshot.get('game_id')}: {e}")
+    logging.info(f"Restored {restored} rooms from snapshot.")
@@ -0,0 +1,131 @@
+"""
+This module contains the AI logic for N x N, k-in-a-row games (e.g. Gomoku).
+Full-width minimax does not scale past small boards, so the search only
+considers empty cells near existing marks, ranks them by the lines they would
+make or block, and runs alpha-beta over the best few at every level.
+"""
+import math
+from server.compact_board import X, O
+from server.rules import GomokuBoard
+
+# --- Constants ---
+SEARCH_DEPTH = 3 # Plies searched, counting the AI's own move. Higher is smarter but slower.
+CANDIDATE_LIMIT = 10 # Moves kept at each level after ranking
+NEIGHBOURHOOD = 1 # Candidates lie within this many cells of an existing mark
+WIN_SCORE = 10 ** 9
+
+def find_best_move(rows, win_length):
+    """
+    Finds a strong move for the AI player ('O').
+
+    Args:
+        rows (list): The board as row strings ('X', 'O' or '.') from GomokuBoard.to_wire().
+        win_length (int): How many marks in a row win.
+
+    Returns:
+        tuple: The move as (row, col), or None if the board is full.
+    """
+    board = GomokuBoard.from_wire(rows, win_length)
+    if board.is_full():
+        return None
+    if board.filled == 0:
+        return (board.size // 2, board.size // 2)
+
+    best_move = None
+    best_val = -math.inf
+    alpha = -math.inf
+    for index in _ranked_candidates(board, O):
+        board.place(index, O)
+        move_val = -_negamax(board, SEARCH_DEPTH - 1, -math.inf, -alpha, X)
+        board.unplace(index, O)
+        if move_val > best_val:
+            best_val = move_val
+            best_move = index
+        alpha = max(alpha, move_val)
+    return divmod(best_move, board.stride)
+
+def _negamax(board, depth, alpha, beta, code):
+    """Alpha-beta search; scores are from the point of view of `code`, the player to move."""
+    if board.winner:
+        return -WIN_SCORE - depth # The previous move won; sooner losses score lower
+    if board.is_full():
+        return 0
+    if depth == 0:
+        return _evaluate(board, code)
+
+    opponent = X if code == O else O
+    best = -math.inf
+    for index in _ranked_candidates(board, code):
+        board.place(index, code)
+        evaluation = -_negamax(board, depth - 1, -beta, -alpha, opponent)
+        board.unplace(index, code)
+        best = max(best, evaluation)
+        alpha = max(alpha, evaluation)
+        if beta <= alpha:
+            break # Prune
+    return best
+
+def _evaluate(board, code):
+    """
+    Heuristic for the player to move: their strongest threat against the
+    opponent's. Having the move is worth more than an equal threat.
+    """
+    opponent = X if code == O else O
+    attack = defence = 0
+    for index in _candidates(board):
+        attack = max(attack, _cell_score(board, index, code))
+        defence = max(defence, _cell_score(board, index, opponent))
+    return 2 * attack - defence
+
+# --- Candidate Generation ---
+
+def _candidates(board):
+    """Yields empty cells within NEIGHBOURHOOD of any mark, found by dilating the occupancy bitboard."""
+    occupied = board.bits[X] | board.bits[O]
+    near = occupied
+    for _ in range(NEIGHBOURHOOD):
+        grown = near
+        for step in board.directions:
+            grown |= (near << step) | (near >> step)
+        near = grown
+    free = near & board.cell_mask & ~occupied
+    while free:
+        low = free & -free
+        yield low.bit_length() - 1
+        free ^= low
+
+def _ranked_candidates(board, code):
+    """The CANDIDATE_LIMIT most promising cells for `code`: lines it would make plus lines it would block."""
+    opponent = X if code == O else O
+    scored = [
+        (_cell_score(board, index, code) + _cell_score(board, index, opponent), index)
+        for index in _candidates(board)
+    ]
+    scored.sort(reverse=True)
+    return [index for _, index in scored[:CANDIDATE_LIMIT]]
+
+def _cell_score(board, index, code):
+    """How much playing `code` on the empty cell `index` extends its lines, summed over the four directions."""
+    own = board.bits[code]
+    blocked = board.bits[X if code == O else O]
+    k = board.win_length
+    last_cell = board.size * board.stride
+    score = 0
+    for step in board.directions:
+        run, open_ends = 1, 0
+        for sign in (1, -1):
+            i = index + sign * step
+            while 0 <= i < last_cell and (own >> i) & 1:
+                run += 1
+                i += sign * step
+            # A run end is open if the next cell is on the board and empty.
+            if 0 <= i < last_cell and i % board.stride != board.size and not (blocked >> i) & 1:
+                open_ends += 1
+        if run >= k:
+            return WIN_SCORE
+        if open_ends:
+            shape = 10 ** run * open_ends
+            if run == k - 1 and open_ends == 2:
+                shape *= 10 # An open k-1 cannot be blocked at both ends
+            score += shape
+    return score
@@ -0,0 +1,83 @@
+import os
+from server.protocol import GameState, GameStateResponse, encode, GOMOKU_DEFAULT_BOARD_SIZE, GOMOKU_DEFAULT_WIN_LENGTH
+from server.game_room import Game
+from server.ai_game_room import AIGameRoom
+from server.gomoku_ai_logic import find_best_move
+from server.rules import GomokuBoard
+
+class GomokuRules:
+    """
+    Board hooks shared by the N x N, k-in-a-row rooms.
+    Everything else (seats, clocks, grace periods, snapshots) is inherited
+    from Game, which only sees the board through these hooks.
+    """
+    __slots__ = ()
+    snapshot_kind = "gomoku"
+    game_mode = "gomoku"
+
+    def _new_board(self):
+        return GomokuBoard(self.board_size, self.win_length)
+
+    def _board_from_wire(self, rows):
+        return GomokuBoard.from_wire(rows, self.win_length)
+
+    def _board_snapshot(self):
+        # The last move is kept so the highlight survives a restore; it cannot be told from the rows.
+        return {"board": self.board.to_wire(), "last_move": self.board.last_move}
+
+    def _board_from_snapshot(self, snapshot):
+        return GomokuBoard.from_wire(snapshot["board"], self.win_length, snapshot.get("last_move"))
+
+    def _initial_time_bank(self):
+        return float(os.getenv('PLAYER_TIMER_SECONDS_GOMOKU', '600'))
+
+    def to_snapshot(self):
+        snapshot = super().to_snapshot()
+        snapshot["board_size"] = self.board_size
+        snapshot["win_length"] = self.win_length
+        return snapshot
+
+    @classmethod
+    async def from_snapshot(cls, snapshot, on_empty, **room_kwargs):
+        return await super().from_snapshot(
+            snapshot, on_empty, board_size=snapshot["board_size"], win_length=snapshot["win_length"], **room_kwargs
+        )
+
+    def _encode_state(self, seq=None):
+        # The board is sent as row strings ('.' for empty) to keep large boards small on the wire.
+        game_state = GameState(
+            board=self.board.to_wire(),
+            current_player=self.current_player,
+            game_over=self.game_over,
+            winner=self.winner,
+            player_names=self.player_names,
+            player_x_time=self.player_x_time_bank,
+            player_o_time=self.player_o_time_bank,
+            board_size=self.board_size,
+            win_length=self.win_length,
+            last_move=self.board.last_move
+        )
+        return encode(GameStateResponse(state=game_state, seq=self.sessions.seq if seq is None else seq))
+
+class GomokuGame(GomokuRules, Game):
+    """Represents an N x N game won by `win_length` marks in a row (15x15, five in a row by default)."""
+    __slots__ = ("board_size", "win_length")
+
+    def __init__(self, game_id, on_empty, board_size=GOMOKU_DEFAULT_BOARD_SIZE, win_length=GOMOKU_DEFAULT_WIN_LENGTH):
+        # Set before Game.__init__, which builds the board through _new_board().
+        self.board_size = board_size
+        self.win_length = win_length
+        super().__init__(game_id, on_empty)
+
+class GomokuAIGameRoom(GomokuRules, AIGameRoom):
+    """A k-in-a-row game against the computer, using the pruned search in server.gomoku_ai_logic."""
+    snapshot_kind = "gomoku_ai"
+    __slots__ = ("board_size", "win_length")
+
+    def __init__(self, game_id, on_empty, executor, board_size=GOMOKU_DEFAULT_BOARD_SIZE, win_length=GOMOKU_DEFAULT_WIN_LENGTH):
+        self.board_size = board_size
+        self.win_length = win_length
+        super().__init__(game_id, on_empty, executor)
+
+    def _ai_search(self):
+        return find_best_move, (self.board.to_wire(), self.win_length)
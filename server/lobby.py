@@ -0,0 +1,76 @@
+"""
+Index of joinable rooms, grouped by game mode.
+Rooms report seat changes here, so listing open games never scans
+`game_manager.active_games`, and lobby subscribers receive incremental
+add/remove notifications instead of polling.
+"""
+import asyncio
+import itertools
+import logging
+from server.protocol import LobbyUpdateResponse, encode
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+class LobbyIndex:
+    def __init__(self):
+        self._open_games = {} # game_mode -> {game_id: entry}, oldest first
+        self._subscribers = {} # ClientConnection -> game_mode, or None for every mode
+
+    @staticmethod
+    def _is_open(game):
+        # Only rooms whose host is waiting for a first opponent; a seat left
+        # mid-game still belongs to the player who left.
+        return (game.lists_in_lobby and game.open_seat() == "O" and len(game.clients) == 1
+                and not game.game_over and not game.is_in_grace_period)
+
+    def update(self, game):
+        """Called by a room whenever its seats or game-over state change."""
+        games = self._open_games.setdefault(game.game_mode, {})
+        listed = game.game_id in games
+        if self._is_open(game):
+            if not listed:
+                host = next(iter(game.clients)).player_name
+                entry = {"game_id": game.game_id, "game_mode": game.game_mode, "host": host}
+                games[game.game_id] = entry
+                self._notify("add", entry)
+        elif listed:
+            self._notify("remove", games.pop(game.game_id))
+
+    def discard(self, game):
+        entry = self._open_games.get(game.game_mode, {}).pop(game.game_id, None)
+        if entry:
+            self._notify("remove", entry)
+
+    def page(self, game_mode=None, limit=DEFAULT_PAGE_SIZE):
+        """Returns up to `limit` open games, oldest first; costs O(limit)."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        if game_mode is not None:
+            entries = self._open_games.get(game_mode, {}).values()
+        else:
+            entries = itertools.chain.from_iterable(games.values() for games in self._open_games.values())
+        return list(itertools.islice(entries, limit))
+
+    def subscribe(self, client_conn, game_mode=None):
+        self._subscribers[client_conn] = game_mode
+
+    def unsubscribe(self, client_conn):
+        self._subscribers.pop(client_conn, None)
+
+    def _notify(self, op, entry):
+        if not self._subscribers:
+            return
+        message = encode(LobbyUpdateResponse(op=op, game=entry))
+        for client_conn, game_mode in list(self._subscribers.items()):
+            if game_mode is None or game_mode == entry["game_mode"]:
+                # Fire and forget: a room's state change never waits on lobby watchers.
+                asyncio.create_task(self._send(client_conn, message))
+
+    async def _send(self, client_conn, message):
+        try:
+            await client_conn.send_raw(message)
+        except Exception:
+            logging.info(f"Dropping lobby subscriber {client_conn.get_remote_address()}")
+            self.unsubscribe(client_conn)
+
+lobby = LobbyIndex()
@@ -1,140 +1,438 @@
 import asyncio
-import json
 import logging
 import websockets
 import sys
 import os
-from threading import Thread
+import time
+import socket
+import signal
+import itertools
+from multiprocessing import Process
 from concurrent.futures import ProcessPoolExecutor
 
 # --- Setup ---
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, project_root)
 
-from server import game_manager, config
+from server import game_manager, config, move_journal, result_writer
 from database import database
-from server.protocol import GameCreatedResponse, GameJoinedResponse, ErrorResponse, MessageType, to_dict
+from server.protocol import (
+    GameCreatedResponse, GameJoinedResponse, SpectatingResponse, SessionResumedResponse,
+    MatchQueuedResponse, LobbyResponse, ErrorResponse,
+    MessageType, ProtocolError, parse_client_message, to_dict
+)
 from server.connection import ClientConnection
+from server.timer_wheel import timer_wheel
+from server.worker_relay import WorkerRelay, RELAY_HOST, relay_port
+from server.room_bus import LocalSocketRoomBus, RemoteRoomLink
+from server.snapshots import read_snapshot, write_snapshot
+from server.matchmaking import Matchmaker
+from server.lobby import lobby
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(funcName)s:%(lineno)d] - %(message)s')
 
-# --- Global Process Pool ---
-# This executor will be used to run CPU-bound AI calculations in a separate process.
-process_pool_executor = ProcessPoolExecutor()
+# --- Cross-Node Room Bus ---
+# Set ROOM_BUS_SOCKET to the hub started by run_room_bus.py to share rooms between nodes.
+ROOM_BUS_SOCKET = os.getenv('ROOM_BUS_SOCKET')
+ROOM_BUS_NODE_ID = os.getenv('ROOM_BUS_NODE_ID')
+# Every node on a bus needs its own index so their game IDs never overlap.
+ROOM_BUS_NODE_INDEX = int(os.getenv('ROOM_BUS_NODE_INDEX', '0'))
+ROOM_BUS_NODE_COUNT = int(os.getenv('ROOM_BUS_NODE_COUNT', '1'))
+_remote_conn_ids = itertools.count()
 
 # --- Core Message Routing ---
+# Maps each client MessageType to the coroutine that handles it.
+MESSAGE_HANDLERS = {}
+
+def handles(msg_type):
+    """Registers the decorated coroutine as the handler for a message type."""
+    def register(handler):
+        MESSAGE_HANDLERS[msg_type] = handler
+        return handler
+    return register
+
+# Handlers run on the connection's read loop and must not await room work.
+# Anything touching a room is submitted to that room's actor, which runs the
+# *_command coroutines below one at a time.
+
+def leave_room(client_conn, game_id):
+    """
+    Takes a connection that has moved to another room out of room `game_id`,
+    as a player or a spectator. Runs on that room's own actor.
+    """
+    if not game_id or game_id == client_conn.game_id:
+        return
+    game = game_manager.get_game(game_id)
+    if game:
+        game.actor.submit(game.remove_spectator, client_conn)
+        game.actor.submit(game.remove_client, client_conn)
+
+async def create_game_command(game, message, client_conn):
+    previous_game_id = client_conn.game_id
+    player_symbol = await game.add_client(client_conn, message.name)
+    leave_room(client_conn, previous_game_id)
+    response = GameCreatedResponse(game_id=game.game_id, player_symbol=player_symbol, session_token=client_conn.session_token)
+    await client_conn.send(to_dict(response))
+
+async def create_ai_game_command(game, message, client_conn):
+    await create_game_command(game, message, client_conn)
+    # The AI game starts immediately
+    await game.start_game()
+
+async def join_game_command(game, message, client_conn):
+    previous_game_id = client_conn.game_id
+    player_symbol = await game.add_client(client_conn, message.name)
+    if player_symbol:
+        leave_room(client_conn, previous_game_id)
+        response = GameJoinedResponse(game_id=game.game_id, player_symbol=player_symbol, session_token=client_conn.session_token)
+        await client_conn.send(to_dict(response))
+        if len(game.clients) == 2:
+            await game.broadcast_state()
+    else:
+        await client_conn.send(to_dict(ErrorResponse(message="Game is full.")))
+
+async def spectate_game_command(game, message, client_conn):
+    await client_conn.send(to_dict(SpectatingResponse(game_id=game.game_id)))
+    previous_game_id = client_conn.game_id
+    await game.add_spectator(client_conn)
+    leave_room(client_conn, previous_game_id)
+
+async def resume_command(game, message, client_conn):
+    previous_game_id = client_conn.game_id
+    missed_events = await game.resume_client(client_conn, message.session_token, message.last_seq)
+    if missed_events is None:
+        await client_conn.send(to_dict(ErrorResponse(message="Session not found.")))
+        return
+    leave_room(client_conn, previous_game_id)
+    response = SessionResumedResponse(game_id=game.game_id, player_symbol=client_conn.player_symbol, seq=game.sessions.seq)
+    await client_conn.send(to_dict(response))
+    # Only the resuming client is caught up; the opponent's view has not changed.
+    for event in missed_events:
+        await client_conn.send_raw(event)
+
+async def reconnect_command(game, message, client_conn):
+    # Like resume_command, but everyone in the room is sent the full state.
+    previous_game_id = client_conn.game_id
+    if await game.resume_client(client_conn, message.session_token, message.last_seq) is None:
+        await client_conn.send(to_dict(ErrorResponse(message="Session not found.")))
+        return
+    leave_room(client_conn, previous_game_id)
+    await game.broadcast_state()
+
+async def quick_match_command(game, first, second):
+    # Both seats are filled in one actor command, so nobody else can slip into the room.
+    for ticket in (first, second):
+        previous_game_id = ticket.client_conn.game_id
+        player_symbol = await game.add_client(ticket.client_conn, ticket.name)
+        leave_room(ticket.client_conn, previous_game_id)
+        response = GameJoinedResponse(game_id=game.game_id, player_symbol=player_symbol, session_token=ticket.client_conn.session_token)
+        await ticket.client_conn.send(to_dict(response))
+    await game.broadcast_state()
+
+def start_quick_match(first, second):
+    game = game_manager.create_game(first.game_mode)
+    logging.info(f"Quick match: paired {first.name} with {second.name} in Game {game.game_id}")
+    game.actor.submit(quick_match_command, game, first, second)
+
+_timeout_notices = set() # Holds each notice task until it finishes, so none is garbage-collected mid-send
+
+async def send_timeout_notice(client_conn):
+    try:
+        await client_conn.send(to_dict(ErrorResponse(message="No opponent found.")))
+    except Exception as e:
+        logging.info(f"Could not tell {client_conn.get_remote_address()} the quick match timed out: {e}")
+
+def quick_match_timed_out(ticket):
+    """Matchmaker callback: runs on the timer wheel, so the notice is sent from its own task."""
+    task = asyncio.create_task(send_timeout_notice(ticket.client_conn))
+    _timeout_notices.add(task)
+    task.add_done_callback(_timeout_notices.discard)
+
+matchmaker = Matchmaker(on_match=start_quick_match, on_timeout=quick_match_timed_out)
+
+@handles(MessageType.CREATE_GAME)
+async def handle_create_game(message, client_conn):
+    game = game_manager.create_game(message.game_mode, message.board_size, message.win_length)
+    game.actor.submit(create_game_command, game, message, client_conn)
+
+@handles(MessageType.CREATE_AI_GAME)
+async def handle_create_ai_game(message, client_conn):
+    game = game_manager.create_ai_game(message.game_mode, message.board_size, message.win_length)
+    game.actor.submit(create_ai_game_command, game, message, client_conn)
+
+@handles(MessageType.JOIN_GAME)
+async def handle_join_game(message, client_conn):
+    game = game_manager.get_game(message.game_id)
+    if game:
+        game.actor.submit(join_game_command, game, message, client_conn)
+    else:
+        await client_conn.send(to_dict(ErrorResponse(message="Game not found.")))
+
+@handles(MessageType.SPECTATE_GAME)
+async def handle_spectate_game(message, client_conn):
+    game = game_manager.get_game(message.game_id)
+    if game:
+        game.actor.submit(spectate_game_command, game, message, client_conn)
+    else:
+        await client_conn.send(to_dict(ErrorResponse(message="Game not found.")))
+
+@handles(MessageType.RECONNECT)
+async def handle_reconnect(message, client_conn):
+    game = game_manager.get_game(message.game_id)
+    if game:
+        game.actor.submit(reconnect_command, game, message, client_conn)
+    else:
+        # If the game doesn't exist, the client's state is stale.
+        # We can just ignore this, and the client will show the lobby.
+        pass
+
+@handles(MessageType.RESUME)
+async def handle_resume(message, client_conn):
+    game = game_manager.get_game(message.game_id)
+    if game:
+        game.actor.submit(resume_command, game, message, client_conn)
+    else:
+        await client_conn.send(to_dict(ErrorResponse(message="Game not found.")))
+
+@handles(MessageType.QUICK_MATCH)
+async def handle_quick_match(message, client_conn):
+    # A primary-key read, but still disk I/O: it runs in a thread so the event loop never waits on it.
+    rating = await asyncio.get_running_loop().run_in_executor(None, database.get_player_rating, message.name, message.game_mode)
+    if not matchmaker.request(client_conn, message.name, message.game_mode, rating):
+        await client_conn.send(to_dict(MatchQueuedResponse(game_mode=message.game_mode)))
+
+@handles(MessageType.LIST_GAMES)
+async def handle_list_games(message, client_conn):
+    await client_conn.send(to_dict(LobbyResponse(games=lobby.page(message.game_mode, message.limit))))
+
+@handles(MessageType.SUBSCRIBE_LOBBY)
+async def handle_subscribe_lobby(message, client_conn):
+    # Subscribe before sending the page, so no add/remove in between is missed.
+    lobby.subscribe(client_conn, message.game_mode)
+    await client_conn.send(to_dict(LobbyResponse(games=lobby.page(message.game_mode, message.limit))))
+
+@handles(MessageType.MOVE)
+async def handle_move(message, client_conn):
+    game = game_manager.get_game(client_conn.game_id)
+    if not game or client_conn.is_spectator:
+        return
+    if message.row >= game.board_size or message.col >= game.board_size:
+        logging.warning(f"Rejected out-of-bounds move ({message.row}, {message.col}) for Game {game.game_id}")
+        return
+    game.actor.submit(game.handle_move, client_conn, message)
+
+@handles(MessageType.RESTART)
+async def handle_restart(message, client_conn):
+    game = game_manager.get_game(client_conn.game_id)
+    if game and not client_conn.is_spectator:
+        game.actor.submit(game.restart_game)
+
+async def hand_off(message, message_str, client_conn, owner):
+    """Forwards a join/reconnect for a game owned by another worker to that worker."""
+    try:
+        client_conn.relay = await WorkerRelay.open(client_conn, owner)
+    except OSError as e:
+        logging.error(f"Could not reach worker {owner} for Game {message.game_id}: {e}")
+        await client_conn.send(to_dict(ErrorResponse(message="Game not found.")))
+        return
+    await client_conn.relay.forward(message_str)
+
+async def attach_remote_room(message, message_str, client_conn):
+    """Joins a room owned by another node through the room bus."""
+    node_id = ROOM_BUS_NODE_ID or f"{socket.gethostname()}-{os.getpid()}"
+    conn_id = f"{node_id}-{next(_remote_conn_ids)}"
+    link = await RemoteRoomLink.open(game_manager.room_bus, client_conn, message.game_id, conn_id)
+    if not await link.forward(message_str):
+        # No node owns this room.
+        link.close()
+        await client_conn.send(to_dict(ErrorResponse(message="Game not found.")))
+        return
+    client_conn.relay = link
+
 async def handle_message(message_str, client_conn):
     """Routes a received message to the appropriate game logic."""
     if not message_str: return # Ignore empty messages
+    if client_conn.relay:
+        # This connection's game lives on another worker; that worker validates and handles it.
+        await client_conn.relay.forward(message_str)
+        return
     try:
-        message = json.loads(message_str)
-        msg_type = message.get("type")
-
-        if msg_type == MessageType.CREATE_GAME:
-            game_mode = message.get("game_mode", "standard")
-            game = game_manager.create_game(game_mode)
-            player_symbol = await game.add_client(client_conn, message.get("name", "Anonymous"))
-            response = GameCreatedResponse(game_id=game.game_id, player_symbol=player_symbol)
-            await client_conn.send(to_dict(response))
-
-        elif msg_type == MessageType.CREATE_AI_GAME:
-            game_mode = message.get("game_mode", "standard")
-            game = game_manager.create_ai_game(process_pool_executor, game_mode)
-            player_symbol = await game.add_client(client_conn, message.get("name", "Anonymous"))
-            response = GameCreatedResponse(game_id=game.game_id, player_symbol=player_symbol)
-            await client_conn.send(to_dict(response))
-            # The AI game starts immediately
-            await game.start_game()
-
-        elif msg_type == MessageType.JOIN_GAME:
-            game_id = message.get("game_id")
-            game = game_manager.get_game(game_id)
-            if game:
-                player_symbol = await game.add_client(client_conn, message.get("name", "Anonymous"))
-                if player_symbol:
-                    response = GameJoinedResponse(game_id=game.game_id, player_symbol=player_symbol)
-                    await client_conn.send(to_dict(response))
-                    if len(game.clients) == 2:
-                        await game.broadcast_state()
-                else:
-                    await client_conn.send(to_dict(ErrorResponse(message="Game is full.")))
-            else:
-                await client_conn.send(to_dict(ErrorResponse(message="Game not found.")))
-
-        elif msg_type == MessageType.RECONNECT:
-            game_id = message.get("game_id")
-            game = game_manager.get_game(game_id)
-            if game:
-                await game.reconnect_client(
-                    client_conn,
-                    message.get("player_symbol"),
-                    message.get("name")
-                )
-                await game.broadcast_state()
-            else:
-                # If the game doesn't exist, the client's state is stale.
-                # We can just ignore this, and the client will show the lobby.
-                pass
-
-        elif client_conn.game_id:
-            game = game_manager.get_game(client_conn.game_id)
-            if game:
-                if msg_type == MessageType.MOVE:
-                    await game.handle_move(client_conn, message)
-                elif msg_type == MessageType.RESTART:
-                    await game.restart_game()
-    except json.JSONDecodeError:
-        logging.warning(f"Received invalid JSON: {message_str}")
+        message = parse_client_message(message_str)
+    except ProtocolError as e:
+        # Fast reject path: garbage traffic is logged in one line, without a traceback.
+        logging.warning(f"Rejected message from {client_conn.get_remote_address()}: {e}: {message_str[:80]!r}")
+        return
+
+    owner = game_manager.owner_of(message.game_id) if message.game_id else None
+    if owner is not None and owner != game_manager.worker_id:
+        await hand_off(message, message_str, client_conn, owner)
+        return
+    if message.game_id and game_manager.room_bus and not game_manager.get_game(message.game_id):
+        await attach_remote_room(message, message_str, client_conn)
+        return
+
+    try:
+        await MESSAGE_HANDLERS[message.type](message, client_conn)
     except Exception as e:
         logging.error(f"Error handling message: {e}", exc_info=True)
 
 # --- Unified Connection Handler ---
+IDLE_TIMEOUT_SECONDS = float(os.getenv('CONNECTION_IDLE_TIMEOUT_SECONDS', '900')) # 15 minutes
+
+def check_idle_connection(client_conn):
+    """
+    Timer-wheel callback for idle eviction. Reads only stamp `last_activity`;
+    the timer is re-armed here for the remaining time instead of per message.
+    """
+    idle_for = time.monotonic() - client_conn.last_activity
+    if idle_for >= IDLE_TIMEOUT_SECONDS:
+        logging.info(f"Connection from {client_conn.get_remote_address()} idle for {idle_for:.0f}s. Closing.")
+        client_conn.idle_timer = None
+        asyncio.create_task(client_conn.close())
+    else:
+        client_conn.idle_timer = timer_wheel.schedule(IDLE_TIMEOUT_SECONDS - idle_for, check_idle_connection, client_conn)
+
 async def connection_handler(client_conn):
     """Handles the entire lifecycle of a single client connection."""
     logging.info(f"New connection from {client_conn.get_remote_address()}")
+    client_conn.idle_timer = timer_wheel.schedule(IDLE_TIMEOUT_SECONDS, check_idle_connection, client_conn)
     try:
         while True:
-            try:
-                # Wait for a message from the client with a 15-minute timeout.
-                message = await asyncio.wait_for(client_conn.read(), timeout=900.0)
-                
-                # If the message is empty, it means the client has disconnected.
-                if not message:
-                    logging.info(f"Client {client_conn.get_remote_address()} sent an empty message, closing connection.")
-                    break
-                
-                await handle_message(message, client_conn)
-            except asyncio.TimeoutError:
-                logging.info(f"Connection from {client_conn.get_remote_address()} timed out after 15 minutes. Closing.")
+            message = await client_conn.read()
+            client_conn.last_activity = time.monotonic()
+
+            # If the message is empty, it means the client has disconnected.
+            if not message:
+                logging.info(f"Client {client_conn.get_remote_address()} sent an empty message, closing connection.")
                 break
-    except (websockets.exceptions.ConnectionClosedError, ConnectionResetError, asyncio.IncompleteReadError):
-        logging.info(f"Connection closed by client {client_conn.get_remote_address()}")
+
+            await handle_message(message, client_conn)
+    except (websockets.exceptions.ConnectionClosed, ConnectionResetError, asyncio.IncompleteReadError):
+        logging.info(f"Connection closed for client {client_conn.get_remote_address()}")
     except Exception as e:
         logging.error(f"Unexpected error in connection handler: {e}", exc_info=True)
     finally:
         logging.info(f"Cleaning up connection for {client_conn.get_remote_address()}")
-        if client_conn.game_id:
-            game = game_manager.get_game(client_conn.game_id)
-            if game:
-                await game.remove_client(client_conn)
+        if client_conn.idle_timer:
+            client_conn.idle_timer.cancel()
+        if client_conn.relay:
+            client_conn.relay.close()
+        await release_connection(client_conn)
+
+async def release_connection(client_conn):
+    """Removes a closed connection from whatever room or queue it was in."""
+    matchmaker.cancel(client_conn)
+    lobby.unsubscribe(client_conn)
+    if client_conn.game_id:
+        game = game_manager.get_game(client_conn.game_id)
+        if game and client_conn.is_spectator:
+            game.actor.submit(game.remove_spectator, client_conn)
+        elif game:
+            game.actor.submit(game.remove_client, client_conn)
+
+# --- Room Snapshots ---
+SNAPSHOT_FILE = os.getenv('GAME_SNAPSHOT_FILE', 'game_rooms.snapshot')
+SNAPSHOT_INTERVAL_SECONDS = float(os.getenv('GAME_SNAPSHOT_INTERVAL_SECONDS', '30'))
+
+_snapshot_write = None # Future of the periodic write in flight, if any
+
+def write_periodic_snapshot(snapshot_path):
+    """Timer-wheel callback: captures rooms on the loop, writes the file off it, then re-arms."""
+    global _snapshot_write
+    # Writes share one .tmp file, so a round is skipped while the last one is still going.
+    if _snapshot_write is None or _snapshot_write.done():
+        rooms = game_manager.snapshot_rooms()
+        _snapshot_write = asyncio.get_running_loop().run_in_executor(None, write_snapshot, snapshot_path, rooms)
+    timer_wheel.schedule(SNAPSHOT_INTERVAL_SECONDS, write_periodic_snapshot, snapshot_path)
+
+async def write_final_snapshot(snapshot_path):
+    """Waits out any periodic write in flight, then writes the shutdown snapshot."""
+    if _snapshot_write is not None:
+        try:
+            await _snapshot_write
+        except Exception as e:
+            logging.error(f"Periodic snapshot write failed: {e}")
+    write_snapshot(snapshot_path, game_manager.snapshot_rooms())
 
 # --- Main Entrypoint ---
-async def main_async():
-    """Initializes database and starts all servers."""
+def prepare_database():
     # Check if running in test mode
     if os.getenv('TEST_MODE') == 'true':
         database.reset_database()
     else:
         database.initialize_database()
-    
+
+async def main_async(worker_id=0, num_workers=1, initialize_database=True):
+    """
+    Initializes database and starts all servers.
+    With several workers, each one binds the public ports with SO_REUSEPORT so the
+    kernel spreads connections across processes, and also listens on a local relay
+    port for connections handed off by other workers.
+    """
+    if initialize_database:
+        prepare_database()
+    # Each worker owns its process pool for CPU-bound AI searches; created here so
+    # no pool (or its management thread) is ever inherited across a fork.
+    ai_executor = ProcessPoolExecutor()
+    if ROOM_BUS_SOCKET:
+        game_manager.configure_worker(worker_id, num_workers, ai_executor, ROOM_BUS_NODE_INDEX, ROOM_BUS_NODE_COUNT)
+        if ROOM_BUS_NODE_COUNT == 1:
+            logging.warning("ROOM_BUS_NODE_COUNT is 1: game IDs will collide if other nodes share this room bus")
+    else:
+        game_manager.configure_worker(worker_id, num_workers, ai_executor)
+    move_journal.configure(worker_id=worker_id)
+    result_writer.start()
+    snapshot_path = SNAPSHOT_FILE if num_workers == 1 else f"{SNAPSHOT_FILE}.{worker_id}"
+    if os.getenv('TEST_MODE') != 'true':
+        await game_manager.restore_rooms(read_snapshot(snapshot_path))
+    timer_wheel.schedule(SNAPSHOT_INTERVAL_SECONDS, write_periodic_snapshot, snapshot_path)
+    if ROOM_BUS_SOCKET:
+        bus = await LocalSocketRoomBus.connect(ROOM_BUS_SOCKET)
+        game_manager.configure_room_bus(bus, handle_message, release_connection)
+        logging.info(f"Joined room bus at {ROOM_BUS_SOCKET}")
+    multi_worker = num_workers > 1
+
     async def ws_handler(websocket):
         await connection_handler(ClientConnection(websocket))
 
     async def tcp_handler(reader, writer):
         await connection_handler(ClientConnection(reader, writer))
 
-    tcp_server = await asyncio.start_server(tcp_handler, config.HOST, config.TCP_PORT)
-    ws_server = await websockets.serve(ws_handler, config.HOST, config.WS_PORT)
-    
-    logging.info(f"Unified Server listening on TCP:{config.TCP_PORT} and WS:{config.WS_PORT}")
-    await asyncio.gather(tcp_server.serve_forever(), ws_server.wait_closed())
\ No newline at end of file
+    tcp_server = await asyncio.start_server(tcp_handler, config.HOST, config.TCP_PORT, reuse_port=multi_worker)
+    ws_server = await websockets.serve(ws_handler, config.HOST, config.WS_PORT, reuse_port=multi_worker)
+    servers = [tcp_server.serve_forever(), ws_server.wait_closed()]
+    if multi_worker:
+        relay_server = await asyncio.start_server(tcp_handler, RELAY_HOST, relay_port(worker_id))
+        servers.append(relay_server.serve_forever())
+
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
+    loop.add_signal_handler(signal.SIGTERM, main_task.cancel)
+
+    logging.info(f"Unified Server worker {worker_id}/{num_workers} listening on TCP:{config.TCP_PORT} and WS:{config.WS_PORT}")
+    try:
+        await asyncio.gather(*servers)
+    finally:
+        # Runs on Ctrl+C and SIGTERM, so a restart picks every game back up.
+        await write_final_snapshot(snapshot_path)
+        move_journal.close()
+        result_writer.close() # Commits every result still queued
+        database.close_connections()
+        ai_executor.shutdown(wait=False, cancel_futures=True)
+
+def _run_worker(worker_id, num_workers):
+    try:
+        asyncio.run(main_async(worker_id, num_workers, initialize_database=False))
+    except KeyboardInterrupt:
+        pass
+
+def run_workers(num_workers):
+    """Runs `num_workers` game server processes sharing the TCP and WS ports."""
+    prepare_database()
+    # SQLite connections must not cross a fork: the workers open their own.
+    database.close_connections()
+    workers = [Process(target=_run_worker, args=(i, num_workers), name=f"game-worker-{i}") for i in range(num_workers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
@@ -0,0 +1,102 @@
+"""
+Quick-match queues.
+Waiting players are kept per game mode in rating buckets of half the rating
+window, so every player in the same or a neighbouring bucket is within the
+window and pairing never scans the queue: enqueue, match and cancel are O(1).
+Cancelled or expired tickets are skipped lazily when they reach a bucket head.
+"""
+import logging
+import os
+import time
+from collections import deque
+from server.timer_wheel import timer_wheel
+
+QUICK_MATCH_TIMEOUT_SECONDS = float(os.getenv('QUICK_MATCH_TIMEOUT_SECONDS', '120'))
+QUICK_MATCH_RATING_WINDOW = float(os.getenv('QUICK_MATCH_RATING_WINDOW', '200'))
+
+class MatchTicket:
+    __slots__ = ("client_conn", "name", "game_mode", "rating", "enqueued_at", "timer", "active")
+
+    def __init__(self, client_conn, name, game_mode, rating):
+        self.client_conn = client_conn
+        self.name = name
+        self.game_mode = game_mode
+        self.rating = rating
+        self.enqueued_at = time.monotonic()
+        self.timer = None
+        self.active = True
+
+class Matchmaker:
+    def __init__(self, on_match, on_timeout, rating_window=QUICK_MATCH_RATING_WINDOW, timeout=QUICK_MATCH_TIMEOUT_SECONDS):
+        """
+        `on_match(first_ticket, second_ticket)` creates the room for a pair;
+        `on_timeout(ticket)` tells a player nobody was found in time.
+        """
+        self._on_match = on_match
+        self._on_timeout = on_timeout
+        self.timeout = timeout
+        self._bucket_width = max(rating_window / 2, 1)
+        self._queues = {} # game_mode -> {bucket: deque of MatchTicket}
+        self._tickets = {} # ClientConnection -> MatchTicket
+        self.waiting = 0
+
+    def _bucket(self, rating):
+        return int(rating // self._bucket_width)
+
+    def _candidate_buckets(self, bucket):
+        return (bucket, bucket - 1, bucket + 1)
+
+    def request(self, client_conn, name, game_mode, rating):
+        """
+        Pairs the player with a waiting opponent, or queues them.
+        Returns True if a match was made immediately.
+        """
+        if client_conn in self._tickets:
+            return False # Already waiting
+        ticket = MatchTicket(client_conn, name, game_mode, rating)
+        buckets = self._queues.setdefault(game_mode, {})
+        home = self._bucket(rating)
+
+        # Pair with the longest-waiting compatible player.
+        best_bucket = None
+        for bucket in self._candidate_buckets(home):
+            queue = buckets.get(bucket)
+            while queue and not queue[0].active:
+                queue.popleft()
+            if not queue:
+                buckets.pop(bucket, None)
+            elif best_bucket is None or queue[0].enqueued_at < buckets[best_bucket][0].enqueued_at:
+                best_bucket = bucket
+        if best_bucket is not None:
+            opponent = buckets[best_bucket].popleft()
+            if not buckets[best_bucket]:
+                del buckets[best_bucket]
+            self._release(opponent)
+            self._on_match(opponent, ticket)
+            return True
+
+        buckets.setdefault(home, deque()).append(ticket)
+        self._tickets[client_conn] = ticket
+        self.waiting += 1
+        ticket.timer = timer_wheel.schedule(self.timeout, self._expire, ticket)
+        logging.info(f"Quick match: {name} waiting for a {game_mode} game ({self.waiting} waiting).")
+        return False
+
+    def cancel(self, client_conn):
+        """Withdraws a player, e.g. when their connection closes."""
+        ticket = self._tickets.get(client_conn)
+        if ticket:
+            self._release(ticket)
+
+    def _release(self, ticket):
+        ticket.active = False
+        if ticket.timer:
+            ticket.timer.cancel()
+            ticket.timer = None
+        if self._tickets.pop(ticket.client_conn, None) is not None:
+            self.waiting -= 1
+
+    def _expire(self, ticket):
+        if ticket.active:
+            self._release(ticket)
+            self._on_timeout(ticket)
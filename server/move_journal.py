@@ -0,0 +1,211 @@
+"""
+Append-only binary journal of every move.
+Rooms append a fixed-size record per move (and one per result) in O(1) on
+the event loop; a background thread writes whatever has accumulated with one
+write and one fsync per batch, so thousands of moves per second cost a few
+syscalls and never block a room. Records go to numbered segment files that
+roll over at JOURNAL_SEGMENT_BYTES. Each process start opens a fresh segment,
+so a record torn by a crash is only ever at the end of a segment, where the
+reader drops it.
+Game IDs are reused (after a restart, or once a room is gone), and a room's
+restart begins a new game under the same ID, so every game also draws a
+random serial. Its first move is preceded by a START record, and each record
+carries the serial, so a replay never mixes two games that shared an ID.
+
+Run `python -m server.move_journal GAME_ID [SERIAL]` to print a game's replay.
+"""
+import logging
+import os
+import random
+import struct
+import sys
+import threading
+import time
+from typing import NamedTuple
+from server.compact_board import CODES, SYMBOLS
+from server.game_ids import GAME_ID_LENGTH
+
+JOURNAL_DIR = os.getenv('MOVE_JOURNAL_DIR', 'move_journal') # Empty disables the journal
+JOURNAL_SEGMENT_BYTES = int(os.getenv('MOVE_JOURNAL_SEGMENT_BYTES', str(64 * 1024 * 1024)))
+JOURNAL_FSYNC_INTERVAL_SECONDS = float(os.getenv('MOVE_JOURNAL_FSYNC_INTERVAL_SECONDS', '0.05'))
+
+# kind, game_id, serial, ply, row, col, mark, timestamp, clock
+RECORD = struct.Struct("<B8sIHBBBdf") # 30 bytes, little-endian, no padding
+RECORD_GAME_ID_BYTES = 8 # struct pads shorter IDs and silently cuts longer ones
+MOVE, RESULT, START = 0, 1, 2
+# Segments in the older 26-byte format (no serial) end in plain ".journal" and are not read.
+SEGMENT_SUFFIX = ".v2.journal"
+
+class JournalRecord(NamedTuple):
+    kind: int # MOVE, RESULT or START
+    game_id: str
+    serial: int # Tells apart games that were played under the same ID
+    ply: int # Moves played in the current game (restarts begin again at 1)
+    row: int
+    col: int
+    mark: str # Mover's symbol; for RESULT the winner, 'draw', or None
+    timestamp: float
+    clock: float # Mover's remaining time bank after the move
+
+class MoveJournal:
+    def __init__(self, directory, worker_id=0, segment_bytes=JOURNAL_SEGMENT_BYTES, fsync_interval=JOURNAL_FSYNC_INTERVAL_SECONDS):
+        self.directory = directory
+        self.worker_id = worker_id
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        os.makedirs(directory, exist_ok=True)
+        self._pending = [] # Packed records waiting for the writer thread
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._file = None
+        self._segment_size = 0
+        self._segment_number = self._last_segment_number()
+        self.records_written = 0
+        self._writer = threading.Thread(target=self._run, name=f"move-journal-{worker_id}", daemon=True)
+        self._writer.start()
+
+    # --- Appending (event loop side) ---
+    def append(self, kind, game_id, serial, ply, row, col, mark, clock):
+        record = RECORD.pack(kind, game_id.encode(), serial, ply, row, col, CODES[mark], time.time(), clock)
+        with self._lock:
+            self._pending.append(record)
+
+    def close(self):
+        """Writes and fsyncs everything appended so far, then stops the writer."""
+        self._closed = True
+        self._wake.set()
+        self._writer.join()
+
+    # --- Writing (background thread) ---
+    def _segment_prefix(self):
+        return f"moves-w{self.worker_id}-"
+
+    def _last_segment_number(self):
+        prefix = self._segment_prefix()
+        numbers = [
+            int(name[len(prefix):-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.startswith(prefix) and name.endswith(SEGMENT_SUFFIX)
+        ]
+        return max(numbers, default=0)
+
+    def _open_next_segment(self):
+        if self._file:
+            self._file.close()
+        self._segment_number += 1
+        path = os.path.join(self.directory, f"{self._segment_prefix()}{self._segment_number:06d}{SEGMENT_SUFFIX}")
+        self._file = open(path, 'ab')
+        self._segment_size = 0
+        logging.info(f"Move journal writing to {path}")
+
+    def _run(self):
+        while True:
+            # Batch: sleep for the fsync interval, then flush everything that arrived meanwhile.
+            self._wake.wait(self.fsync_interval)
+            self._wake.clear()
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if batch:
+                try:
+                    self._write(batch)
+                except OSError as e:
+                    logging.error(f"Move journal write failed, {len(batch)} records lost: {e}")
+            if self._closed:
+                if self._file:
+                    self._file.close()
+                return
+
+    def _write(self, batch):
+        if self._file is None or self._segment_size >= self.segment_bytes:
+            self._open_next_segment()
+        data = b"".join(batch)
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._segment_size += len(data)
+        self.records_written += len(batch)
+
+# --- Process-wide journal used by the rooms ---
+journal = None
+
+def configure(directory=JOURNAL_DIR, worker_id=0):
+    global journal
+    if directory and GAME_ID_LENGTH > RECORD_GAME_ID_BYTES:
+        raise ValueError(f"GAME_ID_LENGTH {GAME_ID_LENGTH} does not fit the journal's {RECORD_GAME_ID_BYTES}-byte game ID field")
+    if directory:
+        journal = MoveJournal(directory, worker_id)
+    return journal
+
+def new_serial():
+    """A serial for a new game; with the game ID it identifies the game in the journal."""
+    return random.getrandbits(32)
+
+def record_start(game_id, serial):
+    if journal is not None:
+        journal.append(START, game_id, serial, 0, 0, 0, None, 0.0)
+
+def record_move(game_id, serial, ply, row, col, mark, clock):
+    if journal is not None:
+        journal.append(MOVE, game_id, serial, ply, row, col, mark, clock)
+
+def record_result(game_id, serial, ply, winner):
+    if journal is not None:
+        journal.append(RESULT, game_id, serial, ply, 0, 0, winner, 0.0)
+
+def close():
+    global journal
+    if journal is not None:
+        journal.close()
+        journal = None
+
+# --- Reading ---
+def segment_paths(directory=JOURNAL_DIR):
+    """Every segment, oldest first within each worker."""
+    names = sorted(name for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(directory, name) for name in names]
+
+def read_segment(path, chunk_records=4096):
+    """Streams the records in one segment without loading it whole; drops a torn final record."""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(RECORD.size * chunk_records)
+            usable = len(chunk) - len(chunk) % RECORD.size
+            for kind, game_id, serial, ply, row, col, mark, timestamp, clock in RECORD.iter_unpack(chunk[:usable]):
+                yield JournalRecord(kind, game_id.rstrip(b"\0").decode(), serial, ply, row, col, SYMBOLS[mark], timestamp, clock)
+            if len(chunk) < RECORD.size * chunk_records:
+                return
+
+def games(game_id, directory=JOURNAL_DIR):
+    """Returns (started_at, serial) for every game journaled under `game_id`, oldest first."""
+    started = {}
+    for path in segment_paths(directory):
+        for record in read_segment(path):
+            if record.game_id == game_id and record.kind == START:
+                started[record.serial] = record.timestamp
+    return sorted((timestamp, serial) for serial, timestamp in started.items())
+
+def replay(game_id, serial=None, directory=JOURNAL_DIR):
+    """
+    Streams the records of one game played under `game_id`, in the order they
+    were written: the game with `serial`, or by default the latest one started.
+    """
+    if serial is None:
+        started = games(game_id, directory)
+        if not started:
+            return
+        serial = started[-1][1]
+    for path in segment_paths(directory):
+        for record in read_segment(path):
+            if record.game_id == game_id and record.serial == serial:
+                yield record
+
+if __name__ == "__main__":
+    for record in replay(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else None):
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.timestamp))
+        if record.kind == START:
+            print(f"{when}  game {record.game_id} (serial {record.serial}) started")
+        elif record.kind == MOVE:
+            print(f"{when}  ply {record.ply:>3}  {record.mark} -> ({record.row}, {record.col})  clock {record.clock:.1f}s")
+        else:
+            print(f"{when}  result after {record.ply} moves: {record.mark or 'no winner'}")
@@ -1,6 +1,8 @@
+import json
 from dataclasses import dataclass, asdict
 from typing import Optional, Dict, List
 from enum import Enum
+from server.game_ids import normalize as normalize_game_id
 
 class MessageType(str, Enum):
     """Defines the valid types for server-client communication."""
@@ -8,6 +10,11 @@ class MessageType(str, Enum):
     GAME_STATE = "gameState"
     GAME_CREATED = "game_created"
     GAME_JOINED = "game_joined"
+    SPECTATING = "spectating"
+    SESSION_RESUMED = "session_resumed"
+    MATCH_QUEUED = "match_queued"
+    LOBBY = "lobby"
+    LOBBY_UPDATE = "lobby_update"
     ERROR = "error"
     
     # Client-to-server
@@ -17,12 +24,139 @@ class MessageType(str, Enum):
     MOVE = "move"
     RESTART = "restart"
     RECONNECT = "reconnect" # New
+    SPECTATE_GAME = "spectate_game"
+    RESUME = "resume"
+    QUICK_MATCH = "quick_match"
+    LIST_GAMES = "list_games"
+    SUBSCRIBE_LOBBY = "subscribe_lobby"
+
+# --- Inbound Message Validation ---
+GAME_MODES = ("standard", "ultimate", "gomoku")
+MAX_BOARD_SIZE = 19 # Largest board edge of any mode (gomoku boards go up to 19x19)
+MIN_GOMOKU_BOARD_SIZE = 3
+GOMOKU_DEFAULT_BOARD_SIZE = 15
+GOMOKU_DEFAULT_WIN_LENGTH = 5
+MAX_NAME_LENGTH = 64
+MAX_GAME_ID_LENGTH = 16
+MAX_SESSION_TOKEN_LENGTH = 64
+
+CLIENT_MESSAGE_TYPES = {
+    t.value: t for t in (
+        MessageType.CREATE_GAME,
+        MessageType.CREATE_AI_GAME,
+        MessageType.JOIN_GAME,
+        MessageType.MOVE,
+        MessageType.RESTART,
+        MessageType.RECONNECT,
+        MessageType.SPECTATE_GAME,
+        MessageType.RESUME,
+        MessageType.QUICK_MATCH,
+        MessageType.LIST_GAMES,
+        MessageType.SUBSCRIBE_LOBBY,
+    )
+}
+
+class ProtocolError(Exception):
+    """
+    Raised when an inbound message is malformed or out of bounds.
+    These are expected for garbage traffic, so callers should log the message
+    only and never attach a traceback.
+    """
+
+@dataclass(slots=True)
+class ClientMessage:
+    """A parsed and validated client-to-server message."""
+    type: MessageType
+    name: str = "Anonymous"
+    game_mode: Optional[str] = "standard"
+    game_id: Optional[str] = None
+    row: int = -1
+    col: int = -1
+    session_token: Optional[str] = None
+    last_seq: int = 0
+    limit: int = 20
+    board_size: Optional[int] = None # gomoku only
+    win_length: Optional[int] = None # gomoku only
+
+def _require_str(data, field, max_length, default=None):
+    value = data.get(field, default)
+    if not isinstance(value, str) or not value or len(value) > max_length:
+        raise ProtocolError(f"Invalid '{field}'")
+    return value
+
+def _require_game_id(data):
+    game_id = normalize_game_id(_require_str(data, "game_id", MAX_GAME_ID_LENGTH))
+    if game_id is None:
+        raise ProtocolError("Invalid 'game_id'")
+    return game_id
+
+def _require_coord(data, field):
+    value = data.get(field)
+    # bool is a subclass of int, so it has to be excluded explicitly.
+    if type(value) is not int or not 0 <= value < MAX_BOARD_SIZE:
+        raise ProtocolError(f"Invalid '{field}'")
+    return value
+
+def _require_int(data, field, default, low, high):
+    value = data.get(field, default)
+    if type(value) is not int or not low <= value <= high:
+        raise ProtocolError(f"Invalid '{field}'")
+    return value
+
+def parse_client_message(message_str) -> ClientMessage:
+    """
+    Decodes and validates a raw client message.
+    Raises ProtocolError on anything the server would not be able to act on.
+    """
+    try:
+        data = json.loads(message_str)
+    except ValueError:
+        raise ProtocolError("Invalid JSON") from None
+    if not isinstance(data, dict):
+        raise ProtocolError("Message is not an object")
+
+    msg_type = CLIENT_MESSAGE_TYPES.get(data.get("type"))
+    if msg_type is None:
+        raise ProtocolError("Unknown message type")
+
+    message = ClientMessage(type=msg_type)
+    if msg_type in (MessageType.CREATE_GAME, MessageType.CREATE_AI_GAME, MessageType.QUICK_MATCH):
+        message.game_mode = data.get("game_mode", "standard")
+        if message.game_mode not in GAME_MODES:
+            raise ProtocolError("Invalid 'game_mode'")
+        message.name = _require_str(data, "name", MAX_NAME_LENGTH, "Anonymous")
+        # Quick matches always use the default gomoku board, so players in one queue agree on it.
+        if message.game_mode == "gomoku" and msg_type != MessageType.QUICK_MATCH:
+            message.board_size = _require_int(data, "board_size", GOMOKU_DEFAULT_BOARD_SIZE, MIN_GOMOKU_BOARD_SIZE, MAX_BOARD_SIZE)
+            message.win_length = _require_int(data, "win_length", min(GOMOKU_DEFAULT_WIN_LENGTH, message.board_size), 3, message.board_size)
+    elif msg_type in (MessageType.JOIN_GAME, MessageType.SPECTATE_GAME):
+        message.game_id = _require_game_id(data)
+        message.name = _require_str(data, "name", MAX_NAME_LENGTH, "Anonymous")
+    elif msg_type in (MessageType.RESUME, MessageType.RECONNECT):
+        # The seat is whichever one the session token was issued for.
+        message.game_id = _require_game_id(data)
+        message.session_token = _require_str(data, "session_token", MAX_SESSION_TOKEN_LENGTH)
+        message.last_seq = data.get("last_seq", 0)
+        if type(message.last_seq) is not int or message.last_seq < 0:
+            raise ProtocolError("Invalid 'last_seq'")
+    elif msg_type in (MessageType.LIST_GAMES, MessageType.SUBSCRIBE_LOBBY):
+        # No game_mode means every mode.
+        message.game_mode = data.get("game_mode")
+        if message.game_mode is not None and message.game_mode not in GAME_MODES:
+            raise ProtocolError("Invalid 'game_mode'")
+        message.limit = data.get("limit", 20)
+        if type(message.limit) is not int or message.limit < 1:
+            raise ProtocolError("Invalid 'limit'")
+    elif msg_type == MessageType.MOVE:
+        message.row = _require_coord(data, "row")
+        message.col = _require_coord(data, "col")
+    return message
 
 
 # --- Data Structures for Game State ---
 @dataclass
 class GameState:
-    board: Optional[List[List[Optional[str]]]]
+    board: Optional[List] # Rows of cells; gomoku sends each row as a string ('.' for empty)
     current_player: str
     game_over: bool
     winner: Optional[str]
@@ -33,6 +167,10 @@ class GameState:
     micro_boards: Optional[List[List[List[Optional[str]]]]] = None
     macro_board: Optional[List[List[Optional[str]]]] = None
     active_micro_board_coords: Optional[List[int]] = None
+    # Fields for N x N, k-in-a-row (gomoku)
+    board_size: Optional[int] = None
+    win_length: Optional[int] = None
+    last_move: Optional[List[int]] = None
 
 # --- Specific, Standalone Response Types ---
 # No base class is used to avoid the default argument inheritance issue.
@@ -40,18 +178,49 @@ class GameState:
 class GameStateResponse:
     state: GameState
     type: str = MessageType.GAME_STATE
+    seq: int = 0 # Per-room event sequence number, echoed back as RESUME's last_seq
 
 @dataclass
 class GameCreatedResponse:
     game_id: str
     player_symbol: str
     type: str = MessageType.GAME_CREATED
+    session_token: Optional[str] = None
 
 @dataclass
 class GameJoinedResponse:
     game_id: str
     player_symbol: str
     type: str = MessageType.GAME_JOINED
+    session_token: Optional[str] = None
+
+@dataclass
+class SessionResumedResponse:
+    game_id: str
+    player_symbol: str
+    seq: int
+    type: str = MessageType.SESSION_RESUMED
+
+@dataclass
+class SpectatingResponse:
+    game_id: str
+    type: str = MessageType.SPECTATING
+
+@dataclass
+class MatchQueuedResponse:
+    game_mode: str
+    type: str = MessageType.MATCH_QUEUED
+
+@dataclass
+class LobbyResponse:
+    games: List[Dict[str, Optional[str]]]
+    type: str = MessageType.LOBBY
+
+@dataclass
+class LobbyUpdateResponse:
+    op: str # "add" or "remove"
+    game: Dict[str, Optional[str]]
+    type: str = MessageType.LOBBY_UPDATE
 
 @dataclass
 class ErrorResponse:
@@ -60,4 +229,8 @@ class ErrorResponse:
 
 def to_dict(response) -> Dict:
     """Converts any of the response dataclasses to a dictionary."""
-    return asdict(response)
\ No newline at end of file
+    return asdict(response)
+
+def encode(response) -> str:
+    """Serializes a response dataclass to its wire format."""
+    return json.dumps(asdict(response))
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""
+Write-behind recorder for game results.
+Rooms enqueue a finished game's result in O(1) and carry on; one background
+thread holds a pooled sqlite connection and drains the queue in batches,
+committing each batch as a single transaction (one commit however many
+games ended at once). Nothing on the event loop ever waits for the database.
+close() drains everything still queued before returning.
+"""
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from database import database
+
+RESULT_BATCH_SIZE = int(os.getenv('RESULT_WRITER_BATCH_SIZE', '256'))
+RESULT_WRITE_ATTEMPTS = 3
+QUEUE_DEPTH_WARN = int(os.getenv('RESULT_WRITER_QUEUE_WARN', '1000'))
+
+class ResultWriter:
+    def __init__(self, batch_size=RESULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        # --- Metrics ---
+        self.max_queue_depth = 0
+        self.results_written = 0
+        self.batches_written = 0
+        self.last_batch_size = 0
+        self.last_commit_seconds = 0.0
+        self.results_dropped = 0
+        self._behind = False # Set while the queue is past QUEUE_DEPTH_WARN, so the warning fires once per backlog
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "results_written": self.results_written,
+            "batches_written": self.batches_written,
+            "last_batch_size": self.last_batch_size,
+            "last_commit_seconds": self.last_commit_seconds,
+            "results_dropped": self.results_dropped,
+        }
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+            self._thread.start()
+
+    def record(self, winner_name, loser_name, outcome, game_mode='standard'):
+        """Queues a result; the timestamp is taken now, when the game ended."""
+        self._queue.put((winner_name, loser_name, outcome, game_mode, datetime.now().isoformat()))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        if depth >= QUEUE_DEPTH_WARN and not self._behind:
+            self._behind = True
+            logging.warning(f"Result writer is falling behind: {depth} results queued")
+
+    def flush(self):
+        """Blocks until every result queued so far is committed."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """Commits everything still queued, then stops the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        logging.info(f"Result writer stopped after {self.results_written} results in {self.batches_written} batches")
+
+    def _run(self):
+        # The writer keeps one pooled connection for its whole life.
+        with database.connection() as conn:
+            stopping = False
+            while not (stopping and self._queue.empty()):
+                # Block for the first result, then take whatever else is already waiting.
+                batch = [self._queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stopping = stopping or None in batch
+                results = [result for result in batch if result is not None]
+                if results:
+                    self._write(conn, results)
+                for _ in batch:
+                    self._queue.task_done()
+                self._check_caught_up()
+
+    def _check_caught_up(self):
+        # Re-arms the warning only once the queue is well below the threshold,
+        # so a depth hovering around it does not log on every result.
+        if self._behind and self._queue.qsize() <= QUEUE_DEPTH_WARN // 2:
+            self._behind = False
+            logging.info(f"Result writer caught up: {self._queue.qsize()} results queued")
+
+    def _write(self, conn, results):
+        for attempt in range(1, RESULT_WRITE_ATTEMPTS + 1):
+            started = time.monotonic()
+            try:
+                database.record_game_results(results, conn)
+            except sqlite3.Error as e:
+                logging.error(f"Writing {len(results)} results failed (attempt {attempt}): {e}")
+                time.sleep(0.1 * attempt)
+                continue
+            self.last_commit_seconds = time.monotonic() - started
+            self.last_batch_size = len(results)
+            self.results_written += len(results)
+            self.batches_written += 1
+            return
+        self.results_dropped += len(results)
+        logging.error(f"Dropped {len(results)} game results after {RESULT_WRITE_ATTEMPTS} attempts: {results}")
+
+result_writer = ResultWriter()
+
+def start():
+    result_writer.start()
+
+def close():
+    result_writer.close()
+
+def record_game_result(winner_name, loser_name, outcome, game_mode='standard'):
+    """Records a result through the writer thread, or directly if it is not running (e.g. tools, tests)."""
+    if result_writer.running:
+        result_writer.record(winner_name, loser_name, outcome, game_mode)
+    else:
+        database.record_game_result(winner_name, loser_name, outcome, game_mode)
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import os
+import time
+
+class RoomActor:
+    """
+    Serializes every operation on a single game room.
+    Connection loops only enqueue commands; one consumer task per room runs
+    them in arrival order, so room state never interleaves across awaits and
+    a slow command (e.g. an AI search) never stalls a connection's reads.
+    """
+    __slots__ = (
+        "game_id", "_queue", "_consumer", "_stopped",
+        "commands_processed", "last_queue_latency", "max_queue_latency", "latency_warn_threshold",
+    )
+
+    def __init__(self, game_id):
+        self.game_id = game_id
+        self._queue = None # Created with the consumer; idle rooms never allocate one
+        self._consumer = None
+        self._stopped = False
+        # --- Queue Latency Metrics ---
+        self.commands_processed = 0
+        self.last_queue_latency = 0.0
+        self.max_queue_latency = 0.0
+        self.latency_warn_threshold = float(os.getenv('ROOM_QUEUE_LATENCY_WARN_SECONDS', '0.5'))
+
+    def submit(self, command, *args):
+        """Enqueues `command(*args)` to run on this room's consumer task."""
+        if self._stopped:
+            return
+        if self._consumer is None:
+            self._queue = asyncio.Queue()
+            self._consumer = asyncio.create_task(self._run())
+        self._queue.put_nowait((time.monotonic(), command, args))
+
+    def stop(self):
+        """Lets the consumer finish queued commands, then exit."""
+        if self._stopped:
+            return
+        self._stopped = True
+        if self._consumer is not None:
+            self._queue.put_nowait(None)
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self):
+        return {
+            "game_id": self.game_id,
+            "queue_depth": self.queue_depth,
+            "commands_processed": self.commands_processed,
+            "last_queue_latency": self.last_queue_latency,
+            "max_queue_latency": self.max_queue_latency,
+        }
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            enqueued_at, command, args = item
+
+            latency = time.monotonic() - enqueued_at
+            self.last_queue_latency = latency
+            if latency > self.max_queue_latency:
+                self.max_queue_latency = latency
+            if latency > self.latency_warn_threshold:
+                logging.warning(f"[Game {self.game_id}] Command waited {latency:.3f}s in room queue (depth {self.queue_depth})")
+
+            try:
+                await command(*args)
+            except Exception as e:
+                logging.error(f"[Game {self.game_id}] Error running room command: {e}", exc_info=True)
+            self.commands_processed += 1
@@ -0,0 +1,257 @@
+"""
+Pluggable pub/sub brokers that let one room be shared by several server nodes.
+
+A broker delivers messages published on a topic to every subscriber of that
+topic and reports how many subscribers received them, so a publisher can tell
+when nobody owns a room. Two implementations ship here:
+
+* InMemoryRoomBus: all nodes in one process (tests, single-box simulations).
+* LocalSocketRoomBus + LocalSocketBusHub: nodes in separate processes on one
+  machine, connected through a small hub on a Unix socket.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+
+ROOM_BUS_ACK_TIMEOUT_SECONDS = float(os.getenv('ROOM_BUS_ACK_TIMEOUT_SECONDS', '5'))
+
+class RoomBus:
+    """Interface every broker implements. Callbacks are `async def callback(data)`."""
+    async def publish(self, topic, data) -> int:
+        raise NotImplementedError
+
+    async def subscribe(self, topic, callback):
+        raise NotImplementedError
+
+    async def unsubscribe(self, topic, callback):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+# --- In-Process Broker ---
+class InMemoryRoomBus(RoomBus):
+    def __init__(self):
+        self._subscribers = {} # topic -> list of callbacks
+
+    async def publish(self, topic, data):
+        callbacks = list(self._subscribers.get(topic, ()))
+        for callback in callbacks:
+            try:
+                await callback(data)
+            except Exception as e:
+                logging.error(f"Room bus subscriber for {topic} failed: {e}", exc_info=True)
+        return len(callbacks)
+
+    async def subscribe(self, topic, callback):
+        self._subscribers.setdefault(topic, []).append(callback)
+
+    async def unsubscribe(self, topic, callback):
+        callbacks = self._subscribers.get(topic)
+        if callbacks and callback in callbacks:
+            callbacks.remove(callback)
+            if not callbacks:
+                del self._subscribers[topic]
+
+# --- Local-Socket Broker ---
+# Wire format: one JSON object per line.
+#   node -> hub: {"op": "sub"|"unsub", "topic": t}
+#                {"op": "pub", "topic": t, "data": d, "id": n}
+#   hub -> node: {"op": "ack", "id": n, "count": c}
+#                {"op": "msg", "topic": t, "data": d}
+
+class LocalSocketBusHub:
+    """Routes messages between LocalSocketRoomBus clients connected to one Unix socket."""
+    def __init__(self, path):
+        self.path = path
+        self._subscribers = {} # topic -> set of StreamWriters
+
+    async def serve_forever(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        server = await asyncio.start_unix_server(self._handle_node, self.path)
+        logging.info(f"Room bus hub listening on {self.path}")
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_node(self, reader, writer):
+        topics = set()
+        try:
+            while line := await reader.readline():
+                frame = json.loads(line)
+                op, topic = frame.get("op"), frame.get("topic")
+                if op == "sub":
+                    self._subscribers.setdefault(topic, set()).add(writer)
+                    topics.add(topic)
+                elif op == "unsub":
+                    self._drop(topic, writer)
+                    topics.discard(topic)
+                elif op == "pub":
+                    receivers = list(self._subscribers.get(topic, ()))
+                    message = (json.dumps({"op": "msg", "topic": topic, "data": frame["data"]}) + '\n').encode()
+                    for receiver in receivers:
+                        receiver.write(message)
+                    writer.write((json.dumps({"op": "ack", "id": frame["id"], "count": len(receivers)}) + '\n').encode())
+                    await writer.drain()
+        except (ConnectionResetError, ValueError) as e:
+            logging.info(f"Room bus node disconnected: {e}")
+        finally:
+            for topic in topics:
+                self._drop(topic, writer)
+            writer.close()
+
+    def _drop(self, topic, writer):
+        writers = self._subscribers.get(topic)
+        if writers:
+            writers.discard(writer)
+            if not writers:
+                del self._subscribers[topic]
+
+class LocalSocketRoomBus(RoomBus):
+    """A node's connection to a LocalSocketBusHub."""
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._subscribers = {} # topic -> list of callbacks
+        self._pending_acks = {} # publish id -> Future
+        self._ids = itertools.count()
+        self._closed = False # Set once the hub connection is gone; publishes then reach nobody
+        # Deliveries run on their own task so a callback may itself publish and
+        # wait for an ack without blocking the reader that receives that ack.
+        self._deliveries = asyncio.Queue()
+        self._receiver = asyncio.create_task(self._receive())
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    @classmethod
+    async def connect(cls, path):
+        reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer)
+
+    async def _send(self, frame):
+        """Writes a frame to the hub; returns False if the hub connection is gone."""
+        if self._closed:
+            return False
+        try:
+            self._writer.write((json.dumps(frame) + '\n').encode())
+            await self._writer.drain()
+        except (ConnectionError, OSError) as e:
+            logging.warning(f"Room bus hub connection lost: {e}")
+            self._mark_closed()
+            return False
+        return True
+
+    async def publish(self, topic, data):
+        """
+        Returns how many subscribers received `data`. Without a live hub, or
+        if no ack comes within ROOM_BUS_ACK_TIMEOUT_SECONDS, that is 0, so a
+        room broadcasting to a remote player never waits on a dead hub.
+        """
+        publish_id = next(self._ids)
+        ack = asyncio.get_running_loop().create_future()
+        self._pending_acks[publish_id] = ack
+        try:
+            if not await self._send({"op": "pub", "topic": topic, "data": data, "id": publish_id}):
+                return 0
+            return await asyncio.wait_for(ack, ROOM_BUS_ACK_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logging.warning(f"Room bus publish to {topic} was not acknowledged in {ROOM_BUS_ACK_TIMEOUT_SECONDS}s")
+            return 0
+        finally:
+            self._pending_acks.pop(publish_id, None)
+
+    async def subscribe(self, topic, callback):
+        callbacks = self._subscribers.setdefault(topic, [])
+        callbacks.append(callback)
+        if len(callbacks) == 1:
+            await self._send({"op": "sub", "topic": topic})
+
+    async def unsubscribe(self, topic, callback):
+        callbacks = self._subscribers.get(topic)
+        if callbacks and callback in callbacks:
+            callbacks.remove(callback)
+            if not callbacks:
+                del self._subscribers[topic]
+                await self._send({"op": "unsub", "topic": topic})
+
+    async def _receive(self):
+        try:
+            while line := await self._reader.readline():
+                frame = json.loads(line)
+                if frame["op"] == "ack":
+                    ack = self._pending_acks.pop(frame["id"], None)
+                    if ack and not ack.done():
+                        ack.set_result(frame["count"])
+                elif frame["op"] == "msg":
+                    self._deliveries.put_nowait(frame)
+        except (ConnectionError, ValueError) as e:
+            logging.warning(f"Room bus hub connection failed: {e}")
+        finally:
+            logging.warning("Room bus hub connection closed.")
+            self._mark_closed()
+
+    def _mark_closed(self):
+        """Resolves every publish still waiting on the hub with 0; later publishes return 0 at once."""
+        self._closed = True
+        for ack in self._pending_acks.values():
+            if not ack.done():
+                ack.set_result(0)
+
+    async def _dispatch(self):
+        while True:
+            frame = await self._deliveries.get()
+            for callback in list(self._subscribers.get(frame["topic"], ())):
+                try:
+                    await callback(frame["data"])
+                except Exception as e:
+                    logging.error(f"Room bus subscriber for {frame['topic']} failed: {e}", exc_info=True)
+
+    async def close(self):
+        self._receiver.cancel()
+        self._dispatcher.cancel()
+        self._writer.close()
+
+# --- Remote Room Attachment ---
+def command_topic(game_id):
+    """Topic the owning node listens on for a room's player commands."""
+    return f"room.{game_id}.commands"
+
+def connection_topic(game_id, conn_id):
+    """Topic a non-owning node listens on for state sent to one of its connections."""
+    return f"room.{game_id}.to.{conn_id}"
+
+class RemoteRoomLink:
+    """
+    Attaches a local connection to a room owned by another node.
+    Has the same forward()/close() shape as WorkerRelay, so the connection
+    handler treats both hand-offs alike.
+    """
+    def __init__(self, bus, client_conn, game_id, conn_id):
+        self.bus = bus
+        self.client_conn = client_conn
+        self.game_id = game_id
+        self.conn_id = conn_id
+
+    @classmethod
+    async def open(cls, bus, client_conn, game_id, conn_id):
+        link = cls(bus, client_conn, game_id, conn_id)
+        await bus.subscribe(connection_topic(game_id, conn_id), link._deliver)
+        return link
+
+    async def _deliver(self, message):
+        try:
+            await self.client_conn.send_raw(message)
+        except Exception:
+            pass # The disconnection will be handled by the main server loop
+
+    async def forward(self, message_str):
+        """Sends a raw client message to the owning node; returns how many nodes received it."""
+        return await self.bus.publish(command_topic(self.game_id), {"conn": self.conn_id, "message": message_str})
+
+    async def _close(self):
+        await self.bus.unsubscribe(connection_topic(self.game_id, self.conn_id), self._deliver)
+        await self.bus.publish(command_topic(self.game_id), {"conn": self.conn_id, "closed": True})
+
+    def close(self):
+        asyncio.create_task(self._close())
@@ -0,0 +1,38 @@
+"""
+Measures the memory an idle room costs, in bytes per room.
+Run with `python -m server.room_memory [rooms]` to check the effect of changes
+to room state (slots, board storage, lazily created members).
+"""
+import asyncio
+import gc
+import sys
+import tracemalloc
+from server.game_room import Game
+from server.ultimate_game_room import UltimateGame
+from server.ai_game_room import AIGameRoom
+from server.ultimate_ai_game_room import UltimateAIGameRoom
+from server.gomoku_game_room import GomokuGame
+
+def bytes_per_room(room_class, count=2000, **room_kwargs):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        rooms = [room_class(f"{i:04d}", None, **room_kwargs) for i in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del rooms
+    return (after - before) / count
+
+async def main(count):
+    # Rooms create asyncio primitives, so they are built inside a running loop.
+    for room_class, room_kwargs in (
+        (Game, {}), (UltimateGame, {}),
+        (AIGameRoom, {"executor": None}), (UltimateAIGameRoom, {"executor": None}),
+        (GomokuGame, {}),
+    ):
+        print(f"{room_class.__name__:<20} {bytes_per_room(room_class, count, **room_kwargs):>8.0f} bytes/room")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,348 @@
+"""
+Rules engine shared by every room and both AIs.
+Boards keep, for each mark, how many cells it holds on every winning line.
+Placing a mark touches at most four counters, so wins, draws and legal moves
+are answered from that state instead of re-scanning the board after each move.
+Large k-in-a-row boards use per-player bitboards instead (see GomokuBoard).
+"""
+from server.compact_board import CompactBoard, EMPTY, X, O, DRAW, SYMBOLS, CODES
+
+# The eight winning lines of a 3x3 grid, as row-major cell indexes.
+WIN_LINES = (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8), # Rows
+    (0, 3, 6), (1, 4, 7), (2, 5, 8), # Columns
+    (0, 4, 8), (2, 4, 6),            # Diagonals
+)
+# For each cell, the lines passing through it (2 to 4 of them).
+CELL_LINES = tuple(tuple(line for line, cells in enumerate(WIN_LINES) if cell in cells) for cell in range(9))
+# Counters for one 3x3 grid: index code * 8 + line, for every mark code including DRAW.
+COUNTERS_PER_GRID = 4 * len(WIN_LINES)
+
+def other(symbol):
+    return "O" if symbol == "X" else "X"
+
+def _add_mark(counts, base, cell, code):
+    """Counts `code` on `cell`; returns True if it completes a line."""
+    completed = False
+    for line in CELL_LINES[cell]:
+        index = base + code * 8 + line
+        counts[index] += 1
+        if counts[index] == 3:
+            completed = True
+    return completed
+
+def _remove_mark(counts, base, cell, code):
+    for line in CELL_LINES[cell]:
+        counts[base + code * 8 + line] -= 1
+
+def _line_score(counts, base, code):
+    """Heuristic control of a grid: 100 per completed line, 10 per open two, 1 per open one."""
+    opponent = O if code == X else X
+    score = 0
+    for line in range(8):
+        mine = counts[base + code * 8 + line]
+        if mine == 3:
+            score += 100
+        elif mine and not counts[base + opponent * 8 + line]:
+            score += 10 if mine == 2 else 1
+    return score
+
+class TicTacToeBoard(CompactBoard):
+    """A 3x3 board with line counters. Also the macro-board of an ultimate game."""
+    __slots__ = ("line_counts", "filled", "winner")
+
+    def __init__(self):
+        super().__init__(3)
+        self.line_counts = bytearray(COUNTERS_PER_GRID)
+        self.filled = 0
+        self.winner = EMPTY # Code of the first player to complete a line
+
+    @classmethod
+    def from_wire(cls, rows):
+        board = cls()
+        for r, row in enumerate(rows):
+            for c, cell in enumerate(row):
+                if cell is not None:
+                    board.place(r * 3 + c, CODES[cell])
+        return board
+
+    def copy(self):
+        board = TicTacToeBoard()
+        board.cells[:] = self.cells
+        board.line_counts[:] = self.line_counts
+        board.filled = self.filled
+        board.winner = self.winner
+        return board
+
+    def place(self, cell, code):
+        """Marks an empty cell (row-major index) with a mark code in O(1)."""
+        self.cells[cell] = code
+        self.filled += 1
+        if _add_mark(self.line_counts, 0, cell, code) and code != DRAW and not self.winner:
+            self.winner = code
+
+    def unplace(self, cell):
+        """Takes back the mark on `cell`; used by searches to undo a move."""
+        code = self.cells[cell]
+        self.cells[cell] = EMPTY
+        self.filled -= 1
+        _remove_mark(self.line_counts, 0, cell, code)
+        if self.winner == code and 3 not in self.line_counts[code * 8:code * 8 + 8]:
+            self.winner = EMPTY
+
+    def set(self, row, col, symbol):
+        self.place(row * 3 + col, CODES[symbol])
+
+    def is_full(self):
+        return self.filled == 9
+
+    @property
+    def ply(self):
+        """Marks placed so far, i.e. moves played on a standard board."""
+        return self.filled
+
+    def result(self):
+        """Returns 'X' or 'O' for a completed line, 'draw' for a full board, otherwise None."""
+        if self.winner:
+            return SYMBOLS[self.winner]
+        return 'draw' if self.filled == 9 else None
+
+    def empty_cells(self):
+        return [cell for cell in range(9) if not self.cells[cell]]
+
+    def legal_moves(self):
+        """Open (row, col) cells, or none once the game is decided."""
+        if self.result():
+            return []
+        return [divmod(cell, 3) for cell in self.empty_cells()]
+
+    def score(self, symbol):
+        return _line_score(self.line_counts, 0, CODES[symbol])
+
+class UltimateBoard:
+    """
+    The full state of an Ultimate Tic-Tac-Toe game.
+    Cells live in one 9x9 grid in absolute coordinates; each micro-board's
+    line counters are a 32-byte slice of one bytearray, and its result is
+    written to the macro-board the moment it is decided.
+    """
+    __slots__ = ("grid", "micro_counts", "micro_filled", "macro", "active")
+
+    def __init__(self):
+        self.grid = CompactBoard(9)
+        self.micro_counts = bytearray(9 * COUNTERS_PER_GRID)
+        self.micro_filled = bytearray(9)
+        self.macro = TicTacToeBoard()
+        self.active = None # [macro_row, macro_col] of the board to play in, or None for any
+
+    @classmethod
+    def from_wire(cls, micro_boards, macro_board, active):
+        board = cls()
+        for micro, rows in enumerate(micro_boards):
+            top, left = (micro // 3) * 3, (micro % 3) * 3
+            for r, row in enumerate(rows):
+                for c, cell in enumerate(row):
+                    if cell is not None:
+                        board.grid.set(top + r, left + c, cell)
+                        _add_mark(board.micro_counts, micro * COUNTERS_PER_GRID, r * 3 + c, CODES[cell])
+                        board.micro_filled[micro] += 1
+        board.macro = TicTacToeBoard.from_wire(macro_board)
+        board.active = list(active) if active else None
+        return board
+
+    def copy(self):
+        board = UltimateBoard.__new__(UltimateBoard)
+        board.grid = CompactBoard(9, bytearray(self.grid.cells))
+        board.micro_counts = bytearray(self.micro_counts)
+        board.micro_filled = bytearray(self.micro_filled)
+        board.macro = self.macro.copy()
+        board.active = self.active
+        return board
+
+    def micro_wire(self):
+        """The nine 3x3 micro-boards as nested lists, in the order clients expect."""
+        return [self.grid.subgrid((i // 3) * 3, (i % 3) * 3) for i in range(9)]
+
+    def is_legal(self, row, col):
+        macro_row, macro_col = row // 3, col // 3
+        if self.active and (macro_row, macro_col) != tuple(self.active):
+            return False
+        return self.macro.is_empty(macro_row, macro_col) and self.grid.is_empty(row, col)
+
+    def play(self, row, col, symbol):
+        """
+        Applies a legal move in O(1): marks the cell, decides its micro-board
+        and picks the next active board. Returns the game result, if any.
+        """
+        code = CODES[symbol]
+        macro_row, macro_col = row // 3, col // 3
+        micro_row, micro_col = row % 3, col % 3
+        micro = macro_row * 3 + macro_col
+
+        self.grid.cells[row * 9 + col] = code
+        self.micro_filled[micro] += 1
+        if _add_mark(self.micro_counts, micro * COUNTERS_PER_GRID, micro_row * 3 + micro_col, code):
+            self.macro.place(micro, code)
+        elif self.micro_filled[micro] == 9:
+            self.macro.place(micro, DRAW)
+
+        result = self.macro.result()
+        if result is None:
+            # The next player is sent to the board matching the cell just played, unless it is decided.
+            self.active = [micro_row, micro_col] if self.macro.is_empty(micro_row, micro_col) else None
+        return result
+
+    def result(self):
+        return self.macro.result()
+
+    @property
+    def ply(self):
+        return sum(self.micro_filled)
+
+    def legal_moves(self):
+        """Every legal (row, col) move, or none once the game is decided."""
+        if self.macro.result():
+            return []
+        if self.active and self.macro.is_empty(*self.active):
+            boards = (self.active[0] * 3 + self.active[1],)
+        else:
+            boards = self.macro.empty_cells()
+        cells = self.grid.cells
+        moves = []
+        for micro in boards:
+            top, left = (micro // 3) * 3, (micro % 3) * 3
+            for r in range(top, top + 3):
+                for c in range(left, left + 3):
+                    if not cells[r * 9 + c]:
+                        moves.append((r, c))
+        return moves
+
+    def score(self, symbol):
+        """Board control for `symbol`: the macro-board weighs 200 times an open micro-board."""
+        code = CODES[symbol]
+        score = self.macro.score(symbol) * 200
+        for micro in self.macro.empty_cells():
+            score += _line_score(self.micro_counts, micro * COUNTERS_PER_GRID, code)
+        return score
+
+class GomokuBoard:
+    """
+    An N x N board won by `win_length` marks in a row (e.g. 15x15, five in a row).
+    Each player's marks are one integer bitboard. Rows are `size + 1` bits
+    apart, so the spare bit at the end of every row stops shifts along rows and
+    diagonals from wrapping onto the next row.
+    """
+    __slots__ = ("size", "win_length", "stride", "bits", "filled", "winner", "last_move")
+
+    def __init__(self, size, win_length):
+        self.size = size
+        self.win_length = win_length
+        self.stride = size + 1
+        self.bits = [0, 0, 0] # Indexed by mark code; bits[X] and bits[O] are used
+        self.filled = 0
+        self.winner = EMPTY
+        self.last_move = None # [row, col] of the latest mark
+
+    @property
+    def directions(self):
+        # Bit distance to the next cell along a row, a column and both diagonals.
+        return (1, self.stride, self.stride + 1, self.stride - 1)
+
+    @property
+    def cell_mask(self):
+        """Every bit that is a real cell, i.e. not a row's spare bit."""
+        row = (1 << self.size) - 1
+        mask = 0
+        for r in range(self.size):
+            mask |= row << (r * self.stride)
+        return mask
+
+    @classmethod
+    def from_wire(cls, rows, win_length, last_move=None):
+        """Rows do not say which mark came last, so `last_move` is passed along when it is known."""
+        board = cls(len(rows), win_length)
+        for r, row in enumerate(rows):
+            for c, cell in enumerate(row):
+                if cell in ("X", "O"):
+                    board.place(r * board.stride + c, CODES[cell])
+        board.last_move = list(last_move) if last_move else None
+        return board
+
+    def to_wire(self):
+        """Rows as strings, '.' for an empty cell: 15x15 is ~270 bytes instead of ~1.3 KB of nested lists."""
+        x, o = self.bits[X], self.bits[O]
+        rows = []
+        for r in range(self.size):
+            base = r * self.stride
+            rows.append("".join(
+                "X" if (x >> (base + c)) & 1 else "O" if (o >> (base + c)) & 1 else "."
+                for c in range(self.size)
+            ))
+        return rows
+
+    def copy(self):
+        board = GomokuBoard(self.size, self.win_length)
+        board.bits = list(self.bits)
+        board.filled = self.filled
+        board.winner = self.winner
+        board.last_move = self.last_move
+        return board
+
+    def index(self, row, col):
+        return row * self.stride + col
+
+    def is_empty(self, row, col):
+        return not ((self.bits[X] | self.bits[O]) >> (row * self.stride + col)) & 1
+
+    def get(self, row, col):
+        index = row * self.stride + col
+        for code in (X, O):
+            if (self.bits[code] >> index) & 1:
+                return SYMBOLS[code]
+        return None
+
+    def place(self, index, code):
+        """Marks an empty cell (bit index) and checks only the bitboard of the player who moved."""
+        self.bits[code] |= 1 << index
+        self.filled += 1
+        if not self.winner and self._has_line(self.bits[code]):
+            self.winner = code
+
+    def unplace(self, index, code):
+        self.bits[code] &= ~(1 << index)
+        self.filled -= 1
+        if self.winner == code and not self._has_line(self.bits[code]):
+            self.winner = EMPTY
+
+    def set(self, row, col, symbol):
+        self.place(row * self.stride + col, CODES[symbol])
+        self.last_move = [row, col]
+
+    def _has_line(self, bits):
+        # After k-1 shift-and steps, a bit survives only where k marks run in that direction.
+        for step in self.directions:
+            run = bits
+            for _ in range(self.win_length - 1):
+                run &= run >> step
+                if not run:
+                    break
+            if run:
+                return True
+        return False
+
+    def is_full(self):
+        return self.filled == self.size * self.size
+
+    @property
+    def ply(self):
+        return self.filled
+
+    def result(self):
+        if self.winner:
+            return SYMBOLS[self.winner]
+        return 'draw' if self.is_full() else None
+
+    def legal_moves(self):
+        if self.result():
+            return []
+        return [(r, c) for r in range(self.size) for c in range(self.size) if self.is_empty(r, c)]
@@ -0,0 +1,62 @@
+import os
+import secrets
+from collections import deque
+
+class RoomSessions:
+    """
+    Resumable player sessions for one room.
+    Issues an opaque token per seat and keeps a bounded ring buffer of the
+    room's recent encoded state events, so a resuming client can be sent only
+    the events it missed instead of triggering a full broadcast.
+    """
+    __slots__ = ("_symbols_by_token", "_events", "seq")
+
+    def __init__(self, history_size=None):
+        if history_size is None:
+            history_size = int(os.getenv('SESSION_REPLAY_BUFFER_SIZE', '32'))
+        self._symbols_by_token = {}
+        self._events = deque(maxlen=history_size) # (seq, encoded message)
+        self.seq = 0
+
+    def issue(self, player_symbol):
+        """Issues a new token for a seat, revoking any previous token for it."""
+        for token, symbol in list(self._symbols_by_token.items()):
+            if symbol == player_symbol:
+                del self._symbols_by_token[token]
+        token = secrets.token_urlsafe(16)
+        self._symbols_by_token[token] = player_symbol
+        return token
+
+    def symbol_for(self, token):
+        return self._symbols_by_token.get(token)
+
+    def is_claimed(self, player_symbol):
+        """True once a token has been issued for the seat; from then on only that session can take it."""
+        return player_symbol in self._symbols_by_token.values()
+
+    def next_seq(self):
+        self.seq += 1
+        return self.seq
+
+    def record(self, seq, message):
+        self._events.append((seq, message))
+
+    def replay_since(self, last_seq):
+        """
+        Returns the encoded events after `last_seq`, oldest first.
+        Returns None when the client is too far behind (or ahead) for the
+        buffer to cover the gap and it needs a fresh snapshot instead.
+        """
+        if last_seq == self.seq:
+            return []
+        if last_seq > self.seq or not self._events or self._events[0][0] > last_seq + 1:
+            return None
+        return [message for seq, message in self._events if seq > last_seq]
+
+    def to_snapshot(self):
+        # The replay buffer is not kept; resumes after a restore get a fresh snapshot.
+        return {"tokens": dict(self._symbols_by_token), "seq": self.seq}
+
+    def restore(self, snapshot):
+        self._symbols_by_token = dict(snapshot["tokens"])
+        self.seq = snapshot["seq"]
@@ -0,0 +1,43 @@
+"""
+Snapshot files for live rooms.
+A snapshot is the list of every room's to_snapshot() dict, written as
+zlib-compressed compact JSON. Writes go to a temporary file that is fsynced
+and renamed over the old one, so a crash mid-write never loses the previous
+snapshot.
+"""
+import json
+import logging
+import os
+import time
+import zlib
+
+SNAPSHOT_VERSION = 1
+
+def write_snapshot(path, room_snapshots):
+    """Atomically writes `room_snapshots` to `path`. Safe to run in a worker thread."""
+    payload = json.dumps(
+        {"version": SNAPSHOT_VERSION, "written_at": time.time(), "rooms": room_snapshots},
+        separators=(',', ':')
+    ).encode()
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(zlib.compress(payload))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    logging.info(f"Wrote snapshot of {len(room_snapshots)} rooms to {path} ({len(payload)} bytes uncompressed)")
+
+def read_snapshot(path):
+    """Returns the room snapshots stored at `path`, or an empty list if there are none."""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'rb') as f:
+            data = json.loads(zlib.decompress(f.read()))
+    except (OSError, zlib.error, ValueError) as e:
+        logging.error(f"Could not read snapshot {path}: {e}")
+        return []
+    if data.get("version") != SNAPSHOT_VERSION:
+        logging.warning(f"Ignoring snapshot {path} with unsupported version {data.get('version')}")
+        return []
+    return data["rooms"]
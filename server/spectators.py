@@ -0,0 +1,67 @@
+import asyncio
+import logging
+
+class SpectatorFanout:
+    """
+    Delivers a room's state to its spectators.
+    The room publishes each state already encoded, in O(1) and without awaiting
+    any spectator. Every spectator has a small sender task that always sends the
+    newest frame, so a slow watcher skips intermediate states instead of
+    holding up the room or the other watchers.
+    """
+    __slots__ = ("game_id", "_frame", "_version", "_changed", "_senders")
+
+    def __init__(self, game_id):
+        self.game_id = game_id
+        self._frame = None
+        self._version = 0
+        self._changed = None # Created when the first spectator starts waiting
+        self._senders = {} # ClientConnection -> sender task
+
+    def __len__(self):
+        return len(self._senders)
+
+    def __contains__(self, client_conn):
+        return client_conn in self._senders
+
+    @property
+    def has_frame(self):
+        return self._frame is not None
+
+    def add(self, client_conn):
+        if client_conn not in self._senders:
+            self._senders[client_conn] = asyncio.create_task(self._send_loop(client_conn))
+
+    def remove(self, client_conn):
+        task = self._senders.pop(client_conn, None)
+        if task and task is not asyncio.current_task():
+            task.cancel()
+
+    def publish(self, frame):
+        """Makes `frame` (an encoded message string) the latest state for all spectators."""
+        self._frame = frame
+        self._version += 1
+        # Swap the event rather than clearing it, so no waiter can miss a wake-up.
+        changed, self._changed = self._changed, None
+        if changed is not None:
+            changed.set()
+
+    def close(self):
+        for client_conn in list(self._senders):
+            self.remove(client_conn)
+
+    async def _send_loop(self, client_conn):
+        seen_version = 0
+        while True:
+            if seen_version == self._version:
+                if self._changed is None:
+                    self._changed = asyncio.Event()
+                await self._changed.wait()
+                continue
+            seen_version = self._version
+            try:
+                await client_conn.send_raw(self._frame)
+            except Exception:
+                logging.info(f"[Game {self.game_id}] Dropping spectator {client_conn.get_remote_address()}")
+                self.remove(client_conn)
+                return
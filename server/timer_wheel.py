@@ -0,0 +1,103 @@
+"""
+A shared hierarchical timer wheel.
+Grace periods, turn clocks and idle-connection checks all schedule onto one
+wheel driven by a single task, instead of each room or connection owning its
+own sleeping task or `wait_for` timer. Scheduling and cancelling are O(1);
+cancelled handles are simply skipped when their slot comes due.
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+
+class TimerHandle:
+    __slots__ = ("expires_tick", "callback", "args", "cancelled")
+
+    def __init__(self, expires_tick, callback, args):
+        self.expires_tick = expires_tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        self.args = () # Drop references so cancelled rooms/connections can be collected
+
+class TimerWheel:
+    """
+    `levels` wheels of `slots` buckets each. Level 0 buckets are one tick wide,
+    level 1 buckets are `slots` ticks wide, and so on; when a lower level wraps,
+    the next bucket of the level above is cascaded down.
+    """
+    def __init__(self, tick=0.1, slots=64, levels=4):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._spans = [slots ** level for level in range(levels)]
+        self._wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self._current_tick = 0
+        self._started_at = None
+        self._driver = None
+        self.pending = 0
+
+    def schedule(self, delay, callback, *args):
+        """Calls `callback(*args)` on the event loop after roughly `delay` seconds."""
+        if self._driver is None:
+            self._started_at = time.monotonic()
+            self._driver = asyncio.create_task(self._run())
+        ticks = max(1, math.ceil(delay / self.tick))
+        handle = TimerHandle(self._current_tick + ticks, callback, args)
+        self._place(handle)
+        self.pending += 1
+        return handle
+
+    def _place(self, handle):
+        remaining = handle.expires_tick - self._current_tick
+        for level in range(self.levels):
+            # Anything beyond the top level's range is parked there and re-placed on cascade.
+            if remaining < self._spans[level] * self.slots or level == self.levels - 1:
+                index = (handle.expires_tick // self._spans[level]) % self.slots
+                self._wheels[level][index].append(handle)
+                return
+
+    def _cascade(self, level):
+        index = (self._current_tick // self._spans[level]) % self.slots
+        bucket = self._wheels[level][index]
+        self._wheels[level][index] = []
+        for handle in bucket:
+            if handle.cancelled:
+                self.pending -= 1
+            else:
+                self._place(handle)
+
+    def _advance(self):
+        self._current_tick += 1
+        for level in range(self.levels - 1, 0, -1):
+            if self._current_tick % self._spans[level] == 0:
+                self._cascade(level)
+
+        index = self._current_tick % self.slots
+        bucket = self._wheels[0][index]
+        self._wheels[0][index] = []
+        for handle in bucket:
+            if handle.cancelled:
+                self.pending -= 1
+            elif handle.expires_tick > self._current_tick:
+                self._place(handle)
+            else:
+                self.pending -= 1
+                try:
+                    handle.callback(*handle.args)
+                except Exception as e:
+                    logging.error(f"Error in timer callback: {e}", exc_info=True)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            # Catch up on every tick that elapsed, so a slow loop iteration never drifts the clock.
+            target_tick = int((time.monotonic() - self._started_at) / self.tick)
+            while self._current_tick < target_tick:
+                self._advance()
+
+timer_wheel = TimerWheel(tick=float(os.getenv('TIMER_WHEEL_TICK_SECONDS', '0.1')))
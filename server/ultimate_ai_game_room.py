@@ -2,8 +2,6 @@ import asyncio
 import logging
 import time
 from typing import Dict, Optional
-from database import database
-from server.protocol import GameState, GameStateResponse, to_dict
 from server.ultimate_game_room import UltimateGame
 from server.ultimate_ai_logic import find_best_move
 
@@ -12,6 +10,10 @@ class UltimateAIGameRoom(UltimateGame):
     Represents an Ultimate Tic-Tac-Toe game against a computer opponent.
     Inherits from the base UltimateGame class but overrides move handling.
     """
+    snapshot_kind = "ultimate_ai"
+    lists_in_lobby = False # Single-player rooms are never joinable
+    __slots__ = ("executor",)
+
     def __init__(self, game_id, on_empty, executor):
         super().__init__(game_id, on_empty)
         self.executor = executor
@@ -19,23 +21,19 @@ class UltimateAIGameRoom(UltimateGame):
 
     async def add_client(self, client_conn, name):
         """Only allows one human player ('X') to join."""
-        if self.clients: # Game is already full with one player
+        if self.sessions.is_claimed("X"): # The one human seat is already taken
             return None
         
         player_symbol = "X"
-        client_conn.player_symbol = player_symbol
-        client_conn.player_name = name
-        client_conn.game_id = self.game_id
-        self.clients.add(client_conn)
-        
-        self.player_names[player_symbol] = name
+        self._seat(client_conn, player_symbol, name)
+        client_conn.session_token = self.sessions.issue(player_symbol)
         logging.info(f"[Ultimate AI Game {self.game_id}] Player {name} ({player_symbol}) joined.")
         return player_symbol
 
     async def start_game(self):
         """Starts the game by broadcasting the initial state and starting the timer."""
         logging.info(f"[Ultimate AI Game {self.game_id}] Starting game.")
-        self.current_turn_start_time = time.time()
+        self._start_turn_clock()
         await self.broadcast_state()
 
     async def handle_move(self, client_conn, move_data):
@@ -75,36 +73,19 @@ class UltimateAIGameRoom(UltimateGame):
 
     async def _process_human_move(self, move_data):
         """A simplified version of the parent's handle_move, just for applying the move."""
-        row, col = move_data['row'], move_data['col']
-        macro_row, macro_col = row // 3, col // 3
-        micro_row, micro_col = row % 3, col % 3
-        micro_board_index = macro_row * 3 + macro_col
-
-        # Basic validation
-        if self.active_micro_board_coords and (macro_row, macro_col) != tuple(self.active_micro_board_coords): return
-        if self.macro_board[macro_row][macro_col] is not None: return
-        if self.micro_boards[micro_board_index][micro_row][micro_col] is not None: return
-
-        # Apply move
-        self.micro_boards[micro_board_index][micro_row][micro_col] = self.current_player
-        
-        # Check for wins
-        micro_board_winner = self._check_board_win(self.micro_boards[micro_board_index])
-        if micro_board_winner:
-            self.macro_board[macro_row][macro_col] = micro_board_winner
-            macro_board_winner = self._check_board_win(self.macro_board)
-            if macro_board_winner:
-                if macro_board_winner != 'draw': self.winner = macro_board_winner
-                self.game_over = True
-                self._record_game_result()
-
-        # Determine the next active board for the AI
-        next_active_coords = [micro_row, micro_col]
-        if not self.game_over:
-            if self.macro_board[next_active_coords[0]][next_active_coords[1]] is not None:
-                self.active_micro_board_coords = None # Free move for AI
-            else:
-                self.active_micro_board_coords = next_active_coords
+        row, col = move_data.row, move_data.col
+        if not self.board.is_legal(row, col): return
+
+        # Apply the move; the rules engine also picks the next active board for the AI
+        result = self.board.play(row, col, self.current_player)
+        self._journal_move(row, col, self.current_player)
+        self._apply_result(result)
+
+    def _apply_result(self, result):
+        if result:
+            if result != 'draw': self.winner = result
+            self.game_over = True
+            self._record_game_result()
 
     async def _make_ai_move(self):
         """Calculates and performs the AI's move for the ultimate game."""
@@ -118,9 +99,9 @@ class UltimateAIGameRoom(UltimateGame):
 
         # Prepare the state for the AI function
         current_state = {
-            "micro_boards": [row[:] for row in self.micro_boards],
-            "macro_board": [row[:] for row in self.macro_board],
-            "active_micro_board_coords": self.active_micro_board_coords
+            "micro_boards": self.board.micro_wire(),
+            "macro_board": self.board.macro.to_wire(),
+            "active_micro_board_coords": self.board.active
         }
 
         loop = asyncio.get_running_loop()
@@ -148,32 +129,14 @@ class UltimateAIGameRoom(UltimateGame):
         logging.info(f"[Ultimate AI Game {self.game_id}] AI chose move: ({row}, {col}) after {ai_thinking_time:.2f}s")
 
         # Apply the AI's move
-        macro_row, macro_col = row // 3, col // 3
-        micro_row, micro_col = row % 3, col % 3
-        micro_board_index = macro_row * 3 + macro_col
-        self.micro_boards[micro_board_index][micro_row][micro_col] = 'O'
-
-        # Check for wins
-        micro_board_winner = self._check_board_win(self.micro_boards[micro_board_index])
-        if micro_board_winner:
-            self.macro_board[macro_row][macro_col] = micro_board_winner
-            macro_board_winner = self._check_board_win(self.macro_board)
-            if macro_board_winner:
-                if macro_board_winner != 'draw': self.winner = macro_board_winner
-                self.game_over = True
-                self._record_game_result()
-
-        # Determine next active board
-        next_active_coords = [micro_row, micro_col]
-        if self.macro_board[next_active_coords[0]][next_active_coords[1]] is not None:
-            self.active_micro_board_coords = None
-        else:
-            self.active_micro_board_coords = next_active_coords
+        result = self.board.play(row, col, 'O')
+        self._journal_move(row, col, 'O')
+        self._apply_result(result)
 
         # Switch back to the human's turn and reset the timer
         if not self.game_over:
             self.current_player = "X"
-            self.current_turn_start_time = time.time()
+            self._start_turn_clock()
 
         await self.broadcast_state()
 
@@ -181,5 +144,17 @@ class UltimateAIGameRoom(UltimateGame):
         """Resets the game to its initial state."""
         await super().restart_game()
         self.player_names = {"X": list(self.clients)[0].player_name if self.clients else None, "O": "Computer"}
-        self.current_turn_start_time = time.time()
+        self._start_turn_clock()
         await self.broadcast_state()
+
+    @classmethod
+    async def from_snapshot(cls, snapshot, on_empty, **room_kwargs):
+        """Restores the room; if the AI was mid-move when the snapshot was taken, it moves again."""
+        game = await super().from_snapshot(snapshot, on_empty, **room_kwargs)
+        if not game.game_over and game.current_player == "O":
+            # The AI's clock is charged by _make_ai_move itself, not by the turn clock.
+            if game.turn_clock_timer:
+                game.turn_clock_timer.cancel()
+                game.turn_clock_timer = None
+            game.actor.submit(game._make_ai_move)
+        return game
@@ -0,0 +1,51 @@
+import asyncio
+import logging
+import os
+
+# Each worker also listens on 127.0.0.1:(WORKER_RELAY_PORT_BASE + worker_id) for hand-offs.
+WORKER_RELAY_PORT_BASE = int(os.getenv('WORKER_RELAY_PORT_BASE', '7000'))
+RELAY_HOST = '127.0.0.1'
+
+def relay_port(worker_id):
+    return WORKER_RELAY_PORT_BASE + worker_id
+
+class WorkerRelay:
+    """
+    Forwards a client connection that landed on the wrong worker to the worker
+    that owns its game. The owner sees an ordinary newline-delimited TCP client,
+    so TCP and WebSocket clients are relayed the same way.
+    """
+    def __init__(self, client_conn, owner_worker_id, reader, writer):
+        self.client_conn = client_conn
+        self.owner_worker_id = owner_worker_id
+        self._reader = reader
+        self._writer = writer
+        self._pump = asyncio.create_task(self._relay_to_client())
+
+    @classmethod
+    async def open(cls, client_conn, owner_worker_id):
+        reader, writer = await asyncio.open_connection(RELAY_HOST, relay_port(owner_worker_id))
+        logging.info(f"Relaying {client_conn.get_remote_address()} to worker {owner_worker_id}")
+        return cls(client_conn, owner_worker_id, reader, writer)
+
+    async def forward(self, message_str):
+        """Sends a raw client message to the owning worker."""
+        self._writer.write((message_str + '\n').encode())
+        await self._writer.drain()
+
+    async def _relay_to_client(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                await self.client_conn.send_raw(line.decode().strip())
+        except Exception as e:
+            logging.info(f"Relay to worker {self.owner_worker_id} ended: {e}")
+        # The owner went away; close the client so it reconnects and gets routed afresh.
+        await self.client_conn.close()
+
+    def close(self):
+        self._pump.cancel()
+        if not self._writer.is_closing():
+            self._writer.close()
@@ -0,0 +1,42 @@
+import os
+import sys
+import pytest
+
+# Add the project root to the Python path to allow for absolute imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from database import database
+
+@pytest.fixture
+def fresh_database(tmp_path, monkeypatch):
+    """Points the database module at an empty database file for one test."""
+    database.close_connections()
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "game_results.db"))
+    database.initialize_database()
+    yield database
+    database.close_connections()
+
+class FakeConnection:
+    """Records what a room sends instead of writing to a socket."""
+    def __init__(self, name):
+        self.name = name
+        self.game_id = None
+        self.player_symbol = None
+        self.player_name = None
+        self.is_spectator = False
+        self.session_token = None
+        self.sent = []
+
+    async def send_raw(self, message):
+        self.sent.append(message)
+
+    async def send(self, response_data):
+        self.sent.append(response_data)
+
+    def get_remote_address(self):
+        return self.name
+
+@pytest.fixture
+def make_connection():
+    return FakeConnection
@@ -0,0 +1,39 @@
+import pytest
+from api.response_cache import ResponseCache
+
+def test_entries_are_rebuilt_only_when_the_version_changes():
+    cache, builds = ResponseCache(), []
+    def build():
+        builds.append(1)
+        return {"rows": len(builds)}
+    first = cache.get("key", 1, build)
+    assert cache.get("key", 1, build) is first
+    rebuilt = cache.get("key", 2, build)
+    assert len(builds) == 2 and rebuilt.body == b'{"rows":2}' and rebuilt.etag != first.etag
+
+@pytest.fixture
+def client(fresh_database):
+    pytest.importorskip("flask")
+    pytest.importorskip("flask_cors")
+    from api import api_server
+    api_server.response_cache.clear()
+    return api_server.app.test_client()
+
+def test_leaderboard_is_served_with_an_etag_and_revalidated(client, fresh_database):
+    fresh_database.record_game_result("ann", "bob", "win")
+    first = client.get("/leaderboard?game_mode=standard")
+    assert first.status_code == 200 and first.headers["ETag"]
+    assert first.get_json()[0]["name"] == "ann"
+
+    again = client.get("/leaderboard?game_mode=standard", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304 and again.data == b""
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+def test_a_new_result_replaces_the_cached_body(client, fresh_database):
+    fresh_database.record_game_result("ann", "bob", "win")
+    first = client.get("/leaderboard?game_mode=standard")
+    for _ in range(2):
+        fresh_database.record_game_result("bob", "ann", "win")
+    fresh = client.get("/leaderboard?game_mode=standard", headers={"If-None-Match": first.headers["ETag"]})
+    assert fresh.status_code == 200 and fresh.headers["ETag"] != first.headers["ETag"]
+    assert fresh.get_json()[0]["name"] == "bob"
@@ -0,0 +1,31 @@
+import pytest
+from server.game_ids import GameIdAllocator, normalize
+
+def test_ids_are_unique_within_a_worker_and_skip_live_rooms():
+    allocator = GameIdAllocator(length=2) # 1024 IDs
+    live = {allocator.allocate(set()) for _ in range(1000)}
+    assert len(live) == 1000
+    rest = {allocator.allocate(live) for _ in range(24)}
+    assert len(rest) == 24 and not rest & live
+    with pytest.raises(RuntimeError):
+        allocator.allocate(live | rest)
+
+def test_nodes_and_workers_get_disjoint_routable_ids():
+    allocators = [GameIdAllocator(worker, 2, length=3, node_index=node, num_nodes=3) for node in range(3) for worker in range(2)]
+    issued = [{allocator.allocate(set()) for _ in range(500)} for allocator in allocators]
+    assert len(set().union(*issued)) == 500 * len(allocators)
+    # A node routes its own IDs to the owning worker and leaves other nodes' IDs to the bus.
+    node_one_worker = allocators[2]
+    assert [node_one_worker.owner_of(next(iter(ids))) for ids in issued] == [None, None, 0, 1, None, None]
+
+def test_bad_node_layouts_are_rejected():
+    with pytest.raises(ValueError):
+        GameIdAllocator(node_index=2, num_nodes=2)
+    with pytest.raises(ValueError):
+        GameIdAllocator(0, 33, length=1)
+
+def test_owner_of_rejects_malformed_ids():
+    allocator = GameIdAllocator(length=4)
+    assert allocator.owner_of("ABC") is None
+    assert allocator.owner_of("AB!C") is None
+    assert normalize("ab1o") == "AB10"
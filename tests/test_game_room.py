@@ -0,0 +1,77 @@
+import asyncio
+import json
+from server.game_room import Game
+from server.protocol import parse_client_message
+
+def move(row, col):
+    return parse_client_message(json.dumps({"type": "move", "row": row, "col": col}))
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def new_game(game_id="AB12"):
+    return Game(game_id, on_empty=lambda game_id: None)
+
+def test_first_two_players_take_x_then_o_and_a_third_is_rejected(make_connection):
+    async def scenario():
+        game = new_game()
+        symbols = [await game.add_client(make_connection(name), name) for name in ("a", "b", "c")]
+        game.close()
+        return symbols
+    assert run(scenario()) == ["X", "O", None]
+
+def test_moves_alternate_and_three_in_a_row_wins(make_connection, fresh_database):
+    async def scenario():
+        game = new_game()
+        x, o = make_connection("x"), make_connection("o")
+        await game.add_client(x, "x")
+        await game.add_client(o, "o")
+        await game.handle_move(o, move(0, 0)) # Not O's turn: ignored
+        assert game.board.is_empty(0, 0)
+        for player, cell in ((x, (0, 0)), (o, (1, 0)), (x, (0, 1)), (o, (1, 1)), (x, (0, 2))):
+            await game.handle_move(player, move(*cell))
+        game.close()
+        return game
+    game = run(scenario())
+    assert game.game_over and game.winner == "X"
+
+def test_a_watching_player_gives_up_the_seat_and_cannot_move(make_connection):
+    async def scenario():
+        game = new_game()
+        x, o = make_connection("x"), make_connection("o")
+        await game.add_client(x, "x")
+        await game.add_client(o, "o")
+        await game.add_spectator(x)
+        assert x.player_symbol is None and x not in game.clients
+        await game.handle_move(x, move(0, 0))
+        assert game.board.is_empty(0, 0)
+        game.close()
+    run(scenario())
+
+def test_a_spectator_who_joins_is_a_player(make_connection):
+    async def scenario():
+        game = new_game()
+        host, watcher = make_connection("host"), make_connection("watcher")
+        await game.add_client(host, "host")
+        await game.add_spectator(watcher)
+        assert await game.add_client(watcher, "watcher") == "O"
+        assert not watcher.is_spectator and watcher not in game.spectators
+        # With both players gone, the room starts its grace period.
+        await game.remove_client(host)
+        await game.remove_client(watcher)
+        assert game.is_in_grace_period
+        game.close()
+    run(scenario())
+
+def test_a_player_who_moved_to_another_room_is_removed_by_identity(make_connection):
+    async def scenario():
+        first, second = new_game("AB12"), new_game("AB13")
+        conn = make_connection("mover")
+        await first.add_client(conn, "mover") # X here
+        await second.add_client(make_connection("host"), "host")
+        await second.add_client(conn, "mover") # O there
+        await first.remove_client(conn)
+        assert first.connections_by_symbol == {} and conn.player_symbol == "O"
+        first.close()
+        second.close()
+    run(scenario())
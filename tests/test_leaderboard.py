@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+def record(database, results):
+    start = datetime(2026, 1, 1)
+    database.record_game_results([
+        (winner, loser, outcome, game_mode, (start + timedelta(hours=i)).isoformat())
+        for i, (winner, loser, outcome, game_mode) in enumerate(results)
+    ])
+
+def test_all_modes_leaderboard_sums_every_mode_and_pages(fresh_database):
+    record(fresh_database, [
+        ("ann", "bob", "win", "standard"),
+        ("ann", "cid", "win", "ultimate"),
+        ("bob", "cid", "win", "gomoku"),
+        ("cid", "ann", "draw", "standard"),
+        ("bob", "bob", "draw", "ultimate"), # Counted once
+    ])
+    board = fresh_database.get_leaderboard(2)
+    assert [(e["name"], e["wins"], e["losses"], e["draws"]) for e in board] == [("ann", 2, 0, 1), ("bob", 1, 1, 1)]
+    rest = fresh_database.get_leaderboard(2, after=fresh_database.encode_leaderboard_cursor(board[-1]))
+    assert [(e["rank"], e["name"], e["losses"]) for e in rest] == [(3, "cid", 2)]
+    assert fresh_database.get_leaderboard(10, "standard")[0]["wins"] == 1
+    assert fresh_database.check_player_stats() == []
+
+def test_a_stale_all_modes_total_is_reported_and_repaired(fresh_database):
+    record(fresh_database, [("ann", "bob", "win", "standard"), ("bob", "ann", "win", "gomoku")])
+    with fresh_database.connection() as conn, conn:
+        conn.execute("UPDATE player_totals SET wins = 5 WHERE name = 'ann'")
+    assert fresh_database.check_player_stats() == [("ann", None)]
+    fresh_database.backfill_player_stats()
+    assert fresh_database.check_player_stats() == []
+    assert fresh_database.get_leaderboard(1)[0]["wins"] == 1
@@ -0,0 +1,81 @@
+import asyncio
+import json
+from server.game_room import Game
+from server.ai_game_room import AIGameRoom
+from server.lobby import lobby
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def listed_ids():
+    return [entry["game_id"] for entry in lobby.page("standard", limit=100)]
+
+def test_a_room_is_listed_only_while_its_host_waits_for_an_opponent(make_connection):
+    async def scenario():
+        game = Game("LB01", on_empty=lambda game_id: None)
+        assert "LB01" not in listed_ids() # Nobody seated yet
+
+        host = make_connection("host")
+        await game.add_client(host, "host")
+        assert lobby.page("standard", limit=100)[-1] == {"game_id": "LB01", "game_mode": "standard", "host": "host"}
+
+        await game.add_client(make_connection("guest"), "guest")
+        assert "LB01" not in listed_ids()
+        game.close()
+    run(scenario())
+
+def test_a_seat_left_mid_game_is_not_relisted_or_given_away(make_connection):
+    async def scenario():
+        game = Game("LB02", on_empty=lambda game_id: None)
+        host, guest = make_connection("host"), make_connection("guest")
+        await game.add_client(host, "host")
+        await game.add_client(guest, "guest")
+        await game.remove_client(guest)
+        assert "LB02" not in listed_ids()
+
+        stranger = make_connection("stranger")
+        assert await game.add_client(stranger, "stranger") is None
+        assert game.connections_by_symbol["X"] is host
+
+        # Only the player who left can take the seat back.
+        assert await game.resume_client(make_connection("guest again"), guest.session_token, 0) == []
+        assert "LB02" not in listed_ids()
+        game.close()
+    run(scenario())
+
+def test_a_room_leaves_the_lobby_when_its_host_leaves_or_the_game_ends(make_connection):
+    async def scenario():
+        left = Game("LB03", on_empty=lambda game_id: None)
+        host = make_connection("host")
+        await left.add_client(host, "host")
+        await left.remove_client(host)
+        assert left.is_in_grace_period and "LB03" not in listed_ids()
+        left.close()
+
+        closed = Game("LB04", on_empty=lambda game_id: None)
+        await closed.add_client(make_connection("host"), "host")
+        assert "LB04" in listed_ids()
+        closed.close()
+        assert "LB04" not in listed_ids()
+    run(scenario())
+
+def test_single_player_rooms_are_never_listed(make_connection):
+    async def scenario():
+        game = AIGameRoom("LB05", on_empty=lambda game_id: None, executor=None)
+        await game.add_client(make_connection("player"), "player")
+        assert "LB05" not in listed_ids()
+        game.close()
+    run(scenario())
+
+def test_subscribers_are_told_about_adds_and_removes(make_connection):
+    async def scenario():
+        watcher = make_connection("watcher")
+        lobby.subscribe(watcher, "standard")
+        game = Game("LB06", on_empty=lambda game_id: None)
+        await game.add_client(make_connection("host"), "host")
+        await game.add_client(make_connection("guest"), "guest")
+        await asyncio.sleep(0) # Notifications are sent from their own tasks
+        lobby.unsubscribe(watcher)
+        game.close()
+        return [(update["op"], update["game"]["game_id"]) for update in map(json.loads, watcher.sent)]
+    assert run(scenario()) == [("add", "LB06"), ("remove", "LB06")]
@@ -0,0 +1,53 @@
+import asyncio
+import json
+import pytest
+from server import move_journal
+from server.game_room import Game
+from server.protocol import parse_client_message
+
+def move(row, col):
+    return parse_client_message(json.dumps({"type": "move", "row": row, "col": col}))
+
+@pytest.fixture
+def journal_dir(tmp_path):
+    directory = str(tmp_path / "journal")
+    move_journal.configure(directory)
+    yield directory
+    move_journal.close()
+
+def play_room(make_connection, *games):
+    """Plays each game's cells in one room "AB12", restarting the room between games."""
+    async def scenario():
+        game = Game("AB12", on_empty=lambda game_id: None)
+        x, o = make_connection("x"), make_connection("o")
+        await game.add_client(x, "x")
+        await game.add_client(o, "o")
+        for number, cells in enumerate(games):
+            if number:
+                await game.restart_game()
+            for i, cell in enumerate(cells):
+                await game.handle_move((x, o)[i % 2], move(*cell))
+        game.close()
+    asyncio.run(scenario())
+
+def test_replay_returns_only_the_latest_game_under_a_reused_id(make_connection, journal_dir, fresh_database):
+    # Two rooms that drew the same ID, e.g. before and after a server restart.
+    play_room(make_connection, ((0, 0), (1, 0), (0, 1), (1, 1), (0, 2)))
+    play_room(make_connection, ((2, 2), (1, 1)))
+    move_journal.close()
+
+    started = move_journal.games("AB12", journal_dir)
+    assert len(started) == 2
+    latest = list(move_journal.replay("AB12", directory=journal_dir))
+    assert [(r.kind, r.ply, r.row, r.col) for r in latest] == [
+        (move_journal.START, 0, 0, 0), (move_journal.MOVE, 1, 2, 2), (move_journal.MOVE, 2, 1, 1),
+    ]
+    first = list(move_journal.replay("AB12", started[0][1], journal_dir))
+    assert [r.kind for r in first] == [move_journal.START] + [move_journal.MOVE] * 5 + [move_journal.RESULT]
+    assert first[-1].mark == "X"
+
+def test_a_restart_begins_a_new_game_in_the_journal(make_connection, journal_dir, fresh_database):
+    play_room(make_connection, ((0, 0), (1, 1)), ((2, 2),))
+    move_journal.close()
+    assert len(move_journal.games("AB12", journal_dir)) == 2
+    assert [(r.ply, r.row, r.col) for r in move_journal.replay("AB12", directory=journal_dir) if r.kind == move_journal.MOVE] == [(1, 2, 2)]
@@ -0,0 +1,50 @@
+import json
+import pytest
+from server.protocol import MessageType, ProtocolError, parse_client_message, MAX_BOARD_SIZE
+
+def parse(**fields):
+    return parse_client_message(json.dumps(fields))
+
+def test_create_game_defaults():
+    message = parse(type="create_game")
+    assert message.type == MessageType.CREATE_GAME
+    assert message.game_mode == "standard"
+    assert message.name == "Anonymous"
+
+def test_gomoku_board_options_are_bounded():
+    message = parse(type="create_game", game_mode="gomoku", board_size=9, win_length=4)
+    assert (message.board_size, message.win_length) == (9, 4)
+    with pytest.raises(ProtocolError):
+        parse(type="create_game", game_mode="gomoku", board_size=MAX_BOARD_SIZE + 1)
+    with pytest.raises(ProtocolError):
+        parse(type="create_game", game_mode="gomoku", board_size=9, win_length=10)
+
+def test_game_ids_are_normalized():
+    message = parse(type="join_game", game_id="ab1o")
+    assert message.game_id == "AB10"
+
+@pytest.mark.parametrize("raw", [
+    "not json",
+    "[1, 2]",
+    json.dumps({"type": "launch_missiles"}),
+    json.dumps({"type": "create_game", "game_mode": "chess"}),
+    json.dumps({"type": "create_game", "name": ""}),
+    json.dumps({"type": "create_game", "name": "x" * 65}),
+    json.dumps({"type": "join_game"}),
+    json.dumps({"type": "join_game", "game_id": "AB-1"}),
+    json.dumps({"type": "move", "row": 0}),
+    json.dumps({"type": "move", "row": True, "col": 0}),
+    json.dumps({"type": "move", "row": -1, "col": 0}),
+    json.dumps({"type": "move", "row": 0, "col": MAX_BOARD_SIZE}),
+    json.dumps({"type": "resume", "game_id": "AB10"}),
+    json.dumps({"type": "reconnect", "game_id": "AB10", "player_symbol": "X"}),
+    json.dumps({"type": "resume", "game_id": "AB10", "session_token": "t", "last_seq": -1}),
+    json.dumps({"type": "list_games", "limit": 0}),
+])
+def test_malformed_messages_are_rejected(raw):
+    with pytest.raises(ProtocolError):
+        parse_client_message(raw)
+
+def test_move_coordinates():
+    message = parse(type="move", row=2, col=1)
+    assert (message.row, message.col) == (2, 1)
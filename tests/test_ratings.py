@@ -0,0 +1,56 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from database import ratings
+
+def test_equal_players_split_the_k_factor():
+    winner, loser = ratings.rate_game((1500, 0), (1500, 0))
+    assert winner == pytest.approx(1520) and loser == pytest.approx(1480)
+    assert ratings.rate_game((1500, 0), (1500, 0), draw=True) == (1500, 1500)
+
+def test_an_upset_moves_ratings_more_than_an_expected_win():
+    favourite_wins = ratings.rate_game((1700, 50), (1500, 50))
+    underdog_wins = ratings.rate_game((1500, 50), (1700, 50))
+    assert favourite_wins[0] - 1700 < underdog_wins[0] - 1500
+    # Both established, so the points only change hands.
+    assert sum(underdog_wins) == pytest.approx(3200)
+
+def test_provisional_players_move_twice_as_fast():
+    winner, loser = ratings.rate_game((1500, ratings.PROVISIONAL_GAMES - 1), (1500, ratings.PROVISIONAL_GAMES))
+    assert winner - 1500 == pytest.approx(ratings.K_PROVISIONAL / 2)
+    assert 1500 - loser == pytest.approx(ratings.K_ESTABLISHED / 2)
+
+def test_a_draw_pulls_ratings_together():
+    higher, lower = ratings.rate_game((1600, 50), (1400, 50), draw=True)
+    assert higher < 1600 and lower > 1400
+
+def random_results(count, seed=7):
+    rng = random.Random(seed)
+    players = [f"player{i}" for i in range(6)]
+    results, started = [], datetime(2026, 3, 1)
+    for i in range(count):
+        winner, loser = rng.sample(players, 2)
+        outcome = rng.choice(("win", "win", "draw"))
+        game_mode = rng.choice(("standard", "ultimate"))
+        results.append((winner, loser, outcome, game_mode, (started + timedelta(hours=7 * i)).isoformat()))
+    return results
+
+def all_ratings(db):
+    with db.connection() as conn:
+        return conn.execute("SELECT name, game_mode, rating, games FROM player_ratings ORDER BY name, game_mode").fetchall()
+
+def test_rebuilding_gives_exactly_the_incremental_ratings(fresh_database):
+    results = random_results(200) # Recorded in time order, as the server does
+    for start in range(0, len(results), 25):
+        fresh_database.record_game_results(results[start:start + 25])
+    incremental = all_ratings(fresh_database)
+    assert len(incremental) == 12
+
+    fresh_database.rebuild_ratings()
+    assert all_ratings(fresh_database) == incremental
+
+def test_unknown_players_start_at_the_initial_rating(fresh_database):
+    assert fresh_database.get_player_rating("nobody", "standard") == ratings.INITIAL_RATING
+    fresh_database.record_game_results([("a", "b", "win", "standard", "2026-03-01T10:00:00")])
+    assert fresh_database.get_player_rating("a", "standard") > ratings.INITIAL_RATING
+    assert fresh_database.get_player_rating("a", "ultimate") == ratings.INITIAL_RATING
@@ -0,0 +1,39 @@
+import logging
+from server import result_writer
+from server.result_writer import ResultWriter
+
+def falling_behind_warnings(caplog):
+    return [r for r in caplog.records if r.levelno == logging.WARNING and "falling behind" in r.message]
+
+def test_the_backlog_warning_fires_once_per_crossing(monkeypatch, caplog):
+    monkeypatch.setattr(result_writer, "QUEUE_DEPTH_WARN", 10)
+    writer = ResultWriter() # Not started, so results stay queued
+    with caplog.at_level(logging.INFO):
+        for _ in range(35):
+            writer.record("a", "b", "win")
+        assert len(falling_behind_warnings(caplog)) == 1
+
+        # Draining to just under the threshold is not enough to re-arm it...
+        for _ in range(29):
+            writer._queue.get_nowait()
+        writer._check_caught_up()
+        writer.record("a", "b", "win")
+        assert writer.queue_depth == 7 and writer._behind
+
+        # ...but falling to half of it is, and the next crossing warns again.
+        for _ in range(2):
+            writer._queue.get_nowait()
+        writer._check_caught_up()
+        assert not writer._behind
+        for _ in range(5):
+            writer.record("a", "b", "win")
+        assert len(falling_behind_warnings(caplog)) == 2
+
+def test_an_empty_queue_never_warns(monkeypatch, caplog):
+    monkeypatch.setattr(result_writer, "QUEUE_DEPTH_WARN", 10)
+    writer = ResultWriter()
+    with caplog.at_level(logging.WARNING):
+        writer.record("a", "b", "win")
+        writer._queue.get_nowait()
+        writer._check_caught_up()
+    assert falling_behind_warnings(caplog) == []
@@ -0,0 +1,68 @@
+import io
+import gzip
+import pytest
+from database import results_io
+
+RESULTS = [
+    ("alice", "bob", "win", "standard", "2026-01-05T10:00:00"),
+    ("carol", "alice", "draw", "ultimate", "2026-01-05T11:30:00.250000"),
+    ("bob", None, "win", "gomoku", "2026-01-06T09:15:00"), # A game against nobody keeps its empty seat
+    ("dave, jr.", 'eve "the" great', "win", "standard", "2026-01-07T00:00:00"), # Needs CSV quoting
+]
+
+def exported(db):
+    return list(db.iter_game_results())
+
+def games(db):
+    # Everything but the id, which the importing database assigns.
+    return [row[1:] for row in exported(db)]
+
+def encoded_text(rows, fmt, compress=False):
+    blocks = results_io.encode(rows, fmt)
+    data = b"".join(results_io.gzip_blocks(blocks) if compress else blocks)
+    if compress:
+        data = gzip.decompress(data)
+    return io.StringIO(data.decode(), newline="")
+
+def switch_database(db, monkeypatch, path):
+    db.close_connections()
+    monkeypatch.setattr(db, "DB_FILE", str(path))
+    db.initialize_database()
+
+@pytest.mark.parametrize("fmt", results_io.FORMATS)
+@pytest.mark.parametrize("compress", [False, True])
+def test_export_then_import_reproduces_every_game(fresh_database, monkeypatch, tmp_path, fmt, compress):
+    fresh_database.record_game_results(RESULTS)
+    text = encoded_text(exported(fresh_database), fmt, compress)
+
+    switch_database(fresh_database, monkeypatch, tmp_path / "copy.db")
+    assert fresh_database.import_game_results(results_io.decode(text, fmt), batch_rows=3) == (4, 0)
+    assert games(fresh_database) == RESULTS
+    assert fresh_database.check_player_stats() == []
+
+def test_reimporting_skips_games_already_recorded(fresh_database):
+    fresh_database.record_game_results(RESULTS)
+    rows = exported(fresh_database)
+    assert fresh_database.import_game_results(results_io.decode(encoded_text(rows, "ndjson"), "ndjson")) == (0, 4)
+    assert len(exported(fresh_database)) == 4
+
+def test_source_ids_never_hide_a_different_game(fresh_database, monkeypatch, tmp_path):
+    fresh_database.record_game_results(RESULTS[:2])
+    text = encoded_text(exported(fresh_database), "csv")
+
+    # The target already uses ids 1 and 2 for other games.
+    switch_database(fresh_database, monkeypatch, tmp_path / "busy.db")
+    fresh_database.record_game_results(RESULTS[2:])
+    assert fresh_database.import_game_results(results_io.decode(text, "csv")) == (2, 0)
+    assert games(fresh_database) == RESULTS # Oldest first
+
+def test_malformed_rows_are_rejected(fresh_database):
+    text = io.StringIO('{"winner_name": "a", "loser_name": "b", "outcome": "forfeit", "timestamp": "2026-01-01T00:00:00"}\n')
+    with pytest.raises(ValueError, match="unknown outcome"):
+        fresh_database.import_game_results(results_io.decode(text, "ndjson"))
+    with pytest.raises(ValueError, match="not valid JSON"):
+        list(results_io.decode(io.StringIO("{nope\n"), "ndjson"))
+
+def test_format_is_guessed_from_the_file_name():
+    assert results_io.format_for("results.csv.gz") == "csv"
+    assert results_io.format_for("results.ndjson") == "ndjson"
@@ -0,0 +1,72 @@
+import gzip
+import json
+import sqlite3
+from datetime import date, datetime, timedelta
+import pytest
+from database import retention
+
+SUMMARY_QUERIES = {
+    "player_stats": "SELECT name, game_mode, wins, losses, draws, last_game FROM player_stats ORDER BY name, game_mode",
+    "daily_game_counts": "SELECT day, game_mode, games FROM daily_game_counts ORDER BY day, game_mode",
+    "player_ratings": "SELECT name, game_mode, rating, games FROM player_ratings ORDER BY name, game_mode",
+}
+
+@pytest.fixture(autouse=True)
+def no_pauses(monkeypatch):
+    monkeypatch.setattr(retention, "RETENTION_PAUSE_SECONDS", 0)
+    monkeypatch.setattr(retention, "RETENTION_DELETE_BATCH_ROWS", 7)
+
+def record_history(db):
+    """Games every 13 hours from January to mid-April 2026, between four players."""
+    players = ["ann", "ben", "cat", "dan"]
+    started, results = datetime(2026, 1, 1), []
+    for i in range(200):
+        outcome = "draw" if i % 5 == 0 else "win"
+        game_mode = "ultimate" if i % 3 == 0 else "standard"
+        timestamp = (started + timedelta(hours=13 * i)).isoformat()
+        results.append((players[i % 4], players[(i + 1 + i // 4 % 3) % 4], outcome, game_mode, timestamp))
+    db.record_game_results(results)
+
+def summaries(db):
+    with db.connection() as conn:
+        return {table: conn.execute(query).fetchall() for table, query in SUMMARY_QUERIES.items()}
+
+def test_archiving_keeps_every_rollup_consistent(fresh_database, tmp_path):
+    record_history(fresh_database)
+    before = summaries(fresh_database)
+    archive_dir = tmp_path / "archive"
+
+    # A 60-day horizon from 15 April reaches into February, so only January is archived.
+    moved = retention.run_retention(60, str(archive_dir), today=date(2026, 4, 15))
+    assert moved == 58
+    assert fresh_database.get_archivable_months("2026-02-01") == []
+    archived = [json.loads(line) for path in archive_dir.iterdir() for line in gzip.open(path, "rt")]
+    assert len(archived) == moved and all(row["timestamp"].startswith("2026-01") for row in archived)
+
+    # The live summaries are untouched, and rebuilding them from what is left plus the baselines agrees.
+    assert summaries(fresh_database) == before
+    assert fresh_database.check_player_stats() == []
+    fresh_database.backfill_player_stats()
+    fresh_database.backfill_daily_game_counts()
+    fresh_database.rebuild_ratings()
+    assert summaries(fresh_database) == before
+
+    # Nothing is left to archive on a second run.
+    assert retention.run_retention(60, str(archive_dir), today=date(2026, 4, 15)) == 0
+
+def test_an_older_database_is_not_vacuumed_unless_asked(fresh_database, monkeypatch, tmp_path):
+    path = tmp_path / "old.db"
+    with sqlite3.connect(path) as conn: # A file created without auto_vacuum
+        conn.execute("CREATE TABLE legacy (x)")
+    conn.close()
+    fresh_database.close_connections()
+    monkeypatch.setattr(fresh_database, "DB_FILE", str(path))
+    fresh_database.initialize_database()
+    record_history(fresh_database)
+
+    assert retention.run_retention(60, str(tmp_path / "archive"), today=date(2026, 4, 15)) == 58
+    assert not fresh_database.uses_incremental_vacuum()
+
+    assert fresh_database.enable_incremental_vacuum()
+    assert fresh_database.uses_incremental_vacuum()
+    assert not fresh_database.enable_incremental_vacuum()
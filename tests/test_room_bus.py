@@ -0,0 +1,88 @@
+import asyncio
+import os
+import pytest
+from server import room_bus
+from server.room_bus import InMemoryRoomBus, LocalSocketBusHub, LocalSocketRoomBus
+
+def run(coroutine):
+    # Every case is bounded, so a publish that hangs fails the test instead of the run.
+    return asyncio.run(asyncio.wait_for(coroutine, 5))
+
+def collector():
+    received = []
+    async def callback(data):
+        received.append(data)
+    return received, callback
+
+def test_in_memory_bus_routes_by_topic_and_counts_receivers():
+    async def scenario():
+        bus = InMemoryRoomBus()
+        first, first_callback = collector()
+        second, second_callback = collector()
+        await bus.subscribe("room.A", first_callback)
+        await bus.subscribe("room.A", second_callback)
+        await bus.subscribe("room.B", second_callback)
+        assert await bus.publish("room.A", {"n": 1}) == 2
+        assert await bus.publish("room.C", {"n": 2}) == 0
+        await bus.unsubscribe("room.A", first_callback)
+        assert await bus.publish("room.A", {"n": 3}) == 1
+        return first, second
+    first, second = run(scenario())
+    assert first == [{"n": 1}]
+    assert second == [{"n": 1}, {"n": 3}]
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "bus.sock")
+
+def test_socket_bus_delivers_between_nodes_and_acks_the_count(socket_path):
+    async def scenario():
+        hub_task = asyncio.create_task(LocalSocketBusHub(socket_path).serve_forever())
+        while not hub_task.done() and not os.path.exists(socket_path):
+            await asyncio.sleep(0.01)
+        owner, other = await LocalSocketRoomBus.connect(socket_path), await LocalSocketRoomBus.connect(socket_path)
+        received, callback = collector()
+        await owner.subscribe("room.A.commands", callback)
+        await asyncio.sleep(0.05) # Let the hub register the subscription
+        assert await other.publish("room.A.commands", {"move": [1, 1]}) == 1
+        assert await other.publish("room.B.commands", {"move": [0, 0]}) == 0
+        await asyncio.sleep(0.05)
+        for bus in (owner, other):
+            await bus.close()
+        hub_task.cancel()
+        return received
+    assert run(scenario()) == [{"move": [1, 1]}]
+
+async def start_silent_hub(path, connections):
+    """A hub that accepts nodes but never answers, so the test decides when it dies."""
+    async def accept(reader, writer):
+        connections.append(writer)
+    return await asyncio.start_unix_server(accept, path)
+
+def test_publishes_resolve_to_zero_once_the_hub_connection_closes(socket_path):
+    async def scenario():
+        connections = []
+        hub = await start_silent_hub(socket_path, connections)
+        bus = await LocalSocketRoomBus.connect(socket_path)
+        await asyncio.sleep(0.05)
+        waiting = asyncio.create_task(bus.publish("room.A.commands", {"n": 1}))
+        await asyncio.sleep(0.05)
+        assert not waiting.done() # No ack yet
+        connections[0].close()
+        hub.close()
+        results = [await waiting, await bus.publish("room.A.commands", {"n": 2})]
+        await bus.close()
+        return results
+    assert run(scenario()) == [0, 0]
+
+def test_an_unacknowledged_publish_times_out(socket_path, monkeypatch):
+    monkeypatch.setattr(room_bus, "ROOM_BUS_ACK_TIMEOUT_SECONDS", 0.1)
+    async def scenario():
+        connections = []
+        hub = await start_silent_hub(socket_path, connections)
+        bus = await LocalSocketRoomBus.connect(socket_path)
+        count = await bus.publish("room.A.commands", {"n": 1})
+        await bus.close()
+        hub.close()
+        return count
+    assert run(scenario()) == 0
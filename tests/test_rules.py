@@ -0,0 +1,127 @@
+import asyncio
+import json
+from server.gomoku_game_room import GomokuGame
+from server.compact_board import X
+from server.rules import GomokuBoard, TicTacToeBoard, UltimateBoard
+
+def play(board, moves):
+    """Plays (row, col) moves alternately, X first."""
+    for i, (row, col) in enumerate(moves):
+        board.set(row, col, "XO"[i % 2])
+    return board
+
+# A full 3x3 board with no line: X O X / X O O / O X X
+DRAWN_GAME = ((0, 0), (0, 1), (0, 2), (1, 1), (1, 0), (1, 2), (2, 1), (2, 0), (2, 2))
+
+def test_tic_tac_toe_wins_on_rows_columns_and_diagonals():
+    assert play(TicTacToeBoard(), ((0, 0), (1, 0), (0, 1), (1, 1), (0, 2))).result() == "X"
+    assert play(TicTacToeBoard(), ((0, 0), (0, 1), (1, 0), (1, 1), (2, 2), (2, 1))).result() == "O"
+    assert play(TicTacToeBoard(), ((0, 2), (0, 0), (1, 1), (0, 1), (2, 0))).result() == "X"
+    board = play(TicTacToeBoard(), ((0, 0), (1, 0), (0, 1)))
+    assert board.result() is None and len(board.legal_moves()) == 6
+
+def test_tic_tac_toe_draw_and_take_back():
+    board = play(TicTacToeBoard(), DRAWN_GAME)
+    assert board.result() == "draw" and board.legal_moves() == []
+    board = play(TicTacToeBoard(), ((0, 0), (1, 0), (0, 1), (1, 1), (0, 2)))
+    board.unplace(2)
+    assert board.result() is None and board.is_empty(0, 2)
+
+def ultimate_moves(micro, cells):
+    """Absolute (row, col) moves inside micro-board `micro` for its local cells."""
+    top, left = (micro // 3) * 3, (micro % 3) * 3
+    return [(top + cell // 3, left + cell % 3) for cell in cells]
+
+def test_ultimate_routes_to_the_board_matching_the_last_cell():
+    board = UltimateBoard()
+    assert board.play(4, 4, "X") is None # Centre of the centre board
+    assert board.active == [1, 1]
+    assert not board.is_legal(0, 0) and board.is_legal(3, 3)
+    assert all(row // 3 == 1 and col // 3 == 1 for row, col in board.legal_moves())
+
+def test_ultimate_sent_to_a_decided_board_gets_a_free_move():
+    board = UltimateBoard()
+    # X takes the top-left board (turn order and routing are not what is tested here).
+    for cell in (0, 1, 2):
+        board.active = None
+        board.play(*ultimate_moves(0, [cell])[0], "X")
+    assert board.macro.get(0, 0) == "X"
+    board.active = None
+    board.play(*ultimate_moves(4, [0])[0], "O") # Top-left cell: sends X to the decided board
+    assert board.active is None
+    moves = board.legal_moves()
+    assert {(row // 3, col // 3) for row, col in moves} == {(r, c) for r in range(3) for c in range(3)} - {(0, 0)}
+    assert not board.is_legal(1, 1) # Nothing more is played on a decided board
+
+def test_ultimate_macro_win_and_draw():
+    board = UltimateBoard()
+    result = None
+    for micro in (0, 1, 2):
+        for cell in (0, 1, 2):
+            board.active = None
+            result = board.play(*ultimate_moves(micro, [cell])[0], "X")
+    assert result == "X" and board.legal_moves() == []
+
+    board = UltimateBoard()
+    # Draw every micro-board, so the macro-board fills with no line.
+    for micro in range(9):
+        for i, cell in enumerate(DRAWN_GAME):
+            board.active = None
+            result = board.play(*ultimate_moves(micro, [cell[0] * 3 + cell[1]])[0], "XO"[i % 2])
+    assert result == "draw" and board.ply == 81
+
+def test_gomoku_five_in_a_row_in_every_direction():
+    lines = (
+        [(7, c) for c in range(3, 8)],           # Row
+        [(r, 2) for r in range(4, 9)],           # Column
+        [(i, i) for i in range(10, 15)],         # Diagonal, ending in the corner
+        [(i, 14 - i) for i in range(0, 5)],      # Anti-diagonal from the top-right corner
+    )
+    for line in lines:
+        board = GomokuBoard(15, 5)
+        for row, col in line[:-1]:
+            board.set(row, col, "X")
+        assert board.result() is None
+        board.set(*line[-1], "X")
+        assert board.result() == "X"
+
+def test_gomoku_lines_do_not_wrap_across_the_row_boundary():
+    board = GomokuBoard(15, 5)
+    # Three at the end of row 3 and two at the start of row 4 are adjacent bits only without the spare bit.
+    for row, col in ((3, 12), (3, 13), (3, 14), (4, 0), (4, 1)):
+        board.set(row, col, "X")
+    assert board.result() is None
+    # The same for diagonals that run off one edge and back in on the other.
+    board = GomokuBoard(15, 5)
+    for row, col in ((0, 12), (1, 13), (2, 14), (3, 0), (4, 1)):
+        board.set(row, col, "O")
+    assert board.result() is None
+    board = GomokuBoard(15, 5)
+    for row, col in ((0, 2), (1, 1), (2, 0), (3, 14), (4, 13)):
+        board.set(row, col, "O")
+    assert board.result() is None
+
+def test_gomoku_draw_and_take_back():
+    board = play(GomokuBoard(3, 3), DRAWN_GAME)
+    assert board.result() == "draw" and board.legal_moves() == []
+    board = GomokuBoard(15, 5)
+    for col in range(5):
+        board.set(0, col, "X")
+    board.unplace(board.index(0, 4), X)
+    assert board.result() is None
+
+def test_gomoku_last_move_survives_the_wire_and_a_snapshot():
+    board = play(GomokuBoard(15, 5), ((7, 7), (0, 14), (7, 8)))
+    assert GomokuBoard.from_wire(board.to_wire(), 5, board.last_move).last_move == [7, 8]
+    assert GomokuBoard.from_wire(board.to_wire(), 5).last_move is None # Not guessed from the rows
+
+    async def scenario():
+        game = GomokuGame("AB12", on_empty=lambda game_id: None)
+        game.board = board
+        snapshot = json.loads(json.dumps(game.to_snapshot()))
+        game.close()
+        restored = await GomokuGame.from_snapshot(snapshot, on_empty=lambda game_id: None)
+        restored.close()
+        return restored.board
+    restored = asyncio.run(scenario())
+    assert restored.last_move == [7, 8] and restored.to_wire() == board.to_wire()
@@ -0,0 +1,91 @@
+import asyncio
+import json
+from server.game_room import Game
+from server.protocol import parse_client_message
+from server.sessions import RoomSessions
+
+def move(row, col):
+    return parse_client_message(json.dumps({"type": "move", "row": row, "col": col}))
+
+def test_tokens_are_per_seat_and_reissuing_revokes():
+    sessions = RoomSessions()
+    x_token, o_token = sessions.issue("X"), sessions.issue("O")
+    assert sessions.symbol_for(x_token) == "X" and sessions.symbol_for(o_token) == "O"
+    new_x_token = sessions.issue("X")
+    assert sessions.symbol_for(x_token) is None
+    assert sessions.symbol_for(new_x_token) == "X"
+
+def record_events(sessions, count):
+    for _ in range(count):
+        seq = sessions.next_seq()
+        sessions.record(seq, f"event {seq}")
+
+def test_replay_returns_only_missed_events():
+    sessions = RoomSessions(history_size=4)
+    record_events(sessions, 6)
+    assert sessions.replay_since(6) == []
+    assert sessions.replay_since(4) == ["event 5", "event 6"]
+    assert sessions.replay_since(2) == ["event 3", "event 4", "event 5", "event 6"]
+
+def test_replay_needs_a_snapshot_when_the_gap_is_not_covered():
+    sessions = RoomSessions(history_size=4)
+    record_events(sessions, 6)
+    assert sessions.replay_since(1) is None # Event 2 has left the buffer
+    assert sessions.replay_since(7) is None # Ahead of the room
+
+def test_a_seat_is_only_given_back_for_its_token(make_connection):
+    async def scenario():
+        game = Game("AB12", on_empty=lambda game_id: None)
+        x, o = make_connection("x"), make_connection("o")
+        await game.add_client(x, "x")
+        await game.add_client(o, "o")
+        await game.broadcast_state()
+        await game.remove_client(x)
+
+        intruder = make_connection("intruder")
+        assert await game.resume_client(intruder, "not-a-token", 0) is None
+        assert intruder not in game.clients
+
+        returning = make_connection("x again")
+        missed = await game.resume_client(returning, x.session_token, 0)
+        game.close()
+        return game, returning, missed
+    game, returning, missed = asyncio.run(scenario())
+    assert returning.player_symbol == "X" and returning in game.clients
+    assert len(missed) == 1 # The one broadcast since seq 0
+
+def test_the_clock_starts_when_a_resume_fills_the_second_seat(make_connection):
+    async def scenario():
+        game = Game("AB13", on_empty=lambda game_id: None)
+        x, o = make_connection("x"), make_connection("o")
+        await game.add_client(x, "x")
+        await game.remove_client(x) # X drops before anyone joins
+        await game.add_client(o, "o")
+        assert game.current_turn_start_time is None
+
+        returning = make_connection("x again")
+        await game.resume_client(returning, x.session_token, 0)
+        assert game.current_turn_start_time is not None
+        await game.handle_move(returning, move(1, 1))
+        game.close()
+        return game
+    game = asyncio.run(scenario())
+    assert not game.board.is_empty(1, 1) and game.current_player == "O"
+
+def test_a_replaced_connection_can_no_longer_move(make_connection):
+    async def scenario():
+        game = Game("AB14", on_empty=lambda game_id: None)
+        x, o = make_connection("x"), make_connection("o")
+        await game.add_client(x, "x")
+        await game.add_client(o, "o")
+        # X resumes from a second tab while the first one is still open.
+        second_tab = make_connection("x tab")
+        await game.resume_client(second_tab, x.session_token, 0)
+        assert x.player_symbol is None and x.game_id is None
+        await game.handle_move(x, move(0, 0))
+        assert game.board.is_empty(0, 0)
+        await game.handle_move(second_tab, move(0, 0))
+        game.close()
+        return game
+    game = asyncio.run(scenario())
+    assert not game.board.is_empty(0, 0)
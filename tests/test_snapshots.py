@@ -0,0 +1,115 @@
+import asyncio
+import json
+import os
+import pytest
+from server import snapshots
+from server.ai_game_room import AIGameRoom
+from server.game_room import Game
+from server.protocol import parse_client_message
+from server.snapshots import read_snapshot, write_snapshot
+
+def move(row, col):
+    return parse_client_message(json.dumps({"type": "move", "row": row, "col": col}))
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def through_json(snapshot):
+    """What a snapshot looks like after a trip through the snapshot file."""
+    return json.loads(json.dumps(snapshot))
+
+async def resume(game, conn, symbol, token):
+    await game.resume_client(conn, token, 0)
+    assert conn.player_symbol == symbol
+
+def test_a_mid_game_room_is_restored_and_the_next_move_plays(make_connection, fresh_database):
+    async def scenario():
+        game = Game("AB12", on_empty=lambda game_id: None)
+        x, o = make_connection("x"), make_connection("o")
+        await game.add_client(x, "xavier")
+        await game.add_client(o, "olga")
+        for player, cell in ((x, (0, 0)), (o, (1, 1)), (x, (0, 1))):
+            await game.handle_move(player, move(*cell))
+        snapshot = through_json(game.to_snapshot())
+        game.close()
+
+        restored = await Game.from_snapshot(snapshot, on_empty=lambda game_id: None)
+        assert restored.is_in_grace_period
+        assert restored.to_snapshot()["board"] == snapshot["board"]
+        assert (restored.current_player, restored.player_names) == ("O", {"X": "xavier", "O": "olga"})
+        new_x, new_o = make_connection("x2"), make_connection("o2")
+        await resume(restored, new_x, "X", x.session_token)
+        await resume(restored, new_o, "O", o.session_token)
+        await restored.handle_move(new_o, move(2, 2))
+        await restored.handle_move(new_x, move(0, 2))
+        restored.close()
+        return restored
+    restored = run(scenario())
+    assert restored.game_over and restored.winner == "X"
+
+def test_an_ai_room_restored_on_its_own_turn_moves_again(make_connection, fresh_database):
+    async def scenario():
+        game = AIGameRoom("AB12", on_empty=lambda game_id: None, executor=None)
+        human = make_connection("human")
+        await game.add_client(human, "hana")
+        await game.start_game()
+        # As if the process stopped while the computer was thinking about its reply.
+        game.board.set(1, 1, "X")
+        game.current_player = "O"
+        snapshot = through_json(game.to_snapshot())
+        game.close()
+
+        restored = await AIGameRoom.from_snapshot(snapshot, on_empty=lambda game_id: None, executor=None)
+        assert restored.current_player == "O"
+        while restored.current_player == "O":
+            await asyncio.sleep(0.01)
+        assert sum(not restored.board.is_empty(r, c) for r in range(3) for c in range(3)) == 2
+        await resume(restored, make_connection("human2"), "X", human.session_token)
+        restored.close()
+    run(scenario())
+
+def test_rooms_are_restored_once_and_migrate_between_workers(make_connection, fresh_database, monkeypatch):
+    pytest.importorskip("websockets") # game_manager builds connections for the room bus
+    from server import game_manager
+    monkeypatch.setattr(game_manager, "active_games", {})
+    monkeypatch.setattr(game_manager, "moved_rooms", {})
+    async def scenario():
+        game = game_manager.create_game()
+        x = make_connection("x")
+        await game.add_client(x, "xavier")
+        game_id = game.game_id
+        saved = through_json(game_manager.snapshot_rooms())
+
+        snapshot = through_json(game_manager.export_room(game_id, to_worker=1))
+        assert game_manager.get_game(game_id) is None
+        assert game_manager.owner_of(game_id) == 1 # Routed to the adopting worker
+
+        adopted = await game_manager.adopt_room(snapshot)
+        assert game_manager.owner_of(game_id) == game_manager.worker_id
+        await resume(adopted, make_connection("x2"), "X", x.session_token)
+
+        await game_manager.restore_rooms(saved) # Already live: left alone
+        assert game_manager.get_game(game_id) is adopted
+        game_manager.remove_game(game_id)
+        await game_manager.restore_rooms(saved)
+        assert game_manager.get_game(game_id).sessions.is_claimed("X")
+        game_manager.remove_game(game_id)
+    run(scenario())
+
+def test_snapshot_files_round_trip(tmp_path):
+    path = str(tmp_path / "rooms.snapshot")
+    assert read_snapshot(path) == []
+    rooms = [{"kind": "standard", "game_id": "AB12"}]
+    write_snapshot(path, rooms)
+    assert read_snapshot(path) == rooms
+    assert not os.path.exists(f"{path}.tmp")
+
+def test_a_failed_write_keeps_the_previous_snapshot(tmp_path, monkeypatch):
+    path = str(tmp_path / "rooms.snapshot")
+    write_snapshot(path, [{"game_id": "AB12"}])
+    def crash(source, target):
+        raise OSError("disk full")
+    monkeypatch.setattr(snapshots.os, "replace", crash)
+    with pytest.raises(OSError):
+        write_snapshot(path, [{"game_id": "CD34"}])
+    assert read_snapshot(path) == [{"game_id": "AB12"}]
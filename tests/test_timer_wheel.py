@@ -0,0 +1,60 @@
+from server.timer_wheel import TimerWheel
+
+def small_wheel():
+    # 4 slots over 3 levels covers 64 ticks; setting the driver keeps schedule() from starting a task.
+    wheel = TimerWheel(tick=1, slots=4, levels=3)
+    wheel._driver = object()
+    return wheel
+
+def advance(wheel, ticks):
+    for _ in range(ticks):
+        wheel._advance()
+
+def test_callbacks_fire_in_deadline_order():
+    wheel, fired = small_wheel(), []
+    for delay in (3, 1, 2, 2):
+        wheel.schedule(delay, lambda d=delay: fired.append((d, wheel._current_tick)))
+    advance(wheel, 3)
+    assert fired == [(1, 1), (2, 2), (2, 2), (3, 3)]
+    assert wheel.pending == 0
+
+def test_long_timers_cascade_down_to_their_exact_tick():
+    wheel, fired = small_wheel(), []
+    for delay in (5, 17, 40, 63):
+        wheel.schedule(delay, lambda: fired.append(wheel._current_tick))
+    advance(wheel, 63)
+    assert fired == [5, 17, 40, 63]
+
+def test_timers_beyond_the_top_level_are_parked_until_due():
+    wheel, fired = small_wheel(), []
+    wheel.schedule(100, lambda: fired.append(wheel._current_tick))
+    advance(wheel, 99)
+    assert fired == []
+    advance(wheel, 1)
+    assert fired == [100]
+
+def test_cancelled_timers_are_skipped():
+    wheel, fired = small_wheel(), []
+    kept = wheel.schedule(2, fired.append, "kept")
+    dropped = wheel.schedule(2, fired.append, "dropped")
+    dropped_far = wheel.schedule(20, fired.append, "dropped far")
+    dropped.cancel()
+    dropped_far.cancel()
+    advance(wheel, 20)
+    assert fired == ["kept"]
+    assert not kept.cancelled
+    assert wheel.pending == 0
+
+def test_scheduling_is_relative_to_the_current_tick():
+    wheel, fired = small_wheel(), []
+    advance(wheel, 7)
+    wheel.schedule(6, lambda: fired.append(wheel._current_tick))
+    advance(wheel, 6)
+    assert fired == [13]
+
+def test_a_failing_callback_does_not_stop_the_others():
+    wheel, fired = small_wheel(), []
+    wheel.schedule(1, lambda: 1 / 0)
+    wheel.schedule(1, fired.append, "ran")
+    advance(wheel, 1)
+    assert fired == ["ran"]